@@ -1,4 +1,5 @@
-from shiny import App, ui, render, reactive
+from shiny import App, ui, render, reactive, req
+from shiny.types import SilentException, SilentCancelOutputException
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -6,65 +7,99 @@ import numpy as np
 import pathlib
 import json
 import collections
+import functools
+import inspect
+import os
 
 from metadata import OUR_TEAM_NUMBER, CURRENT_EVENT
 
-from utils import statbotics_utils, tba_utils
+from utils import statbotics_utils, tba_utils, plot_utils, scout_radioz_utils, team_stats_utils, reconciliation_utils, history_utils, event_data_utils, cache_utils, worker_utils, profiling_utils, remote_data_utils
 
 # read in data
 USE_LOCAL_VERSION = True
 
+# If true, every chart output inlines its own copy of plotly.js (the old behavior). Otherwise the library
+# is loaded once in the page head and each output only ships the figure json.
+INLINE_PLOTLY_JS_PER_CHART = False
+
+# If true, the scouted piece counts are scaled so that every fully scouted alliance adds up to its official TBA
+# breakdown before anything else is calculated from them
+APPLY_SCOUTING_CORRECTIONS = False
+
+# Where the remote version loads the data from. Setting REMOTE_DATA_URL points it somewhere else (i.e. a local server
+# started with python -m http.server -d data) and turns the remote version on
+REMOTE_DATA_URL = os.environ.get("REMOTE_DATA_URL")
+if REMOTE_DATA_URL:
+    USE_LOCAL_VERSION = False
+
 if USE_LOCAL_VERSION:
     script_directory = pathlib.Path(__file__).resolve().parent
-    base_data_directory = script_directory / f"data/{CURRENT_EVENT}"
-    print(f"Loading local data from: {base_data_directory}")
+    data_directory = script_directory / "data"
+    available_events = event_data_utils.find_local_events(data_directory)
+
+    def load_event(event):
+        return event_data_utils.load_local_event(data_directory, event, apply_scouting_corrections=APPLY_SCOUTING_CORRECTIONS)
 
-    df = pd.read_csv(base_data_directory / "match_scouting.csv")
-    matches_df = tba_utils.load_event_matches(base_data_directory / "tba_matches.json")
-    statbotics_df = statbotics_utils.load_statbotics_matches(base_data_directory / "statbotics_matches.json")
+    async def fetch_event(event):
+        # Everything is already on disk
+        pass
+
+    data_version = functools.partial(event_data_utils.local_data_version, data_directory)
 else:
     branch_name = "main"
-    base_url = f"https://raw.githubusercontent.com/pjreiniger/gos_scouting_report/refs/heads/{branch_name}/data/{EVENT_KEY}"
-    print(f"Loading remote data from {base_url}")
+    base_url = REMOTE_DATA_URL or f"https://raw.githubusercontent.com/pjreiniger/gos_scouting_report/refs/heads/{branch_name}/data"
 
-    from pyodide.http import open_url
+    # The remote version has no way to list what has been scraped
+    available_events = [CURRENT_EVENT]
 
-    scouted_csv = open_url(base_url + "/match_scouting.csv")
-    tba_matches_json = json.load(open_url(base_url + "/tba_matches.json"))
-    statbotics_matches_json = json.load(open_url(base_url + "/statbotics_matches.json"))
-    
-    df = pd.read_csv(scouted_csv)
-    matches_df = tba_utils.event_matches_json_to_dataframe(tba_matches_json)
-    statbotics_df = statbotics_utils.statbotics_matches_json_to_dataframe(statbotics_matches_json)
+    # Every file of an event is fetched at once without blocking. The event is shown as soon as the scouting and the
+    # matches are in, and loaded again when the rest arrives
+    remote_sources = remote_data_utils.RemoteEventSources(base_url)
+
+    def load_event(event):
+        return remote_sources.load_event(event, apply_scouting_corrections=APPLY_SCOUTING_CORRECTIONS)
+
+    fetch_event = remote_sources.wait_until_usable
+    data_version = remote_sources.version
 
-# add new columns
-df["totalTeleopCoral"] = df["teleopCoralL1"] + df["teleopCoralL2"] + df["teleopCoralL3"] + df["teleopCoralL4"]
-df["totalAutoCoral"] = df["autoCoralL1"] + df["autoCoralL2"] + df["autoCoralL3"] + df["autoCoralL4"]
+if CURRENT_EVENT not in available_events:
+    available_events.insert(0, CURRENT_EVENT)
 
-df["totalTeleopCoralPoints"] = df["teleopCoralL1"]*2 + df["teleopCoralL2"]*3 + df["teleopCoralL3"]*4 + df["teleopCoralL4"]*5
-df["totalTeleopAlgaePoints"] = df["teleopAlgaeNet"]*4 + df["teleopAlgaeProc"]*6
-df["totalTeleopPoints"] = df["totalTeleopCoralPoints"] + df["totalTeleopAlgaePoints"]
+# Outputs computed for one session are shared with every other session looking at the same thing
+shared_cache = cache_utils.SharedCache()
 
-df["totalAutoCoralPoints"] = df["autoCoralL1"]*3 + df["autoCoralL2"]*4 + df["autoCoralL3"]*6 + df["autoCoralL4"]*7
-df["totalAutoAlgaePoints"] = df["autoAlgaeNet"]*4 + df["autoAlgaeProc"]*6
-df["totalAutoPoints"] = df["totalAutoCoralPoints"] + df["totalAutoAlgaePoints"]
+# Loading events, the simulations and anything else slow runs here, instead of holding up every other session
+worker_pool = worker_utils.WorkerPool()
 
-df["algaeTeleop"] = df["teleopAlgaeNet"] + df["teleopAlgaeProc"]
-df["algaeAuto"] = df["autoAlgaeNet"] + df["autoAlgaeProc"]
+# Events are loaded the first time a session looks at them rather than at startup, and shared between sessions. When
+# a scrape writes new data for an event, it is loaded again and everything cached from the old data is dropped
+event_loader = event_data_utils.EventDataLoader(
+    load_event,
+    data_version=data_version,
+    on_unload=lambda old_data: shared_cache.invalidate((old_data.event, old_data.version)),
+)
+
+# How often the loaded events are checked for new data. The remote version only checks which of its files have
+# arrived, which costs nothing, so it looks often to show them as soon as they do
+DATA_POLL_SECONDS = 5 if USE_LOCAL_VERSION else 1
 
-df["totalPieces"] = df["totalTeleopCoral"] + df["totalAutoCoral"] + df["algaeTeleop"] + df["algaeAuto"] 
+# Times every calc and output when APP_PROFILING=1, and adds a Diagnostics page to show the results. Outputs waiting
+# on their inputs or on a background computation aren't timed, just counted
+profiler = profiling_utils.Profiler(ignored_exceptions=(SilentException, SilentCancelOutputException))
 
-position = df["bargeStatus"]
-df["endgamePoints"] = np.where(position == "Parked", 2, np.where(position == "Shallow Cage", 6, np.where(position == "Deep Cage", 12, 0)))
+# How often the Diagnostics page refreshes while it is open
+DIAGNOSTICS_REFRESH_SECONDS = 2
 
-df["endgamePlusAuto"] = df["totalAutoPoints"] + df["totalEndgamePoints"]
 
-df["totalPointsScored"] = df["totalTeleopPoints"] + df["totalAutoPoints"] + df["endgamePoints"]
+@reactive.poll(event_loader.versions, DATA_POLL_SECONDS)
+def data_versions():
+    return event_loader.versions()
 
-# update team name
-df["team_key"] = df["team_key"].str[3:]
+def shared_result(data, key, compute):
+    # Every session asking for the same thing, computed from the same data, gets the same copy of it
+    return shared_cache.get_or_compute((data.event, data.version, *key), profiled("shared", compute, name=key[0]))
 
-def create_mock_data_for_missing_teams(teams_with_no_data):
+def create_mock_data_for_missing_teams(df, teams_with_no_data):
     data = collections.defaultdict(list)
 
     for team in teams_with_no_data:
@@ -74,7 +109,66 @@ def create_mock_data_for_missing_teams(teams_with_no_data):
         data["bargeStatus"][-1] = "Not Parked"
     return pd.DataFrame(data)
 
-df_unique_teams = df.drop_duplicates(subset=['team_key'], keep='first')
+def build_match_data(data, red_teams, blue_teams):
+    # The result is shared between every session through the shared cache, so whatever uses it has to treat it as
+    # read only and work on a copy of anything it wants to change
+    all_teams = red_teams + blue_teams
+
+    # filter df by team_key
+    new_df = data.df.iloc[[row for team in dict.fromkeys(all_teams) for row in data.rows_by_team.get(team, [])]]
+    teams_with_no_data = set(all_teams).difference(data.rows_by_team)
+    if teams_with_no_data:
+        new_df = pd.concat([new_df, create_mock_data_for_missing_teams(data.df, teams_with_no_data)])
+        new_df = new_df.set_index("team_key").loc[all_teams].reset_index()
+    else:
+        new_df = new_df.reset_index(drop=True)
+
+    # averages df. The team keys are already strings, which is what the charts label the teams with
+    averages_by_team = team_stats_utils.team_stats(data.team_stats_cube, all_teams)
+
+    color_map = {str(team): "#FF5733" for team in red_teams}  # Red teams
+    color_map.update({str(team): "#1F77B4" for team in blue_teams})  # Blue teams
+
+    return new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, data.averages_by_team_all
+
+# Every event we have scraped, for looking at how a team did before this one. It is built by build_history_store.py
+# (or the scrapers with --history), and the remote version has no way to read it. Without one the card is left out
+history_store = history_utils.HistoryStore() if USE_LOCAL_VERSION else None
+if history_store is not None and not history_store.segments:
+    history_store = None
+
+
+def render_figure(fig):
+    with profiler.section("to_html"):
+        return ui.HTML(plot_utils.figure_to_html(fig, include_plotlyjs=INLINE_PLOTLY_JS_PER_CHART))
+
+
+def profiled(kind, function, session_id=None, name=None):
+    # Times a calc (or anything else run for one) and counts how often a calc is invalidated. Without profiling, the
+    # function is returned as is
+    if not profiler.enabled:
+        return function
+    name = name or function.__name__
+
+    def profiled_function(*args):
+        if kind == "calc":
+            reactive.get_current_context().on_invalidate(lambda: profiler.count_invalidation(kind, name))
+        with profiler.measure(kind, name, session_id):
+            return function(*args)
+    profiled_function.__name__ = function.__name__
+    return profiled_function
+
+
+class PreparedDataGrid(render.DataGrid):
+    # A DataGrid that is serialized as soon as it is made, so a big one can be built on a worker thread instead of
+    # being serialized by its output on the event loop
+    def __init__(self, data, **kwargs):
+        super().__init__(data, **kwargs)
+        self.payload = super().to_payload()
+
+    def to_payload(self):
+        return self.payload
+
 # print(df_unique_teams.keys())
 # Define the UI
 app_ui = ui.page_navbar(
@@ -104,6 +198,14 @@ ui.page_sidebar(
                 ui.output_ui("blue_statbotics_prediction")
             )    
         ),
+        ui.layout_column_wrap(
+            ui.card(
+                ui.output_ui("red_simulation_box")
+            ),
+            ui.card(
+                ui.output_ui("blue_simulation_box")
+            ),
+        ),
         ui.layout_column_wrap(
             ui.card(
                 ui.output_ui("avg_coral_red_box")
@@ -169,6 +271,15 @@ ui.page_sidebar(
         ui.card(
             ui.output_data_frame("key_stats_dt")
         ),
+        ui.card(
+            ui.card_header("Projected Rankings"),
+            ui.output_data_frame("ranking_projection_dt")
+        ),
+        ui.card(
+            ui.card_header("Pick List"),
+            ui.output_ui("alliance_picks_ui"),
+            ui.output_data_frame("pick_list_dt")
+        ),
     ),
 
     ui.nav_panel(
@@ -185,15 +296,124 @@ ui.page_sidebar(
             ),
             ui.card(
             ui.output_data_frame("key_stats_by_team_dt")
-            )
+            ),
+            ui.card(
+            ui.card_header("Pit Scouting"),
+            ui.output_data_frame("team_pit_scouting_dt")
+            ),
+            *([ui.card(
+            ui.card_header("Event History"),
+            ui.output_data_frame("team_history_dt")
+            )] if history_store is not None else [])
             
         )    
     
     ),
+
+    ui.nav_panel(
+        "Scouting Accuracy",
+        ui.card(
+            ui.card_header("Scouting vs Official, by Station"),
+            ui.output_data_frame("scout_station_accuracy_dt")
+        ),
+        ui.card(
+            ui.card_header("Scouting vs Official, by Alliance"),
+            ui.output_data_frame("alliance_reconciliation_dt")
+        ),
+        ui.card(
+            ui.card_header("Scouting vs Official, by Robot"),
+            ui.output_data_frame("robot_reconciliation_dt")
+        ),
+    ),
+    *(
+        [
+            ui.nav_panel(
+                "Diagnostics",
+                ui.card(
+                    ui.card_header("Render Timings"),
+                    ui.output_code("profile_cache_text"),
+                    ui.input_action_button("reset_profile", "Reset", width="150px"),
+                    ui.output_data_frame("profile_summary_dt"),
+                ),
+            )
+        ]
+        if profiler.enabled
+        else []
+    ),
+    ui.nav_spacer(),
+    ui.nav_control(
+        ui.input_select("event_select", None, choices=available_events, selected=CURRENT_EVENT, width="150px")
+    ),
     title="GoS REEFSCAPE Data Science Report",
+    header=None if INLINE_PLOTLY_JS_PER_CHART else plot_utils.plotly_js_head_content(),
 )
 
 def server(input, output, session):
+    def background(depends_on):
+        # Runs a slow computation in the worker pool instead of on the event loop. depends_on is called reactively and
+        # returns the computation's arguments, so it can't use anything reactive itself. When the arguments change
+        # while it is still running, that run is cancelled and a new one started. Until the result is ready, anything
+        # reading it shows as recalculating. An async computation runs on the event loop instead, and is expected to
+        # hand its slow parts to the worker pool itself
+        def decorator(compute):
+            @reactive.extended_task
+            async def task(*args):
+                if inspect.iscoroutinefunction(compute):
+                    return await compute(*args)
+                return await worker_pool.run(profiled("worker", compute, session.id), *args)
+
+            invoked_with = []
+
+            def result():
+                args = depends_on()
+                if invoked_with != [args]:
+                    invoked_with[:] = [args]
+                    task.cancel()
+                    task.invoke(*args)
+                return task.result()
+            result.__name__ = compute.__name__
+            return calc(result)
+        return decorator
+
+    def calc(function):
+        # reactive.calc, timed when profiling is on
+        return reactive.calc(profiled("calc", function, session.id))
+
+    @background(lambda: (input.event_select(), data_versions()))
+    async def event_data(event, versions):
+        await fetch_event(event)
+        return await worker_pool.run(profiled("worker", event_loader.get, session.id, name="event_data"), event)
+
+    def shared(key, compute):
+        return shared_result(event_data(), key, compute)
+
+    def profiled_output(renderer):
+        # Times an output's render when profiling is on, and records how big the payload sent to the browser is and
+        # how often the output is invalidated. Goes right above the @render decorator
+        if not profiler.enabled:
+            return renderer
+        name = renderer.__name__
+        render_value = renderer.render
+
+        async def profiled_render():
+            reactive.get_current_context().on_invalidate(lambda: profiler.count_invalidation("output", name))
+            with profiler.measure("output", name, session.id) as measurement:
+                value = await render_value()
+                measurement["payload_bytes"] = 0 if value is None else len(json.dumps(value, default=str))
+                return value
+        renderer.render = profiled_render
+        return renderer
+
+    def shared_output(depends_on=tuple):
+        # Shares an output between sessions. depends_on returns everything (besides the event's data) that the output
+        # depends on, and is called reactively so the output still updates when any of it changes
+        def decorator(render_function):
+            @functools.wraps(render_function)
+            def shared_render_function():
+                return shared((render_function.__name__, *depends_on()), render_function)
+            return shared_render_function
+        return decorator
+
     # upcoming alliance lineup
     def color_picker(team_num):
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
@@ -202,47 +422,41 @@ def server(input, output, session):
         else:
             return "blue"
 
-    @reactive.calc
-    def get_match_data():
+    @calc
+    def get_match_row():
+        data = event_data()
+        match_num = int(input.match_select())
+        # The match list is rebuilt when the event changes, so the selection can briefly be from the old event
+        req(match_num in data.match_keys_by_number)
+        return data.match_table.loc[data.match_keys_by_number[match_num]]
+
+    @calc
+    def get_match_teams():
         if input.match_or_team() == "Match Number":
-            match_num = int(input.match_select())
-            match_data = matches_df[matches_df["match_number"] == match_num].reset_index()
-            red_teams = [match_data["red1"][0][3:], match_data["red2"][0][3:], match_data["red3"][0][3:]]
-            blue_teams = [match_data["blue1"][0][3:], match_data["blue2"][0][3:], match_data["blue3"][0][3:]]
+            match_row = get_match_row()
+            return tuple(match_row["red_teams"]), tuple(match_row["blue_teams"])
         else:
-            red_teams = [input.red1(), input.red2(), input.red3()]
-            blue_teams = [input.blue1(), input.blue2(), input.blue3()]
-
+            return (input.red1(), input.red2(), input.red3()), (input.blue1(), input.blue2(), input.blue3())
 
-        all_teams = red_teams + blue_teams
+    @calc
+    def get_match_data():
+        red_teams, blue_teams = get_match_teams()
+        data = event_data()
 
-        # filter df by team_key
-        new_df = df.loc[df["team_key"].isin(all_teams)]
-        teams_with_no_data = set(all_teams).difference(set(new_df["team_key"]))
+        teams_with_no_data = set(red_teams + blue_teams).difference(data.rows_by_team)
         if teams_with_no_data:
             ui.notification_show(
                 f"This match contains teams that have no scouting data",
                 type="warning",
                 duration=None,
             )
-            new_df = pd.concat([new_df, create_mock_data_for_missing_teams(teams_with_no_data)])
-        new_df["colorGroup"] = new_df["team_key"].apply(lambda x: "Red" if x in red_teams else "Blue")
-        
-        # averages df
-        averages_by_team = new_df.groupby("team_key").mean(numeric_only=True).reset_index()
-        averages_by_team_all = df.groupby("team_key").mean(numeric_only=True).reset_index()
-
-        # Sort data
-        averages_by_team = averages_by_team.set_index("team_key").loc[all_teams].reset_index()
-        new_df = new_df.set_index("team_key").loc[all_teams].reset_index()
-
-        color_map = {str(team): "#FF5733" for team in red_teams}  # Red teams
-        color_map.update({str(team): "#1F77B4" for team in blue_teams})  # Blue teams
 
-        return new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all
+        return shared(("match_data", red_teams, blue_teams), lambda: build_match_data(data, list(red_teams), list(blue_teams)))
 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def total_points_boxplot():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
         fig = px.box(new_df, 
@@ -264,10 +478,12 @@ def server(input, output, session):
             )
         )
     
-        return ui.HTML(fig.to_html(full_html=False))
+        return render_figure(fig)
 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def coral_algae_teleop_scatter():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
 
@@ -283,10 +499,12 @@ def server(input, output, session):
                                     symbol='circle', size=10),
                         textposition="middle left")
 
-        return ui.HTML(fig.to_html(full_html=False))
+        return render_figure(fig)
     
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def teleop_auto_points_scatter():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
         teams = averages_by_team["team_key"]
@@ -303,32 +521,28 @@ def server(input, output, session):
                                     symbol='circle', size=10),
                         textposition="middle left")
         
-        return ui.HTML(fig.to_html(full_html=False))
+        return render_figure(fig)
     
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def net_processor_teleop():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
 
-        # Step 1: Convert team_keys to string
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
-
-        # Step 2: Sort teams by colorGroup (if needed)
-        averages_by_team["colorGroup"] = averages_by_team["team_key"].apply(lambda x: "Red" if x in red_teams else "Blue")
-
-        # Step 3: Define x-axis values
+        # Step 1: Define x-axis values
         x = averages_by_team["team_key"]
         y1 = averages_by_team["teleopAlgaeNet"]
         y2 = averages_by_team["teleopAlgaeProc"]
 
-        # Step 4: Define colors for x-axis labels
+        # Step 2: Define colors for x-axis labels
         color_map = {str(team): "#FF5733" for team in red_teams}  # Red teams
         color_map.update({str(team): "#1F77B4" for team in blue_teams})  # Blue teams
 
         # Generate colored tick labels
         ticktext = [f'<span style="color:{color_map[team]};">{team}</span>' for team in x]
 
-        # Step 5: Create the bar chart
+        # Step 3: Create the bar chart
         fig = go.Figure()
 
         fig.add_trace(go.Bar(
@@ -345,7 +559,7 @@ def server(input, output, session):
             marker=dict(color="#FFB480", line=dict(color="white", width=1))
         ))
 
-        # Step 6: Update layout with grouped colored x-axis labels
+        # Step 4: Update layout with grouped colored x-axis labels
         fig.update_layout(
             barmode="stack",
             xaxis=dict(
@@ -362,10 +576,12 @@ def server(input, output, session):
         )
 
 
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return render_figure(fig) 
 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def coral_algae_auto_scatter():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
 
@@ -377,15 +593,16 @@ def server(input, output, session):
 
         colors = [color_picker(team) for team in teams]  # Apply color_picker correctly
         fig.update_traces(marker=dict(color=colors, symbol='circle', size=10), textposition="middle left") 
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return render_figure(fig) 
 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def coral_level_distribution_teleop_bar():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
 
         # coral level distribution -- stacked bar graph
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
         x = averages_by_team["team_key"]
         y1 = averages_by_team["teleopCoralL1"]
         y2 = averages_by_team["teleopCoralL2"]
@@ -439,14 +656,15 @@ def server(input, output, session):
             template="plotly_white"
         )
 
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return render_figure(fig) 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def coral_level_distribution_auto_bar():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
 
         # coral level distribution -- stacked bar graph
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
         x = averages_by_team["team_key"]
         y1 = averages_by_team["autoCoralL1"]
         y2 = averages_by_team["autoCoralL2"]
@@ -502,15 +720,16 @@ def server(input, output, session):
             template="plotly_white"
         )
 
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return render_figure(fig) 
 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def coral_point_distribution_teleop_bar():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
 
         # coral level distribution -- stacked bar graph
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
         x = averages_by_team["team_key"]
         y1 = averages_by_team["teleopCoralL1"]*2
         y2 = averages_by_team["teleopCoralL2"]*3
@@ -564,14 +783,15 @@ def server(input, output, session):
             legend_title="Coral Levels",
             template="plotly_white"
         )
-        return ui.HTML(fig.to_html(full_html=False))
+        return render_figure(fig)
 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def coral_point_distribution_auto_bar():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
 
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
         x = averages_by_team["team_key"]
         y1 = averages_by_team["autoCoralL1"]*3
         y2 = averages_by_team["autoCoralL2"]*4
@@ -625,22 +845,15 @@ def server(input, output, session):
             legend_title="Coral Levels",
             template="plotly_white"
         )
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return render_figure(fig) 
       
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def endgame_bar():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        endgame_df = new_df.groupby('team_key')['bargeStatus'].value_counts().unstack(fill_value=0).reset_index()
-        endgame_df = endgame_df.set_index("team_key").loc[all_teams].reset_index()
-        
-        # Populate data if the columns don't exist
-        if 'Parked' not in endgame_df.columns:
-            endgame_df['Parked'] = 0
-        if 'Shallow Cage' not in endgame_df.columns:
-            endgame_df['Shallow Cage'] = 0
-        if 'Deep Cage' not in endgame_df.columns:
-            endgame_df['Deep Cage'] = 0
+        endgame_df = team_stats_utils.team_stats(event_data().team_stats_cube, all_teams, statistic="endgame")
 
         # Convert "team_key" to string if not already done
         endgame_df["team_key"] = endgame_df["team_key"].astype(str)
@@ -697,16 +910,53 @@ def server(input, output, session):
             legend_title="Status Levels",
             template="plotly_white"
         )
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return render_figure(fig) 
     
     @output
+    @profiled_output
     @render.data_frame
     def key_stats_dt():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+        return render.DataGrid(event_data().key_stats_df.round(2), filters=True)
+
+    @background(lambda: (event_data(),))
+    def get_ranking_projection(data):
+        return shared_result(data, ("ranking_projection",), lambda: data.ranking_projector.project(data.match_table, data.match_simulator))
+
+    @output
+    @profiled_output
+    @render.data_frame
+    def ranking_projection_dt():
+        summary, rank_distribution = get_ranking_projection()
+        return render.DataGrid(summary.round(2), filters=True)
+
+    @output
+    @profiled_output
+    @render.ui
+    def alliance_picks_ui():
+        team_numbers = sorted(event_data().df_unique_teams["team_key"].astype(str).tolist(), key=int)
+        team_numbers = [team for team in team_numbers if team != str(OUR_TEAM_NUMBER)]
+
+        return ui.layout_column_wrap(
+            ui.input_selectize("our_picks", "Our Picks", choices=team_numbers, multiple=True, options={"maxItems": 2}),
+            ui.input_selectize("unavailable_teams", "Captains / Picked By Others", choices=team_numbers, multiple=True),
+        )
+
+    @background(lambda: (event_data(), tuple(input.our_picks() or ()), tuple(sorted(input.unavailable_teams() or ()))))
+    def get_pick_list(data, our_picks, unavailable_teams):
+        return shared_result(
+            data,
+            ("pick_list", our_picks, unavailable_teams),
+            lambda: data.alliance_optimizer.rank_picks(str(OUR_TEAM_NUMBER), our_picks, unavailable_teams),
+        )
 
-        return render.DataGrid(averages_by_team_all.round(2), filters=True)
+    @output
+    @profiled_output
+    @render.data_frame
+    def pick_list_dt():
+        return render.DataGrid(get_pick_list().round(3), filters=True)
     
     @output
+    @profiled_output
     @render.ui
     def our_matches_switch_ui():
         if input.match_or_team() == "Match Number":
@@ -714,17 +964,14 @@ def server(input, output, session):
         else:
             return None
 
+    @profiled_output
     @render.ui
     def match_list_combobox():
         if input.match_or_team() == "Match Number":
             if input.our_matches_switch():
-            # Fix: Use .apply() to check if OUR_TEAM_NUMBER is in the list of team keys
-                matches_df_copy = matches_df[
-                    matches_df["alliances.blue.team_keys"].apply(lambda teams: any(str(OUR_TEAM_NUMBER) in team for team in teams)) |
-                    matches_df["alliances.red.team_keys"].apply(lambda teams: any(str(OUR_TEAM_NUMBER) in team for team in teams))]
-                match_numbers = matches_df_copy["match_number"]
+                match_numbers = event_data().matches_by_team.get(f"frc{OUR_TEAM_NUMBER}", [])
             else:
-                match_numbers = matches_df["match_number"]
+                match_numbers = event_data().match_table["match_number"]
 
             return (
                 ui.input_select(
@@ -737,7 +984,7 @@ def server(input, output, session):
                 ),
             )
         else: 
-            team_numbers = df_unique_teams["team_key"].astype(str).tolist()
+            team_numbers = event_data().df_unique_teams["team_key"].astype(str).tolist()
             return ui.div(
                 ui.input_select("red1", "Red Alliance Teams", choices=team_numbers),
                 ui.input_select("red2", "", choices=team_numbers),
@@ -748,9 +995,10 @@ def server(input, output, session):
             )
         
     @output
+    @profiled_output
     @render.ui
     def team_list_combobox():
-        team_numbers = df_unique_teams["team_key"].astype(str).tolist()  # Ensure values are strings
+        team_numbers = event_data().df_unique_teams["team_key"].astype(str).tolist()  # Ensure values are strings
 
         return ui.input_select(
             "team_select",  # Assign a unique ID to retrieve the selected value
@@ -759,21 +1007,42 @@ def server(input, output, session):
             selected=str(OUR_TEAM_NUMBER),
         )
     
-    @reactive.calc
+    @calc
     def filter_by_team():
         team_number = input.team_select()  # Get selected team from dropdown
+        df = event_data().df
         return df[df["team_key"] == team_number]
 
     @output
+    @profiled_output
     @render.data_frame
     def key_stats_by_team_dt():
         return render.DataGrid(filter_by_team().round(2), filters=True)
+
+    @output
+    @profiled_output
+    @render.data_frame
+    def team_pit_scouting_dt():
+        team_number = input.team_select()
+        pit_df = event_data().pit_df
+        return render.DataGrid(pit_df[pit_df["team_key"] == team_number])
+
+    @output
+    @profiled_output
+    @render.data_frame
+    def team_history_dt():
+        if history_store is None:
+            return render.DataGrid(pd.DataFrame())
+        team = input.team_select()
+        return render.DataGrid(shared(("team_history", team), lambda: history_store.team_summary(team).round(2)))
     
     @output
+    @profiled_output
     @render.ui
+    @shared_output(lambda: (input.team_select(),))
     def team_piece_summary_auto():
         team_data = filter_by_team()
-        return px.bar(
+        fig = px.bar(
             team_data,
             x="match_number",
             y=[
@@ -785,11 +1054,14 @@ def server(input, output, session):
                 "autoAlgaeProc",
             ],
         )
+        return render_figure(fig)
     @output
+    @profiled_output
     @render.ui
+    @shared_output(lambda: (input.team_select(),))
     def team_piece_summary_teleop():
         team_data = filter_by_team()
-        return px.bar(
+        fig = px.bar(
             team_data,
             x="match_number",
             y=[
@@ -801,11 +1073,10 @@ def server(input, output, session):
                 "teleopAlgaeProc"
         ],
     )
+        return render_figure(fig)
     # print(df.keys())
-    @output
-    @render.ui
-    def statbotics_scatter():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+    def statbotics_scatter_figure(data):
+        averages_by_team_all = data.averages_by_team_all
         teams = averages_by_team_all["team_key"]
         
         x = averages_by_team_all["endgamePlusAuto"]
@@ -834,10 +1105,22 @@ def server(input, output, session):
                                     symbol='circle', size=10),
                         textposition="middle left")
         
-        return ui.HTML(fig.to_html(full_html=False))
+        return render_figure(fig)
+
+    @background(lambda: (event_data(),))
+    def get_statbotics_scatter(data):
+        return shared_result(data, ("statbotics_scatter",), lambda: statbotics_scatter_figure(data))
+
+    @output
+    @profiled_output
+    @render.ui
+    def statbotics_scatter():
+        return get_statbotics_scatter()
     
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def avg_coral_red_box():
         
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
@@ -850,7 +1133,9 @@ def server(input, output, session):
         )
 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def avg_coral_blue_box():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
         blue_df = averages_by_team.loc[averages_by_team["team_key"].isin(blue_teams)]
@@ -863,7 +1148,9 @@ def server(input, output, session):
         )
 
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def avg_endgame_red_box():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
         red_df = averages_by_team.loc[averages_by_team["team_key"].isin(red_teams)]
@@ -876,7 +1163,9 @@ def server(input, output, session):
         )
     
     @output
+    @profiled_output
     @render.ui
+    @shared_output(get_match_teams)
     def avg_endgame_blue_box():
         new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
         blue_df = averages_by_team.loc[averages_by_team["team_key"].isin(blue_teams)]
@@ -899,34 +1188,108 @@ def server(input, output, session):
 
     #     return scouted_data, statbotics_data
     
+    @profiled_output
     @render.text
     def red_statbotics_prediction():
-        match_num = int(input.match_select())
-        statbotics_data_filtered = statbotics_df.loc[
-            (statbotics_df["match_number"] == match_num )
-            & (statbotics_df["comp_level"] == "qm")
-        ]
+        prediction = get_match_row()["statbotics.pred.red_score"]
         return ui.value_box(
             title="Prediction RED",
-            value=str(statbotics_data_filtered["pred.red_score"].sum())
+            value=str(0.0 if pd.isna(prediction) else prediction)
         )
 
+    @profiled_output
     @render.text
     def blue_statbotics_prediction():
-        match_num = int(input.match_select())
-        statbotics_data_filtered = statbotics_df.loc[
-            (statbotics_df["match_number"] == match_num) 
-            & (statbotics_df["comp_level"] == "qm")
-        ]
+        prediction = get_match_row()["statbotics.pred.blue_score"]
         return ui.value_box(
             title="Prediction BLUE",
-            value=str(statbotics_data_filtered["pred.blue_score"].sum())
+            value=str(0.0 if pd.isna(prediction) else prediction)
         )
     
+    @background(lambda: (event_data(), *get_match_teams()))
+    def get_match_simulation(data, red_teams, blue_teams):
+        return shared_result(data, ("match_simulation", red_teams, blue_teams), lambda: data.match_simulator.simulate(list(red_teams), list(blue_teams)))
+
+    def simulation_box(alliance):
+        simulation = get_match_simulation()
+        results = simulation[alliance]
+        quantiles = results["score_quantiles"]
+        rp_odds = results["rp_odds"]
+
+        return ui.value_box(
+            f"Simulated Win % {alliance.upper()}",
+            f"{simulation[f'{alliance}_win_prob']:.0%}",
+            ui.p(f"Score: {quantiles[0.5]:.0f} (middle half {quantiles[0.25]:.0f} - {quantiles[0.75]:.0f})"),
+            ui.p(f"RP odds: Auto {rp_odds['auto']:.0%} | Coral {rp_odds['coral']:.0%} | Barge {rp_odds['barge']:.0%}"),
+            ui.p(f"Expected RP: {results['expected_rp']:.1f}"),
+        )
+
+    @output
+    @profiled_output
+    @render.ui
+    @shared_output(get_match_teams)
+    def red_simulation_box():
+        return simulation_box("red")
+
+    @output
+    @profiled_output
+    @render.ui
+    @shared_output(get_match_teams)
+    def blue_simulation_box():
+        return simulation_box("blue")
+
     @output
+    @profiled_output
+    @render.data_frame
+    def scout_station_accuracy_dt():
+        data = event_data()
+        summary = shared(("scout_station_accuracy",), lambda: reconciliation_utils.summarize_scout_stations(data.scouting_reconciliation_by_row).round(2))
+        return render.DataGrid(summary)
+
+    @output
+    @profiled_output
+    @render.data_frame
+    def alliance_reconciliation_dt():
+        return render.DataGrid(event_data().scouting_reconciliation, filters=True)
+
+    @output
+    @profiled_output
+    @render.data_frame
+    def robot_reconciliation_dt():
+        return render.DataGrid(event_data().scouting_reconciliation_by_row.round(2), filters=True)
+
+    @background(lambda: (event_data(),))
+    def get_statbotics_grid(data):
+        return PreparedDataGrid(data.statbotics_df, filters=True)
+
+    @output
+    @profiled_output
     @render.data_frame
     def statbotics_dataframe():
-        return render.DataGrid(statbotics_df, filters=True)
+        return get_statbotics_grid()
+
+    if profiler.enabled:
+        @render.code
+        def profile_cache_text():
+            reactive.invalidate_later(DIAGNOSTICS_REFRESH_SECONDS)
+            return (
+                f"Shared cache: {len(shared_cache)} entries, {shared_cache.num_bytes / 1024 / 1024:.1f} MB, "
+                f"{shared_cache.hits} hits, {shared_cache.misses} misses\n"
+                f"Loaded events: {', '.join(event_loader.loaded_events())}"
+            )
+
+        @render.data_frame
+        def profile_summary_dt():
+            reactive.invalidate_later(DIAGNOSTICS_REFRESH_SECONDS)
+            input.reset_profile()
+            return render.DataGrid(profiler.summary().round(2), filters=True)
+
+        # Runs before the summary above re-renders for the same click
+        @reactive.effect(priority=1)
+        @reactive.event(input.reset_profile)
+        def reset_profile():
+            profiler.reset()
+
     
     
 app = App(app_ui, server)
\ No newline at end of file
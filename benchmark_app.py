@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+import htmltools
+import pandas as pd
+import shiny
+from shiny import reactive
+from shiny.express._stub_session import ExpressStubSession
+from shiny.session import session_context
+from shiny.types import SilentException, SilentOperationInProgressException
+
+import app
+from metadata import OUR_TEAM_NUMBER
+from utils import scout_radioz_utils, statbotics_utils, tba_utils, event_data_utils
+
+script_directory = pathlib.Path(__file__).resolve().parent
+
+DEFAULT_BASELINE_FILE = script_directory / "benchmark_baseline.json"
+
+# The outputs are rendered through shiny's stub session and its table of outputs, which are private to shiny. They are
+# only known to work with the version pinned in requirements.txt
+REQUIREMENTS_FILE = script_directory / "requirements.txt"
+
+# The outputs of each page that is benchmarked, in the order the page shows them
+PAGE_OUTPUTS = {
+    "Match Preview": [
+        "our_matches_switch_ui",
+        "match_list_combobox",
+        "teleop_auto_points_scatter",
+        "total_points_boxplot",
+        "red_statbotics_prediction",
+        "blue_statbotics_prediction",
+        "red_simulation_box",
+        "blue_simulation_box",
+        "avg_coral_red_box",
+        "avg_coral_blue_box",
+        "avg_endgame_red_box",
+        "avg_endgame_blue_box",
+        "statbotics_dataframe",
+        "coral_algae_auto_scatter",
+        "coral_level_distribution_auto_bar",
+        "coral_point_distribution_auto_bar",
+        "coral_algae_teleop_scatter",
+        "net_processor_teleop",
+        "coral_level_distribution_teleop_bar",
+        "coral_point_distribution_teleop_bar",
+        "endgame_bar",
+    ],
+    "Alliance Selection": ["statbotics_scatter", "key_stats_dt", "ranking_projection_dt", "alliance_picks_ui", "pick_list_dt"],
+    "Team Summary": ["team_list_combobox", "team_piece_summary_teleop", "team_piece_summary_auto", "key_stats_by_team_dt", "team_history_dt"],
+}
+
+# The Match Preview outputs are rendered for the first, middle and last match of each event, and added up
+NUM_PREVIEW_MATCHES = 3
+
+# A measurement is only a regression once it is worse than the baseline by both the relative and the absolute amount,
+# so that noise on small numbers doesn't fail the run
+TOLERANCES = {
+    "ms": (0.25, 10),
+    "peak_kb": (0.25, 256),
+    "payload_bytes": (0.05, 1024),
+}
+
+# How long to wait between checks on an output that is being computed in the background
+POLL_SECONDS = 0.002
+
+
+class BenchmarkSession(ExpressStubSession):
+    # The stub session throws rendered ui away, but its size is what gets sent to the browser
+    def _process_ui(self, ui):
+        rendered = htmltools.TagList(ui).render()
+        return {"deps": [dependency.as_dict() for dependency in rendered["dependencies"]], "html": rendered["html"]}
+
+
+############################################
+# Measurements
+############################################
+def __measure(function, repeats: int):
+    best_time = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best_time * 1000, peak_memory / 1024
+
+
+def __benchmark_loaders(event_directory: pathlib.Path, repeats: int):
+    loaders = {
+        "load_event_matches": lambda: tba_utils.load_event_matches(event_directory / "tba_matches.json"),
+        "load_statbotics_matches": lambda: statbotics_utils.load_statbotics_matches(event_directory / "statbotics_matches.json"),
+        "match_scouting_csv_to_dataframe": lambda: scout_radioz_utils.match_scouting_csv_to_dataframe(event_directory / "match_scouting.csv"),
+        "load_match_scouting": lambda: scout_radioz_utils.load_match_scouting(event_directory / "match_scouting.csv"),
+        "load_local_event": lambda: event_data_utils.load_local_event(event_directory.parent, event_directory.name),
+    }
+
+    rows = []
+    for name, loader in loaders.items():
+        rows.append(["Loaders", name, *__measure(loader, repeats), None])
+
+    # Every match of the event, the way the match preview asks for them
+    data = event_data_utils.load_local_event(event_directory.parent, event_directory.name)
+    alliances = list(zip(data.match_table["red_teams"], data.match_table["blue_teams"]))
+
+    def get_match_data():
+        for red_teams, blue_teams in alliances:
+            app.build_match_data(data, list(red_teams), list(blue_teams))
+
+    rows.append(["Loaders", f"get_match_data x{len(alliances)}", *__measure(get_match_data, repeats), None])
+    return rows
+
+
+async def __render(renderer):
+    # Renders an output the way it would be sent to the browser, waiting for anything it computes in the background
+    while True:
+        try:
+            with reactive.isolate():
+                return await renderer.render()
+        except SilentOperationInProgressException:
+            await asyncio.sleep(POLL_SECONDS)
+        except SilentException:
+            return None
+
+
+async def __render_pages(event: str, match_numbers: list, team: str, trace_memory: bool):
+    # Renders every page from cold: nothing is loaded or cached beforehand, besides the event's data itself
+    app.event_loader.clear()
+    app.shared_cache.invalidate()
+    app.event_loader.get(event)
+
+    session = BenchmarkSession()
+    inputs = {
+        "event_select": event,
+        "match_or_team": "Match Number",
+        "our_matches_switch": False,
+        # An event without a schedule yet still gets its match preview rendered, which shows nothing
+        "match_select": str(match_numbers[0]) if match_numbers else "1",
+        "team_select": team,
+        "our_picks": (),
+        "unavailable_teams": (),
+    }
+    for name, value in inputs.items():
+        session.input[name] = reactive.Value(value)
+
+    # (page, output) -> [ms, peak kb, payload bytes]
+    measurements = {}
+
+    async def render_page(page):
+        for name in PAGE_OUTPUTS[page]:
+            renderer = session.output._outputs[name].renderer
+            if trace_memory:
+                tracemalloc.reset_peak()
+                memory_before, _ = tracemalloc.get_traced_memory()
+
+            start = time.perf_counter()
+            payload = await __render(renderer)
+            elapsed = time.perf_counter() - start
+
+            measurement = measurements.setdefault((page, name), [0.0, 0.0, 0])
+            measurement[0] += elapsed * 1000
+            measurement[2] += 0 if payload is None else len(json.dumps(payload, default=str))
+            if trace_memory:
+                measurement[1] = max(measurement[1], (tracemalloc.get_traced_memory()[1] - memory_before) / 1024)
+
+    with session_context(session):
+        app.server(session.input, session.output, session)
+
+        for match_number in match_numbers or [None]:
+            if match_number is not None:
+                session.input["match_select"].set(str(match_number))
+                await reactive.flush()
+            await render_page("Match Preview")
+
+        for page in ["Alliance Selection", "Team Summary"]:
+            await render_page(page)
+
+    return measurements
+
+
+async def __benchmark_outputs(event: str, repeats: int):
+    data = app.event_loader.get(event)
+    match_numbers = sorted(data.match_table["match_number"])
+    if match_numbers:
+        match_numbers = list(dict.fromkeys(match_numbers[i] for i in [0, len(match_numbers) // 2, -1][:NUM_PREVIEW_MATCHES]))
+    teams = sorted(data.df_unique_teams["team_key"].astype(str), key=int)
+    team = str(OUR_TEAM_NUMBER) if str(OUR_TEAM_NUMBER) in teams else (teams[0] if teams else "")
+
+    runs = [await __render_pages(event, match_numbers, team, trace_memory=False) for _ in range(repeats)]
+
+    tracemalloc.start()
+    traced = await __render_pages(event, match_numbers, team, trace_memory=True)
+    tracemalloc.stop()
+
+    rows = []
+    for (page, name), (_, peak_kb, payload_bytes) in traced.items():
+        best_time = min(run[(page, name)][0] for run in runs)
+        rows.append([page, name, best_time, peak_kb, payload_bytes])
+    return rows
+
+
+def run_benchmarks(pattern: str = "2025*", repeats: int = 3) -> pd.DataFrame:
+    """
+    Times the loaders, get_match_data and every output of the Match Preview, Alliance Selection and Team Summary
+    pages for each scraped event. Outputs are rendered headlessly from cold, in the order their page shows them.
+    :param pattern: Glob of the event directories to benchmark
+    :param repeats: How many times everything is run. The fastest time is kept, the memory is measured on an extra run
+    :return: A data frame with one row per event and measurement: the wall time in ms, the peak memory allocated in KB
+        and the size of the payload sent to the browser in bytes (outputs only)
+    """
+    # Everything runs on one event loop, which the reactive graph stays tied to once it has been used
+    async def benchmark_events():
+        rows = []
+        for event_directory in sorted((script_directory / "data").glob(pattern)):
+            if not (event_directory / "tba_matches.json").exists():
+                continue
+
+            event = event_directory.name
+            print(f"Benchmarking {event}", file=sys.stderr)
+            for row in __benchmark_loaders(event_directory, repeats) + await __benchmark_outputs(event, repeats):
+                rows.append([event, *row])
+        return rows
+
+    return pd.DataFrame(asyncio.run(benchmark_events()), columns=["event", "group", "name", "ms", "peak_kb", "payload_bytes"])
+
+
+############################################
+# Baseline
+############################################
+def save_baseline(results: pd.DataFrame, baseline_file: pathlib.Path):
+    """
+    :param results: The results from run_benchmarks
+    :param baseline_file: Where to save them
+    """
+    results.to_json(baseline_file, orient="records", indent=1)
+
+
+def compare_to_baseline(results: pd.DataFrame, baseline_file: pathlib.Path) -> pd.DataFrame:
+    """
+    Compares benchmark results against a saved baseline
+    :param results: The results from run_benchmarks
+    :param baseline_file: The baseline saved by save_baseline
+    :return: Every measurement that regressed past TOLERANCES, with its baseline and current values
+    """
+    keys = ["event", "group", "name"]
+    baseline = pd.read_json(baseline_file, orient="records")
+    merged = results.merge(baseline, on=keys, how="outer", suffixes=("", "_baseline"), indicator=True)
+
+    for side, label in [("left_only", "new"), ("right_only", "missing")]:
+        unmatched = merged.loc[merged["_merge"] == side, keys]
+        if not unmatched.empty:
+            print(f"Measurements that are {label} compared to the baseline:")
+            print(unmatched.to_string(index=False))
+
+    merged = merged[merged["_merge"] == "both"]
+    regressions = []
+    for metric, (relative, absolute) in TOLERANCES.items():
+        current, previous = merged[metric], merged[f"{metric}_baseline"]
+        regressed = (current > previous * (1 + relative)) & (current - previous > absolute)
+        for _, row in merged[regressed].iterrows():
+            regressions.append([*row[keys], metric, row[f"{metric}_baseline"], row[metric], row[metric] / max(row[f"{metric}_baseline"], 1e-9)])
+
+    return pd.DataFrame(regressions, columns=[*keys, "metric", "baseline", "current", "ratio"])
+
+
+def __pinned_shiny_version():
+    with open(REQUIREMENTS_FILE, "r") as f:
+        for line in f:
+            if line.startswith("shiny=="):
+                return line.strip().split("==")[1]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the dashboard's loaders and outputs against a saved baseline")
+    parser.add_argument("--events", default="2025*", help="Glob of the event directories under data/ to benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="How many times everything is run, the fastest is kept")
+    parser.add_argument("--baseline", type=pathlib.Path, default=DEFAULT_BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Save these results as the new baseline instead of comparing")
+    args = parser.parse_args()
+
+    pinned_version = __pinned_shiny_version()
+    if shiny.__version__ != pinned_version:
+        print(f"Warning: the benchmark was written against shiny {pinned_version}, but {shiny.__version__} is installed. The output benchmarks use shiny internals that might have changed\n")
+
+    results = run_benchmarks(args.events, args.repeats)
+    with pd.option_context("display.width", 250, "display.max_rows", None):
+        print(results.round(1).to_string(index=False))
+        print()
+        print(results.groupby(["event", "group"])[["ms", "peak_kb", "payload_bytes"]].sum().round(1).to_string())
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nSaved the baseline to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline first")
+        return
+
+    regressions = compare_to_baseline(results, args.baseline)
+    if regressions.empty:
+        print("\nNo regressions compared to the baseline")
+        return
+
+    with pd.option_context("display.width", 250, "display.max_rows", None):
+        print(f"\n{len(regressions)} REGRESSIONS compared to the baseline:")
+        print(regressions.round(2).to_string(index=False))
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from utils import statbotics_utils, tba_utils
+
+# Every cached json file that the app (or the scrapers) load, and the loader that reads it now
+LOADERS = {
+    "statbotics_matches.json": statbotics_utils.load_statbotics_matches,
+    "statbotics_teams.json": statbotics_utils.load_statbotics_teams,
+    "tba_matches.json": tba_utils.load_event_matches,
+}
+
+
+def __load_everything(json_file: pathlib.Path) -> pd.DataFrame:
+    # How the files used to be loaded, with every nested field flattened into a column
+    with open(json_file, "r") as f:
+        return pd.json_normalize(json.load(f))
+
+
+def __measure(function, json_file: pathlib.Path, repeats: int):
+    best_time = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(json_file)
+        best_time = min(best_time, time.perf_counter() - start)
+
+    tracemalloc.start()
+    output = function(json_file)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best_time, peak_memory, output.shape[1], output.memory_usage(deep=True).sum()
+
+
+def benchmark_json_loading(pattern="2025*", repeats=10):
+    """
+    Times loading every cached json file for the matching events, both the old way (json.load and json_normalize)
+    and with the field selective streaming loaders, and prints the parse time, the peak memory while loading and
+    the size of the resulting data frame.
+    :param pattern: Glob of the event directories to load
+    :param repeats: How many times each file is loaded. The fastest time is reported
+    """
+    script_directory = pathlib.Path(__file__).resolve().parent
+
+    rows = []
+    for event_directory in sorted((script_directory / "data").glob(pattern)):
+        for filename, loader in LOADERS.items():
+            json_file = event_directory / filename
+            if not json_file.exists():
+                continue
+
+            old = __measure(__load_everything, json_file, repeats)
+            new = __measure(loader, json_file, repeats)
+            rows.append([f"{event_directory.name}/{filename}", json_file.stat().st_size, *old, *new])
+
+    results = pd.DataFrame(
+        rows,
+        columns=["file", "bytes", "old_ms", "old_peak_kb", "old_columns", "old_frame_kb", "new_ms", "new_peak_kb", "new_columns", "new_frame_kb"],
+    )
+    for prefix in ["old", "new"]:
+        results[f"{prefix}_ms"] *= 1000
+        results[f"{prefix}_peak_kb"] /= 1024
+        results[f"{prefix}_frame_kb"] /= 1024
+    results["speedup"] = results["old_ms"] / results["new_ms"]
+    results["peak_reduction"] = 1 - results["new_peak_kb"] / results["old_peak_kb"]
+
+    with pd.option_context("display.width", 250, "display.max_columns", None):
+        print(results.round(2).to_string(index=False))
+
+    totals = results[["old_ms", "new_ms", "old_peak_kb", "new_peak_kb", "old_frame_kb", "new_frame_kb"]].sum()
+    print()
+    print(f"Parse time: {totals['old_ms']:.1f} ms -> {totals['new_ms']:.1f} ms ({totals['old_ms'] / totals['new_ms']:.1f}x)")
+    print(f"Peak memory: {totals['old_peak_kb']:.0f} KB -> {totals['new_peak_kb']:.0f} KB")
+    print(f"Data frames: {totals['old_frame_kb']:.0f} KB -> {totals['new_frame_kb']:.0f} KB")
+
+
+if __name__ == "__main__":
+    benchmark_json_loading(*sys.argv[1:2])
@@ -0,0 +1,183 @@
+import argparse
+import gzip
+import json
+import pathlib
+import re
+import shutil
+import subprocess
+import sys
+
+from metadata import CURRENT_EVENT
+
+from utils import json_utils, statbotics_utils, tba_utils
+from utils.scout_radioz_utils import MATCH_SCOUTING_STORE_FILE, build_match_scouting_store
+
+script_directory = pathlib.Path(__file__).resolve().parent
+
+DEFAULT_OUTPUT_DIRECTORY = script_directory / "build" / "app"
+DEFAULT_REPORT_FILE = script_directory / "build" / "bundle_report.json"
+
+# The app's entry point and the top level modules it imports. The utils modules are found by following its imports
+APP_FILES = ["app.py", "metadata.py"]
+
+# The packages the app needs, which shinylive installs when it starts. shinylive runs its own shiny, so the pin there
+# (which is for benchmark_app.py) is left out
+REQUIREMENTS_FILE = "requirements.txt"
+
+# Matches "from utils import a, b", "from utils import (a, b)", "from utils.a import b" and "import utils.a"
+UTILS_IMPORT_PATTERN = re.compile(r"^[ \t]*(?:from utils import (?:\(([^)]*)\)|([\w, \t]+))|from utils\.(\w+) import|import utils\.(\w+))", re.MULTILINE)
+
+
+############################################
+# Bundle Contents
+############################################
+def __imported_utils(source_files):
+    # Every utils module the files import, directly or through another utils module
+    pending = list(source_files)
+    modules = set()
+    while pending:
+        source = pending.pop().read_text()
+        for names_in_parentheses, names, from_module, import_module in UTILS_IMPORT_PATTERN.findall(source):
+            for module in [*names_in_parentheses.split(","), *names.split(","), from_module, import_module]:
+                module = module.strip()
+                if module and module not in modules and (script_directory / "utils" / f"{module}.py").exists():
+                    modules.add(module)
+                    pending.append(script_directory / "utils" / f"{module}.py")
+    return sorted(modules)
+
+
+def __write_requirements(output_file):
+    with open(script_directory / REQUIREMENTS_FILE, "r") as f:
+        requirements = [re.sub(r"^shiny\s*==.*$", "shiny", line.strip()) for line in f if line.strip()]
+    output_file.write_text("\n".join(requirements) + "\n")
+
+
+def __write_trimmed_json(source_file: pathlib.Path, output_file: pathlib.Path, fields, keep=lambda record: True):
+    # Only the fields the app loads, minified. Loading the result gives exactly the same data frame as the original.
+    # A source that wasn't scraped is left out, the same as the app does without it
+    if not source_file.exists():
+        return
+
+    with open(source_file, "r") as f:
+        records = [json_utils.select_fields(record, fields) for record in json_utils.iter_json_array(f) if keep(record)]
+
+    with open(output_file, "w") as f:
+        json.dump(records, f, separators=(",", ":"))
+
+
+def __bundle_event(event: str, output_directory: pathlib.Path):
+    event_directory = script_directory / "data" / event
+    bundle_directory = output_directory / "data" / event
+    bundle_directory.mkdir(parents=True)
+
+    # The app only looks at the qualification matches
+    __write_trimmed_json(event_directory / "tba_matches.json", bundle_directory / "tba_matches.json", tba_utils.EVENT_MATCH_FIELDS, keep=lambda match: match.get("comp_level") == "qm")
+    __write_trimmed_json(event_directory / "statbotics_matches.json", bundle_directory / "statbotics_matches.json", statbotics_utils.STATBOTICS_MATCH_FIELDS)
+
+    # Small enough to copy as is
+    if (event_directory / "pit_scouting.csv").exists():
+        shutil.copyfile(event_directory / "pit_scouting.csv", bundle_directory / "pit_scouting.csv")
+
+    # The precalculated store is smaller than the csv and doesn't need the derived metrics worked out on startup
+    store_file = event_directory / MATCH_SCOUTING_STORE_FILE
+    if store_file.exists():
+        shutil.copyfile(store_file, bundle_directory / MATCH_SCOUTING_STORE_FILE)
+    else:
+        build_match_scouting_store(event_directory / "match_scouting.csv", bundle_directory / MATCH_SCOUTING_STORE_FILE)
+
+
+def build_bundle(events, output_directory: pathlib.Path = DEFAULT_OUTPUT_DIRECTORY) -> dict:
+    """
+    Builds a directory holding just what the exported app needs: the app, the utils modules it imports, and the
+    selected events' data in the form the app loads fastest. It can be exported with shinylive in place of the
+    whole repository.
+    :param events: The events to include. The first one should be the one the app opens on (CURRENT_EVENT)
+    :param output_directory: Where to build it. Anything already there is deleted
+    :return: A report of what went into the bundle. See bundle_report
+    """
+    if output_directory.exists():
+        shutil.rmtree(output_directory)
+    (output_directory / "utils").mkdir(parents=True)
+
+    for filename in APP_FILES:
+        shutil.copyfile(script_directory / filename, output_directory / filename)
+    for module in __imported_utils([script_directory / filename for filename in APP_FILES]):
+        shutil.copyfile(script_directory / "utils" / f"{module}.py", output_directory / "utils" / f"{module}.py")
+    __write_requirements(output_directory / REQUIREMENTS_FILE)
+
+    for event in events:
+        __bundle_event(event, output_directory)
+
+    return bundle_report(output_directory)
+
+
+############################################
+# Size Report
+############################################
+def __directory_files(directory: pathlib.Path):
+    # The files shinylive would pick up from a directory: everything but hidden files and caches
+    for path in sorted(directory.rglob("*")):
+        relative = path.relative_to(directory)
+        if path.is_file() and not any(part.startswith(".") or part == "__pycache__" for part in relative.parts):
+            yield relative, path
+
+
+def bundle_report(directory: pathlib.Path) -> dict:
+    """
+    Measures a bundle
+    :param directory: The bundle's directory
+    :return: The size of every file in it, raw and gzipped (about what it costs to download), and the totals
+    """
+    files = {}
+    for relative, path in __directory_files(directory):
+        content = path.read_bytes()
+        files[relative.as_posix()] = {"bytes": len(content), "gzip_bytes": len(gzip.compress(content))}
+
+    return {
+        "files": files,
+        "total_bytes": sum(file["bytes"] for file in files.values()),
+        "total_gzip_bytes": sum(file["gzip_bytes"] for file in files.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds a trimmed app bundle holding only the selected events, and optionally exports it with shinylive")
+    parser.add_argument("events", nargs="*", default=[CURRENT_EVENT], help="The events to include, the current event by default")
+    parser.add_argument("--output", type=pathlib.Path, default=DEFAULT_OUTPUT_DIRECTORY, help="Where to build the bundle")
+    parser.add_argument("--site", type=pathlib.Path, help="If given, the bundle is exported with shinylive to this directory")
+    parser.add_argument("--report", type=pathlib.Path, default=DEFAULT_REPORT_FILE, help="Where to save the size report")
+    args = parser.parse_args()
+
+    for event in args.events:
+        if not (script_directory / "data" / event / "tba_matches.json").exists():
+            parser.error(f"{event} hasn't been scraped")
+
+    report = build_bundle(args.events, args.output)
+    report["events"] = args.events
+    report["full_repository_bytes"] = sum(path.stat().st_size for _, path in __directory_files(script_directory) if not path.is_relative_to(args.output.resolve()))
+
+    if args.site is not None:
+        if shutil.which("shinylive") is None:
+            sys.exit("shinylive isn't installed, pip install -r requirements-live.txt")
+        subprocess.run(["shinylive", "export", str(args.output), str(args.site)], check=True)
+
+        # Everything the browser downloads for the app itself ends up in app.json, besides Pyodide and its packages
+        app_json = args.site / "app.json"
+        if app_json.exists():
+            content = app_json.read_bytes()
+            report["app_json_bytes"] = len(content)
+            report["app_json_gzip_bytes"] = len(gzip.compress(content))
+
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=4)
+
+    for name, file in report["files"].items():
+        print(f"  {name}: {file['bytes'] / 1024:.1f} KB ({file['gzip_bytes'] / 1024:.1f} KB gzipped)")
+    print(f"Bundle: {report['total_bytes'] / 1024:.1f} KB ({report['total_gzip_bytes'] / 1024:.1f} KB gzipped), the whole repository is {report['full_repository_bytes'] / 1024:.1f} KB")
+    if "app_json_bytes" in report:
+        print(f"app.json: {report['app_json_bytes'] / 1024:.1f} KB ({report['app_json_gzip_bytes'] / 1024:.1f} KB gzipped)")
+
+
+if __name__ == "__main__":
+    main()
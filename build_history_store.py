@@ -0,0 +1,24 @@
+import argparse
+import pathlib
+
+from utils.history_utils import HistoryStore, DEFAULT_HISTORY_DIRECTORY
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adds every scraped event under data/ to the history store")
+    parser.add_argument("--data-directory", type=pathlib.Path, default=pathlib.Path(__file__).resolve().parent / "data")
+    parser.add_argument("--history-directory", type=pathlib.Path, default=DEFAULT_HISTORY_DIRECTORY)
+    args = parser.parse_args()
+
+    store = HistoryStore(args.history_directory)
+    ingested = store.ingest_events(args.data_directory)
+    removed = store.compact()
+
+    print(f"Added {len(ingested)} event snapshots: {', '.join(ingested) if ingested else 'none changed'}")
+    if removed:
+        print(f"Deleted {len(removed)} replaced snapshots: {', '.join(removed)}")
+    print(store.events().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
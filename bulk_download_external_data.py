@@ -0,0 +1,167 @@
+import argparse
+import json
+import pathlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from metadata import SCOUT_RADIOZ_ORG
+
+from download_external_data import download_external_data
+from utils import http_utils
+from utils.tba_utils import request_events
+
+# Official events only, i.e. skip offseason (99) and preseason (100) events
+OFFICIAL_EVENT_TYPES = [0, 1, 2, 3, 4, 5]
+
+DEFAULT_RATE_LIMITS = {
+    "www.thebluealliance.com": 10,
+    "api.statbotics.io": 5,
+    "scoutradioz.com": 2,
+}
+
+DEFAULT_PROGRESS_FILE = pathlib.Path(__file__).resolve().parent / ".bulk_scrape_progress.json"
+
+
+class ScrapeProgress:
+    """
+    Keeps track of which events have been scraped, and saves it to disk after every event so that an interrupted
+    run can pick up where it left off.
+    """
+
+    def __init__(self, progress_file: pathlib.Path, restart: bool = False):
+        self.progress_file = progress_file
+        self.lock = threading.Lock()
+
+        self.completed = {}
+        self.failed = {}
+        if progress_file.exists() and not restart:
+            with open(progress_file, "r") as f:
+                saved = json.load(f)
+            self.completed = saved.get("completed", {})
+            self.failed = saved.get("failed", {})
+
+    def is_completed(self, event: str) -> bool:
+        return event in self.completed
+
+    def mark_completed(self, event: str, elapsed: float):
+        with self.lock:
+            self.completed[event] = round(elapsed, 2)
+            self.failed.pop(event, None)
+            self.__save()
+
+    def mark_failed(self, event: str, error: Exception):
+        with self.lock:
+            self.failed[event] = str(error)
+            self.__save()
+
+    def __save(self):
+        temp_file = self.progress_file.with_suffix(".tmp")
+        with open(temp_file, "w") as f:
+            json.dump({"completed": self.completed, "failed": self.failed}, f, indent=4)
+        temp_file.replace(self.progress_file)
+
+
+def find_events(year: int, week: int = None):
+    """
+    Looks up the official events for a season
+    :param year: The season
+    :param week: If given, only return events from this week. Weeks are numbered starting at 1, like the schedule
+        (TBA numbers them from 0)
+    :return: The event keys, sorted
+    """
+    events = request_events(year)
+    events = [e for e in events if e["event_type"] in OFFICIAL_EVENT_TYPES]
+    if week is not None:
+        events = [e for e in events if e.get("week") == week - 1]
+
+    return sorted(e["key"] for e in events)
+
+
+def bulk_download_external_data(events, org=SCOUT_RADIOZ_ORG, max_workers=4, progress_file=DEFAULT_PROGRESS_FILE, restart=False, update_history=False):
+    """
+    Downloads the external data for many events. Events are scraped by a bounded pool of workers, and each event
+    that finishes is recorded so a rerun skips it.
+    :param events: The event keys to scrape
+    :param org: The Scout Radioz org to download the scouting data from
+    :param max_workers: How many events are scraped at the same time
+    :param progress_file: Where the progress is recorded
+    :param restart: If true, any recorded progress is thrown away and every event is scraped
+    :param update_history: If true, every event that is scraped is added to the history store
+    :return: The progress after the run
+    """
+    progress = ScrapeProgress(progress_file, restart=restart)
+
+    remaining = [event for event in events if not progress.is_completed(event)]
+    print(f"Scraping {len(remaining)} of {len(events)} events ({len(events) - len(remaining)} already done)")
+
+    def scrape(event):
+        start = time.perf_counter()
+        download_external_data(event, org=org, update_history=update_history)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(scrape, event): event for event in remaining}
+        for future in as_completed(futures):
+            event = futures[future]
+            if future.exception() is None:
+                progress.mark_completed(event, future.result())
+            else:
+                print(f"{event} FAILED - {future.exception()}")
+                progress.mark_failed(event, future.exception())
+
+    print(f"Finished: {len(progress.completed)} completed, {len(progress.failed)} failed")
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Downloads the external data for many events at once")
+    parser.add_argument("events", nargs="*", help="Event keys to scrape (i.e. 2025ohcl)")
+    parser.add_argument("--year", type=int, help="Scrape every official event in this season")
+    parser.add_argument("--week", type=int, help="Only scrape the events from this week of the season (requires --year)")
+    parser.add_argument("--org", default=SCOUT_RADIOZ_ORG, help="The Scout Radioz org to download scouting data from")
+    parser.add_argument("--jobs", type=int, default=4, help="How many events to scrape at the same time")
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        default=[],
+        metavar="HOST=RPS",
+        help="Maximum requests per second for a host. Can be given multiple times",
+    )
+    parser.add_argument("--progress-file", type=pathlib.Path, default=DEFAULT_PROGRESS_FILE)
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved progress and scrape everything")
+    parser.add_argument("--clear-cache", action="store_true", help="Throw away every cached response first, so everything is downloaded again")
+    parser.add_argument("--history", action="store_true", help="Also add every event to the history store")
+    args = parser.parse_args()
+
+    if args.week is not None and args.year is None:
+        parser.error("--week requires --year")
+
+    rate_limits = dict(DEFAULT_RATE_LIMITS)
+    for rate_limit in args.rate_limit:
+        host, requests_per_second = rate_limit.split("=")
+        rate_limits[host] = float(requests_per_second)
+    for host, requests_per_second in rate_limits.items():
+        http_utils.set_rate_limit(host, requests_per_second)
+
+    if args.clear_cache:
+        http_utils.clear_cache()
+
+    events = list(args.events)
+    if args.year is not None:
+        events += find_events(args.year, args.week)
+    if not events:
+        parser.error("No events given. Pass event keys, or --year (and optionally --week)")
+
+    bulk_download_external_data(
+        list(dict.fromkeys(events)),
+        org=args.org,
+        max_workers=args.jobs,
+        progress_file=args.progress_file,
+        restart=args.restart,
+        update_history=args.history,
+    )
+
+
+if __name__ == "__main__":
+    main()
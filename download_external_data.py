@@ -1,33 +1,106 @@
+import argparse
 import pathlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from metadata import SCOUT_RADIOZ_ORG, CURRENT_EVENT
 
-from utils.scout_radioz_utils import download_scout_radioz_match_scouting, download_scout_radioz_pit_scouting
+from utils import http_utils
+from utils.scout_radioz_utils import (
+    download_scout_radioz_match_scouting,
+    download_scout_radioz_pit_scouting,
+    build_match_scouting_store,
+    MATCH_SCOUTING_STORE_FILE,
+)
 from utils.statbotics_utils import (
     download_statbotics_matches,
     download_statbotics_event_teams,
 )
 from utils.tba_utils import download_tba_event_matches
+from utils.history_utils import HistoryStore
+
+
+def __timed(function, *args):
+    start = time.perf_counter()
+    changed = function(*args)
+    return time.perf_counter() - start, changed
+
 
+def __download_match_scouting(org, event, data_directory):
+    changed = download_scout_radioz_match_scouting(org, event, data_directory / "match_scouting.csv")
 
+    # Precalculate the derived metrics so the app doesn't have to do it on startup. The archive isn't byte for
+    # byte reproducible, so only rebuild it when the scouting data actually changed.
+    store_file = data_directory / MATCH_SCOUTING_STORE_FILE
+    if changed or not store_file.exists():
+        build_match_scouting_store(data_directory / "match_scouting.csv", store_file)
 
-def download_external_data(event):
+    return changed
+
+
+def download_external_data(event, org=SCOUT_RADIOZ_ORG, update_history=False):
     """
-    Downloads the external data (Statbotics, TBA, etc) for a specific event
+    Downloads the external data (Statbotics, TBA, etc) for a specific event. All of the sources are fetched
+    concurrently, and the time spent on each one is printed once they have all finished.
     :param event: The event key
+    :param org: The Scout Radioz org to download the scouting data from
+    :param update_history: If true, the new snapshot is added to the history store, replacing the event's last one.
+        A failure there is printed but doesn't fail the scrape, the event's data has already been saved
     """
     script_directory = pathlib.Path(__file__).resolve().parent
 
     data_directory = script_directory / "data" / event
     data_directory.mkdir(parents=True, exist_ok=True)
 
-    download_statbotics_matches(event, data_directory / "statbotics_matches.json")
-    download_statbotics_event_teams(event, data_directory / "statbotics_teams.json")
-    download_tba_event_matches(event, data_directory / "tba_matches.json")
+    sources = {
+        "Statbotics Matches": (download_statbotics_matches, event, data_directory / "statbotics_matches.json"),
+        "Statbotics Teams": (download_statbotics_event_teams, event, data_directory / "statbotics_teams.json"),
+        "TBA Matches": (download_tba_event_matches, event, data_directory / "tba_matches.json"),
+        "Scout Radioz Match Scouting": (__download_match_scouting, org, event, data_directory),
+        "Scout Radioz Pit Scouting": (download_scout_radioz_pit_scouting, org, event, data_directory / "pit_scouting.csv"),
+    }
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        futures = {name: executor.submit(__timed, *source) for name, source in sources.items()}
+
+    print(f"Downloaded {event} in {time.perf_counter() - start:.2f}s")
+    errors = []
+    for name, future in futures.items():
+        if future.exception() is None:
+            elapsed, changed = future.result()
+            print(f"  {name}: {elapsed:.2f}s{'' if changed else ' (unchanged)'}")
+        else:
+            print(f"  {name}: FAILED - {future.exception()}")
+            errors.append(future.exception())
+
+    # Everything that could be saved has been, but still fail the scrape
+    if errors:
+        raise errors[0]
+
+    if update_history:
+        try:
+            store = HistoryStore()
+            if store.ingest_event(data_directory):
+                store.compact()
+                print(f"  Added {event} to the history store")
+        except Exception as e:
+            print(f"  Couldn't add {event} to the history store: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Downloads the external data for an event")
+    parser.add_argument("event", nargs="?", default=CURRENT_EVENT, help="The event key, the current event by default")
+    parser.add_argument("--org", default=SCOUT_RADIOZ_ORG, help="The Scout Radioz org to download scouting data from")
+    parser.add_argument("--clear-cache", action="store_true", help="Throw away every cached response first, so everything is downloaded again")
+    parser.add_argument("--history", action="store_true", help="Also add the event to the history store")
+    args = parser.parse_args()
+
+    if args.clear_cache:
+        http_utils.clear_cache()
 
-    download_scout_radioz_match_scouting(SCOUT_RADIOZ_ORG, event, data_directory / "match_scouting.csv")
-    download_scout_radioz_pit_scouting(SCOUT_RADIOZ_ORG, event, data_directory / "pit_scouting.csv")
+    download_external_data(args.event, org=args.org, update_history=args.history)
 
 
 if __name__ == "__main__":
-    download_external_data(CURRENT_EVENT)
+    main()
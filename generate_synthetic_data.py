@@ -0,0 +1,64 @@
+import argparse
+import pathlib
+
+from metadata import OUR_TEAM_NUMBER, SCOUT_RADIOZ_ORG
+
+from utils.history_utils import HistoryStore, DEFAULT_HISTORY_DIRECTORY
+from utils.synthetic_data_utils import (
+    SyntheticSeason,
+    seed_http_cache,
+    write_event,
+    DEFAULT_NUM_TEAMS,
+    DEFAULT_MATCHES_PER_TEAM,
+    SYNTHETIC_EVENT_CODE,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes made up data/<event> directories, for load testing the app and the scrape")
+    parser.add_argument("--teams", type=int, default=DEFAULT_NUM_TEAMS, help="How many teams are at each event (i.e. 75 for a championship division)")
+    parser.add_argument("--matches-per-team", type=int, default=DEFAULT_MATCHES_PER_TEAM)
+    parser.add_argument("--duplicate-scout-rate", type=float, default=0.0, help="The odds that a robot's match is scouted twice")
+    parser.add_argument("--events", type=int, default=1, help="How many events are in the season")
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--event-code", default=SYNTHETIC_EVENT_CODE, help="Events are keyed <year><event-code>, numbered when there are several")
+    parser.add_argument("--org", default=SCOUT_RADIOZ_ORG, help="The Scout Radioz org the scouting is exported from")
+    parser.add_argument("--include-team", type=int, action="append", default=[OUR_TEAM_NUMBER], help="A team that is at every event")
+    parser.add_argument("--seed", type=int, help="Seed for repeatable data")
+    parser.add_argument("--data-directory", type=pathlib.Path, default=pathlib.Path(__file__).resolve().parent / "data")
+    parser.add_argument("--seed-http-cache", action="store_true", help="Also seed the http cache, so the scrape can be replayed offline with HTTP_CACHE_OFFLINE=1")
+    parser.add_argument("--update-history", action="store_true", help="Also add the events to the history store")
+    parser.add_argument("--history-directory", type=pathlib.Path, default=DEFAULT_HISTORY_DIRECTORY)
+    args = parser.parse_args()
+
+    if args.teams < 6:
+        parser.error("--teams needs to be at least 6 to fill a match")
+
+    season = SyntheticSeason(
+        num_teams=args.teams,
+        matches_per_team=args.matches_per_team,
+        num_events=args.events,
+        duplicate_scout_rate=args.duplicate_scout_rate,
+        year=args.year,
+        event_code=args.event_code,
+        org=args.org,
+        include_teams=args.include_team,
+        seed=args.seed,
+    )
+
+    store = HistoryStore(args.history_directory) if args.update_history else None
+    for event, files in season.generate().items():
+        event_directory = args.data_directory / event
+        write_event(event_directory, files)
+        if args.seed_http_cache:
+            seed_http_cache(event, args.org, files)
+        if store is not None:
+            store.ingest_event(event_directory)
+
+        num_matches = len(files["tba_matches.json"])
+        num_rows = files["match_scouting.csv"].count("\n")
+        print(f"Wrote {event_directory}: {args.teams} teams, {num_matches} matches, {num_rows} scouting rows")
+
+
+if __name__ == "__main__":
+    main()
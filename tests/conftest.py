@@ -0,0 +1,45 @@
+import functools
+import http.server
+import threading
+
+import pytest
+
+from utils import http_utils
+
+
+class RecordingHandler(http.server.SimpleHTTPRequestHandler):
+    # Serves files like python -m http.server, but records the path and status of every request instead of logging it
+    def log_request(self, code="-", size="-"):
+        self.server.requests.append((self.path, int(code)))
+
+
+@pytest.fixture
+def served_directory(tmp_path):
+    directory = tmp_path / "served"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def http_server(served_directory):
+    """
+    A local http server for served_directory. Yields its base url, and the (path, status) of every request it got
+    """
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(RecordingHandler, directory=str(served_directory)))
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}", server.requests
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def http_cache(tmp_path, monkeypatch):
+    # Every test gets its own empty cache, and never replays offline unless it asks to
+    monkeypatch.setattr(http_utils, "CACHE_DIRECTORY", tmp_path / "http_cache")
+    monkeypatch.setattr(http_utils, "OFFLINE", False)
+    return tmp_path / "http_cache"
+
@@ -0,0 +1,78 @@
+import os
+import time
+
+import pytest
+
+from utils import http_utils
+
+
+def __serve(served_directory, name, content, mtime):
+    path = served_directory / name
+    path.write_bytes(content)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_revalidated_response_is_reused(http_server, served_directory):
+    base_url, requests = http_server
+    __serve(served_directory, "matches.json", b"[1, 2, 3]", time.time() - 60)
+
+    first = http_utils.get(f"{base_url}/matches.json", ttl=0)
+    second = http_utils.get(f"{base_url}/matches.json", ttl=0)
+
+    assert not first.from_cache and first.content == b"[1, 2, 3]"
+    # The server only answered 304, so the body came out of the cache
+    assert second.from_cache and second.status_code == 200 and second.content == b"[1, 2, 3]"
+    assert [status for _, status in requests] == [200, 304]
+
+
+def test_changed_file_is_downloaded_again(http_server, served_directory):
+    base_url, requests = http_server
+    path = __serve(served_directory, "matches.json", b"[1]", time.time() - 60)
+    http_utils.get(f"{base_url}/matches.json", ttl=0)
+
+    __serve(served_directory, "matches.json", b"[1, 2]", path.stat().st_mtime + 10)
+    response = http_utils.get(f"{base_url}/matches.json", ttl=0)
+
+    assert not response.from_cache and response.content == b"[1, 2]"
+    assert [status for _, status in requests] == [200, 200]
+
+
+def test_fresh_response_skips_the_server(http_server, served_directory):
+    base_url, requests = http_server
+    __serve(served_directory, "teams.json", b"{}", time.time() - 60)
+
+    http_utils.get(f"{base_url}/teams.json", ttl=60)
+    response = http_utils.get(f"{base_url}/teams.json", ttl=60)
+
+    assert response.from_cache and response.content == b"{}"
+    assert len(requests) == 1
+
+
+def test_offline_replays_the_cache(http_server, served_directory, monkeypatch):
+    base_url, requests = http_server
+    __serve(served_directory, "matches.json", b"[1, 2, 3]", time.time() - 60)
+    http_utils.get(f"{base_url}/matches.json", ttl=0)
+    http_utils.seed_cache(f"{base_url}/seeded.json", b"[4]", content_type="application/json")
+
+    monkeypatch.setattr(http_utils, "OFFLINE", True)
+
+    assert http_utils.get(f"{base_url}/matches.json", ttl=0).content == b"[1, 2, 3]"
+    assert http_utils.get(f"{base_url}/seeded.json", ttl=0).json() == [4]
+    with pytest.raises(http_utils.OfflineCacheMiss):
+        http_utils.get(f"{base_url}/missing.json", ttl=0)
+    assert len(requests) == 1
+
+
+def test_broken_cache_entry_is_a_miss(http_server, served_directory, http_cache):
+    base_url, requests = http_server
+    __serve(served_directory, "matches.json", b"[1, 2, 3]", time.time() - 60)
+    http_utils.get(f"{base_url}/matches.json", ttl=0)
+
+    # As if the process died halfway through writing the body
+    body_file = next(http_cache.glob("*.body"))
+    body_file.write_bytes(body_file.read_bytes()[:2])
+    response = http_utils.get(f"{base_url}/matches.json", ttl=0)
+
+    assert not response.from_cache and response.content == b"[1, 2, 3]"
+    assert [status for _, status in requests] == [200, 200]
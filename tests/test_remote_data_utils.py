@@ -0,0 +1,82 @@
+import asyncio
+import shutil
+from pathlib import Path
+
+import pytest
+
+from utils import event_data_utils, remote_data_utils
+from utils.scout_radioz_utils import MATCH_SCOUTING_STORE_FILE
+
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+
+EVENT = "2025ohcl"
+
+
+def __copy_event(served_directory, filenames):
+    (served_directory / EVENT).mkdir()
+    for filename in filenames:
+        shutil.copyfile(DATA_DIRECTORY / EVENT / filename, served_directory / EVENT / filename)
+
+
+def test_event_is_usable_before_the_optional_files(http_server, served_directory):
+    base_url, _ = http_server
+    __copy_event(served_directory, [MATCH_SCOUTING_STORE_FILE, "tba_matches.json", "statbotics_matches.json", "pit_scouting.csv"])
+    local = event_data_utils.load_local_event(DATA_DIRECTORY, EVENT)
+
+    async def check():
+        # The optional files are held back until the event has been loaded once without them
+        release = asyncio.Event()
+
+        async def fetch(url):
+            if any(url.endswith(filename) for filename in remote_data_utils.OPTIONAL_FILES):
+                await release.wait()
+            return await remote_data_utils.fetch_bytes(url)
+
+        sources = remote_data_utils.RemoteEventSources(base_url, fetch=fetch)
+        await sources.wait_until_usable(EVENT)
+        partial_version = sources.version(EVENT)
+        partial = sources.load_event(EVENT)
+
+        release.set()
+        while sources.version(EVENT).count(":") < len(remote_data_utils.REQUIRED_FILES + remote_data_utils.OPTIONAL_FILES):
+            await asyncio.sleep(0.01)
+        return partial_version, partial, sources.version(EVENT), sources.load_event(EVENT)
+
+    partial_version, partial, full_version, full = asyncio.run(check())
+
+    assert partial.statbotics_df.empty and partial.pit_df.empty
+    assert partial.df.equals(local.df) and partial.matches_df.equals(local.matches_df)
+    assert full_version != partial_version
+    assert full.statbotics_df.equals(local.statbotics_df) and len(full.pit_df) == len(local.pit_df)
+
+
+def test_scouting_csv_is_the_fallback(http_server, served_directory):
+    base_url, requests = http_server
+    __copy_event(served_directory, ["match_scouting.csv", "tba_matches.json"])
+    local = event_data_utils.load_local_event(DATA_DIRECTORY, EVENT)
+
+    async def check():
+        sources = remote_data_utils.RemoteEventSources(base_url)
+        await sources.wait_until_usable(EVENT)
+        return sources.load_event(EVENT)
+
+    event_data = asyncio.run(check())
+
+    assert (f"/{EVENT}/{MATCH_SCOUTING_STORE_FILE}", 404) in requests
+    assert event_data.df.equals(local.df)
+
+
+def test_missing_event_raises_and_can_be_retried(http_server, served_directory):
+    base_url, _ = http_server
+
+    async def check():
+        sources = remote_data_utils.RemoteEventSources(base_url)
+        with pytest.raises(remote_data_utils.RemoteFetchError):
+            await sources.wait_until_usable(EVENT)
+
+        # Once the files are there, the next attempt starts over instead of reusing the failed one
+        __copy_event(served_directory, [MATCH_SCOUTING_STORE_FILE, "tba_matches.json"])
+        await sources.wait_until_usable(EVENT)
+        return sources.load_event(EVENT)
+
+    assert not asyncio.run(check()).df.empty
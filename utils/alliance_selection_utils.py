@@ -0,0 +1,149 @@
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.simulation_utils import MatchSimulator, SAMPLED_COLUMNS
+
+# Playoff alliances are a captain and two picks (the backup robot is ignored)
+ALLIANCE_SIZE = 3
+NUM_ALLIANCES = 8
+
+# Each reef level above the trough only has 12 branches, so robots that score the same levels get in each other's
+# way. Anything past that is assumed to go in the trough instead, which is worth 2 points in teleop.
+BRANCHES_PER_LEVEL = 12
+TELEOP_CORAL_POINTS = {"coralL2": 3, "coralL3": 4, "coralL4": 5}
+TROUGH_CORAL_POINTS = 2
+
+RANKED_COLUMNS = [
+    "win_prob",
+    "worst_win_prob",
+    "median_score",
+    "score_5%",
+    "coral_l1",
+    "coral_l2",
+    "coral_l3",
+    "coral_l4",
+    "algae",
+    "endgame_points",
+    "overflow_points_lost",
+]
+
+
+class AllianceSelectionOptimizer:
+    """
+    Scores every possible set of picks for our alliance against the alliances we are likely to face in the playoffs.
+
+    Every team's simulated matches are drawn once up front, with the same draws reused for every candidate alliance.
+    That makes scoring all of the pick combinations a handful of array operations, so the pick list can be rebuilt
+    every time a pick is made.
+    """
+
+    def __init__(self, simulator: MatchSimulator, num_simulations: int = 500, seed: Optional[int] = 0):
+        """
+        :param simulator: The match simulator for the current scouting data
+        :param num_simulations: How many matches are simulated for every team
+        :param seed: Seed for the random number generator, for repeatable results
+        """
+        self.teams = sorted(simulator.rows_by_team.keys(), key=int)
+        self.team_index = {team: i for i, team in enumerate(self.teams)}
+        self.num_simulations = num_simulations
+
+        rng = np.random.default_rng(seed)
+        teams = np.array(self.teams, dtype=object).reshape(-1, 1)
+
+        # (len(SAMPLED_COLUMNS), num_simulations, num_teams)
+        self.samples = np.moveaxis(simulator.sample_alliances(teams, num_simulations, rng), -1, 0).astype(np.float32)
+        self.mean_points = self.samples[SAMPLED_COLUMNS.index("totalPointsScored")].mean(axis=0)
+
+    def rank_picks(self, captain: str, picks: Iterable[str] = (), unavailable: Iterable[str] = ()) -> pd.DataFrame:
+        """
+        Ranks every way of filling the rest of our alliance
+        :param captain: Our alliance captain
+        :param picks: The teams we have already picked
+        :param unavailable: Teams that can't be picked anymore (captains and teams picked by other alliances)
+        :return: A data frame with one row per candidate set of picks, best first. It has the candidate teams
+            (pick_1, pick_2 when both picks are open), the average and worst case win probability against the
+            likely opposing alliances, the median and 5th percentile alliance score, and the expected coral per
+            level, algae, endgame points and points lost to the teams competing for the same branches.
+        """
+        alliance = [captain, *picks]
+        open_slots = ALLIANCE_SIZE - len(alliance)
+        alliance_rows = [self.team_index[team] for team in alliance if team in self.team_index]
+
+        taken = set(alliance) | set(unavailable)
+        candidates = np.array([self.team_index[team] for team in self.teams if team not in taken], dtype=np.int64)
+        pick_columns = [f"pick_{i + 1}" for i in range(open_slots)]
+
+        if len(candidates) < open_slots:
+            return pd.DataFrame(columns=pick_columns + RANKED_COLUMNS)
+        elif open_slots <= 0:
+            combinations = np.zeros((1, 0), dtype=np.int64)
+        elif open_slots == 1:
+            combinations = candidates[:, None]
+        else:
+            first, second = np.triu_indices(len(candidates), k=1)
+            combinations = np.stack([candidates[first], candidates[second]], axis=1)
+
+        # (len(SAMPLED_COLUMNS), num_simulations, num_combinations) sampled alliance performances
+        base = self.samples[:, :, alliance_rows].sum(axis=2, keepdims=True)
+        performance = base + self.samples[:, :, combinations].sum(axis=3)
+        scores, overflow_points = self.__alliance_score(performance)
+
+        # Opposing alliances are drafted from everyone else, strongest first
+        opponents = self.__likely_opponents(set(alliance))
+        opponent_scores, _ = self.__alliance_score(self.samples[:, :, opponents].sum(axis=3))
+
+        # An opponent that includes one of the candidates can't be faced by them
+        win_probs = np.empty((len(combinations), len(opponents)))
+        faced = np.ones((len(combinations), len(opponents)), dtype=bool)
+        for o, opponent in enumerate(opponents):
+            wins = (scores > opponent_scores[:, [o]]).mean(axis=0)
+            ties = (scores == opponent_scores[:, [o]]).mean(axis=0)
+            win_probs[:, o] = wins + ties / 2
+            faced[:, o] = ~np.isin(combinations, opponent).any(axis=1)
+
+        num_faced = np.maximum(faced.sum(axis=1), 1)
+        column = SAMPLED_COLUMNS.index
+
+        ranked = pd.DataFrame(
+            {
+                **{name: [self.teams[team] for team in combinations[:, i]] for i, name in enumerate(pick_columns)},
+                "win_prob": np.where(faced, win_probs, 0).sum(axis=1) / num_faced,
+                "worst_win_prob": np.where(faced, win_probs, 1).min(axis=1, initial=1),
+                "median_score": np.median(scores, axis=0),
+                "score_5%": np.quantile(scores, 0.05, axis=0),
+                "coral_l1": performance[column("coralL1")].mean(axis=0),
+                "coral_l2": performance[column("coralL2")].mean(axis=0),
+                "coral_l3": performance[column("coralL3")].mean(axis=0),
+                "coral_l4": performance[column("coralL4")].mean(axis=0),
+                "algae": performance[column("algaeProcessor")].mean(axis=0),
+                "endgame_points": performance[column("endgamePoints")].mean(axis=0),
+                "overflow_points_lost": overflow_points.mean(axis=0),
+            }
+        )
+
+        return ranked.sort_values(["win_prob", "median_score"], ascending=False, ignore_index=True)
+
+    def __alliance_score(self, performance: np.ndarray):
+        # Adds up the teams' points, taking away what gets lost when the alliance has more coral for a level than
+        # there are branches on it
+        overflow_points = np.zeros(performance.shape[1:], dtype=np.float32)
+        for level, points in TELEOP_CORAL_POINTS.items():
+            overflow = np.maximum(performance[SAMPLED_COLUMNS.index(level)] - BRANCHES_PER_LEVEL, 0)
+            overflow_points += overflow * (points - TROUGH_CORAL_POINTS)
+
+        return performance[SAMPLED_COLUMNS.index("totalPointsScored")] - overflow_points, overflow_points
+
+    def __likely_opponents(self, our_alliance) -> np.ndarray:
+        # A serpentine draft where the remaining teams are picked in order of their average score
+        pool = [i for i in np.argsort(-self.mean_points, kind="stable") if self.teams[i] not in our_alliance]
+        num_opponents = min(NUM_ALLIANCES - 1, len(pool) // ALLIANCE_SIZE)
+
+        opponents = np.zeros((num_opponents, ALLIANCE_SIZE), dtype=np.int64)
+        for round_number in range(ALLIANCE_SIZE):
+            order = range(num_opponents) if round_number % 2 == 0 else reversed(range(num_opponents))
+            for n, alliance in enumerate(order):
+                opponents[alliance, round_number] = pool[round_number * num_opponents + n]
+
+        return opponents
@@ -0,0 +1,147 @@
+import asyncio
+import collections
+import sys
+import threading
+from typing import Any, Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+# How much memory the shared cache can hold before the least recently used entries are dropped
+SHARED_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+
+class SharedCache:
+    """
+    A process wide, memory bounded LRU cache of computed results, so that every session looking at the same thing
+    shares one copy of it instead of each computing its own.
+
+    Keys are expected to start with whatever identifies the data they were computed from (i.e. the event and its
+    data version), which is what invalidate matches on when new data lands. If a key is asked for while another
+    thread is already computing it, the second caller waits for that result instead of computing it again. The one
+    exception is a caller on the event loop, which computes it too rather than freeze every session while it waits.
+    """
+
+    def __init__(self, max_bytes: int = SHARED_CACHE_MAX_BYTES):
+        """
+        :param max_bytes: How much memory the cached values can use, as estimated by estimate_size
+        """
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (value, estimated size)
+        self.__entries: "collections.OrderedDict[Hashable, tuple]" = collections.OrderedDict()
+        self.__in_progress = {}
+        self.__lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        :param key: What the value is cached under
+        :param compute: Computes the value if it isn't cached
+        :return: The cached (or newly computed) value
+        """
+        # Set if this caller is the one computing the value, for anyone else who asks for it in the meantime
+        in_progress = None
+        while True:
+            with self.__lock:
+                if key in self.__entries:
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return self.__entries[key][0]
+
+                computing = self.__in_progress.get(key)
+                if computing is None:
+                    in_progress = self.__in_progress[key] = threading.Event()
+                    self.misses += 1
+                    break
+
+                # Waiting on the event loop would freeze every session until the other thread is done, so the value is
+                # computed here as well
+                if self.__on_event_loop():
+                    self.misses += 1
+                    break
+
+            # Someone else is computing it. If they failed, the next pass around computes it here instead
+            computing.wait()
+
+        try:
+            value = compute()
+            self.put(key, value)
+            return value
+        finally:
+            if in_progress is not None:
+                with self.__lock:
+                    self.__in_progress.pop(key).set()
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Caches a value, dropping the least recently used values until everything fits. A value that is bigger
+        than the whole cache isn't kept.
+        :param key: What the value is cached under
+        :param value: The value
+        """
+        size = estimate_size(value)
+
+        with self.__lock:
+            self.__discard(key)
+            if size > self.max_bytes:
+                return
+
+            self.__entries[key] = (value, size)
+            self.num_bytes += size
+            while self.num_bytes > self.max_bytes:
+                self.__discard(next(iter(self.__entries)))
+
+    def invalidate(self, key_prefix: tuple = ()) -> int:
+        """
+        Drops every value whose key starts with the given prefix
+        :param key_prefix: The start of the keys to drop. Everything is dropped if it is empty
+        :return: How many values were dropped
+        """
+        with self.__lock:
+            keys = [key for key in self.__entries if isinstance(key, tuple) and key[: len(key_prefix)] == key_prefix]
+            for key in keys:
+                self.__discard(key)
+            return len(keys)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @staticmethod
+    def __on_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    def __discard(self, key: Hashable):
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.num_bytes -= entry[1]
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Roughly estimates how much memory a value takes up, looking inside the containers and data frames that outputs
+    are built from
+    :param value: The value
+    :return: The estimated size in bytes
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (str, collections.UserString)):
+        return sys.getsizeof(str(value))
+    # Tags are about as big as the html they render to
+    if hasattr(value, "get_html_string"):
+        return sys.getsizeof(value.get_html_string())
+    return sys.getsizeof(value)
@@ -0,0 +1,256 @@
+import collections
+import functools
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from utils import (
+    alliance_selection_utils,
+    match_table_utils,
+    opr_utils,
+    ranking_utils,
+    reconciliation_utils,
+    scout_radioz_utils,
+    simulation_utils,
+    statbotics_utils,
+    tba_utils,
+    team_stats_utils,
+)
+
+# How many events are kept loaded at once. Switching back to one of these is instant, anything older is loaded again
+MAX_LOADED_EVENTS = 3
+
+# The files an event is loaded from. When any of them changes, the event's data version does too
+EVENT_DATA_FILES = ["match_scouting.csv", scout_radioz_utils.MATCH_SCOUTING_STORE_FILE, "tba_matches.json", "statbotics_matches.json", "pit_scouting.csv"]
+
+
+class EventData:
+    """
+    Everything the app shows for one event. The frames every page needs are built up front, the heavier models
+    (key stats with the OPRs, ranking projections and the pick list) the first time they are used.
+    """
+
+    def __init__(
+        self,
+        event: str,
+        df: pd.DataFrame,
+        matches_df: pd.DataFrame,
+        statbotics_df: pd.DataFrame,
+        apply_scouting_corrections: bool = False,
+        pit_df: Optional[pd.DataFrame] = None,
+    ):
+        """
+        :param event: The event key
+        :param df: The match scouting data, as returned by scout_radioz_utils.load_match_scouting
+        :param matches_df: The TBA matches, as returned by tba_utils.load_event_matches
+        :param statbotics_df: The Statbotics matches, as returned by statbotics_utils.load_statbotics_matches
+        :param apply_scouting_corrections: If true, the scouted piece counts are scaled so that every fully scouted
+            alliance adds up to its official TBA breakdown before anything else is calculated from them
+        :param pit_df: The pit scouting data, as returned by scout_radioz_utils.load_pit_scouting. Empty if not given
+        """
+        self.event = event
+        # Identifies the snapshot of the data this was built from, set by whoever loaded it
+        self.version = ""
+        self.matches_df = matches_df
+        self.statbotics_df = statbotics_df
+        self.pit_df = pit_df if pit_df is not None else pd.DataFrame(columns=list(scout_radioz_utils.PIT_SCOUTING_SCHEMA))
+
+        # Check the scouting against the official results. The match table only points at scouting row positions,
+        # which the corrections don't change, so it can be built first
+        self.match_table = match_table_utils.build_match_table(matches_df, statbotics_df, df)
+        self.scouting_reconciliation, self.scouting_reconciliation_by_row = reconciliation_utils.reconcile_match_scouting(self.match_table, df)
+        if apply_scouting_corrections:
+            df = reconciliation_utils.apply_correction_factors(df, reconciliation_utils.correction_factors(self.scouting_reconciliation))
+        self.df = df
+
+        self.df_unique_teams = df.drop_duplicates(subset=["team_key"], keep="first")
+
+        # Everything the match preview shows is a slice of these, so they are only built when the data is loaded
+        self.team_stats_cube = team_stats_utils.build_team_stats_cube(df)
+        self.averages_by_team_all = team_stats_utils.team_stats(self.team_stats_cube, self.team_stats_cube.index)
+        self.rows_by_team = df.groupby("team_key").indices
+        self.team_matches_df = tba_utils.event_matches_to_team_matches(matches_df)
+        self.matches_by_team = tba_utils.build_team_match_index(self.team_matches_df)
+        self.match_keys_by_number = dict(zip(self.match_table["match_number"], self.match_table.index))
+        self.match_simulator = simulation_utils.MatchSimulator(df)
+
+        self.opr_solver = opr_utils.OprSolver()
+
+    def take_over_models(self, previous: "EventData"):
+        """
+        Takes over the incremental models (the OPR solve and the ranking projector's simulated matches) of an older
+        version of the same event, so that after a scrape they only work in what changed instead of starting over.
+        Has to be called before anything is read from this version
+        :param previous: The EventData this one replaces
+        """
+        self.opr_solver = previous.opr_solver
+        if "ranking_projector" in previous.__dict__:
+            self.ranking_projector = previous.ranking_projector
+
+    @functools.cached_property
+    def key_stats_df(self) -> pd.DataFrame:
+        return self.averages_by_team_all.merge(self.opr_solver.update(self.matches_df), on="team_key", how="left")
+
+    @functools.cached_property
+    def ranking_projector(self) -> ranking_utils.RankingProjector:
+        return ranking_utils.RankingProjector()
+
+    @functools.cached_property
+    def alliance_optimizer(self) -> alliance_selection_utils.AllianceSelectionOptimizer:
+        return alliance_selection_utils.AllianceSelectionOptimizer(self.match_simulator)
+
+
+def load_local_event(data_directory: Path, event: str, apply_scouting_corrections: bool = False) -> EventData:
+    """
+    Loads an event from its scraped data on disk
+    :param data_directory: The directory holding the data/<event> directories
+    :param event: The event key
+    :param apply_scouting_corrections: See EventData
+    :return: The event's data
+    """
+    event_directory = Path(data_directory) / event
+    print(f"Loading local data from: {event_directory}")
+
+    pit_file = event_directory / "pit_scouting.csv"
+
+    return EventData(
+        event,
+        scout_radioz_utils.load_match_scouting(event_directory / "match_scouting.csv"),
+        tba_utils.load_event_matches(event_directory / "tba_matches.json"),
+        statbotics_utils.load_statbotics_matches(event_directory / "statbotics_matches.json"),
+        apply_scouting_corrections=apply_scouting_corrections,
+        pit_df=scout_radioz_utils.load_pit_scouting(pit_file) if pit_file.exists() else None,
+    )
+
+
+def local_data_version(data_directory: Path, event: str) -> str:
+    """
+    Works out which snapshot of an event's data is on disk, without reading it
+    :param data_directory: The directory holding the data/<event> directories
+    :param event: The event key
+    :return: A string that changes whenever one of the event's data files is written
+    """
+    parts = []
+    for filename in EVENT_DATA_FILES:
+        path = Path(data_directory) / event / filename
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{filename}:{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(parts)
+
+
+def find_local_events(data_directory: Path) -> List[str]:
+    """
+    :param data_directory: The directory holding the data/<event> directories
+    :return: Every event that has been scraped, newest season first
+    """
+    events = [path.name for path in Path(data_directory).iterdir() if (path / "tba_matches.json").exists()]
+    return sorted(events, key=lambda event: (-int(event[:4]) if event[:4].isdigit() else 0, event))
+
+
+class EventDataLoader:
+    """
+    Loads events the first time they are asked for, and keeps the most recently used ones around. Every session
+    shares the same loader, so an event that one user is looking at is already loaded for the next.
+    """
+
+    def __init__(
+        self,
+        load_event: Callable[[str], EventData],
+        max_events: int = MAX_LOADED_EVENTS,
+        data_version: Optional[Callable[[str], str]] = None,
+        on_unload: Optional[Callable[[EventData], None]] = None,
+    ):
+        """
+        :param load_event: Builds the EventData for an event key
+        :param max_events: How many events are kept loaded. The least recently used one is dropped past this
+        :param data_version: Cheaply works out the current version of an event's data. A loaded event is loaded
+            again once its version changes. If not given, events are never reloaded
+        :param on_unload: Called with every EventData that is dropped, either to make room or because newer data
+            was loaded in its place
+        """
+        self.load_event = load_event
+        self.max_events = max_events
+        self.data_version = data_version
+        self.on_unload = on_unload
+        self.__events: "collections.OrderedDict[str, EventData]" = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        # event -> held while that event is being loaded. An event is only loaded by one thread at a time, without
+        # holding up lookups of every other event
+        self.__loading_locks: Dict[str, threading.Lock] = collections.defaultdict(threading.Lock)
+
+    def get(self, event: str) -> EventData:
+        """
+        :param event: The event key
+        :return: The event's data, loading it if it isn't already
+        """
+        version = self.data_version(event) if self.data_version is not None else ""
+
+        with self.__lock:
+            loaded = self.__lookup(event, version)
+            if loaded is not None:
+                return loaded
+            loading_lock = self.__loading_locks[event]
+
+        with loading_lock:
+            # Another thread might have loaded it while this one was waiting
+            with self.__lock:
+                loaded = self.__lookup(event, version)
+                if loaded is not None:
+                    return loaded
+                previous = self.__events.get(event)
+
+            event_data = self.load_event(event)
+            event_data.version = version
+            if previous is not None:
+                event_data.take_over_models(previous)
+            # Solved here rather than by whichever output asks first, which might be on the event loop
+            event_data.key_stats_df
+
+            with self.__lock:
+                replaced = self.__events.pop(event, None)
+                unloaded = [] if replaced is None else [replaced]
+                self.__events[event] = event_data
+                while len(self.__events) > self.max_events:
+                    unloaded.append(self.__events.popitem(last=False)[1])
+
+        if self.on_unload is not None:
+            for old_event_data in unloaded:
+                self.on_unload(old_event_data)
+
+        return event_data
+
+    def __lookup(self, event: str, version: str) -> Optional[EventData]:
+        # The loaded data for the event, if it is of the given version. Has to be called with the lock held
+        loaded = self.__events.get(event)
+        if loaded is None or loaded.version != version:
+            return None
+        self.__events.move_to_end(event)
+        return loaded
+
+    def clear(self):
+        """
+        Drops every loaded event, so the next time each one is asked for it is loaded from scratch
+        """
+        with self.__lock:
+            unloaded = list(self.__events.values())
+            self.__events.clear()
+
+        if self.on_unload is not None:
+            for old_event_data in unloaded:
+                self.on_unload(old_event_data)
+
+    def versions(self) -> tuple:
+        """
+        :return: The current data version of every loaded event, for noticing when new data lands
+        """
+        return tuple(self.data_version(event) if self.data_version is not None else "" for event in self.loaded_events())
+
+    def loaded_events(self) -> List[str]:
+        """
+        :return: The events that are loaded, least recently used first
+        """
+        with self.__lock:
+            return list(self.__events)
@@ -0,0 +1,365 @@
+import hashlib
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from utils import scout_radioz_utils, statbotics_utils, tba_utils
+
+# Where the store lives unless told otherwise. Every other directory under data/ is an event snapshot
+DEFAULT_HISTORY_DIRECTORY = Path(__file__).parent.parent / "data" / "history"
+
+MANIFEST_FILE = "manifest.json"
+
+# The files in an event directory that the store is built from, in the order they are fingerprinted
+SOURCE_FILES = ["match_scouting.csv", "statbotics_teams.json", "tba_matches.json"]
+
+MATCH_SCOUTING = "match_scouting"
+STATBOTICS_TEAMS = "statbotics_teams"
+TBA_TEAM_MATCHES = "tba_team_matches"
+TABLES = [MATCH_SCOUTING, STATBOTICS_TEAMS, TBA_TEAM_MATCHES]
+
+TBA_TEAM_MATCH_COLUMNS = ["team", "match_number", "alliance", "station", "score", "opponent_score", "rp", "result", "surrogate", "dq"]
+
+
+class HistoryStore:
+    """
+    Everything we have scraped about every team, across events and seasons.
+
+    The store is append only. Ingesting an event writes a new segment holding its tables, one .npy file per
+    column with the rows sorted by team, and then adds the segment to the manifest. A segment is never changed
+    after it is written, so re-ingesting an event that changed adds a new segment that replaces the old one in
+    queries, and compact deletes the ones that have been replaced. A store reloads the manifest when it changes, so
+    it sees whatever was ingested or compacted since it was opened. The manifest keeps the teams in every segment, so a team query only opens the segments that team is
+    in, and only reads that team's rows out of them. With mmap the columns are memory mapped, so a whole season
+    costs next to nothing until it is queried.
+
+    Ingesting is safe from multiple threads in one process, but not from multiple processes at once.
+    """
+
+    # Ingesting rewrites the manifest, so only one thread does it at a time (across every store in the process)
+    __ingest_lock = threading.Lock()
+
+    def __init__(self, directory: Path = DEFAULT_HISTORY_DIRECTORY, mmap: bool = True):
+        """
+        :param directory: Where the store lives. It is created on the first ingest
+        :param mmap: If true, columns are memory mapped instead of read into memory
+        """
+        self.directory = Path(directory)
+        self.mmap = mmap
+        self.__load_manifest()
+
+    ############################################
+    # Ingest
+    ############################################
+    def ingest_event(self, event_directory: Path) -> bool:
+        """
+        Adds an event snapshot (a data/<event> directory) to the store, unless the store already has this exact
+        snapshot
+        :param event_directory: The event's data directory
+        :return: True if a new segment was written
+        """
+        event_directory = Path(event_directory)
+        event = event_directory.name
+        fingerprint = self.__fingerprint(event_directory)
+
+        with HistoryStore.__ingest_lock:
+            # Another store (or thread) might have ingested since this one was opened
+            self.__load_manifest()
+            live = self.live_segments.get(event)
+            if live is not None and live["fingerprint"] == fingerprint:
+                return False
+
+            tables = {
+                MATCH_SCOUTING: self.__match_scouting_table(event_directory),
+                STATBOTICS_TEAMS: self.__statbotics_teams_table(event_directory),
+                TBA_TEAM_MATCHES: self.__tba_team_matches_table(event_directory),
+            }
+
+            segment_id = max((segment["id"] for segment in self.segments), default=-1) + 1
+            segment = {
+                "id": segment_id,
+                "event": event,
+                "directory": f"{segment_id:06d}_{event}",
+                "fingerprint": fingerprint,
+                "ingested": time.time(),
+                "tables": {},
+                "teams": [],
+            }
+
+            teams = set()
+            for table, frame in tables.items():
+                frame = frame.sort_values("team", kind="stable", ignore_index=True)
+                table_directory = self.directory / segment["directory"] / table
+                table_directory.mkdir(parents=True, exist_ok=True)
+                for column in frame.columns:
+                    np.save(table_directory / f"{column}.npy", self.__storable(frame[column]), allow_pickle=False)
+                segment["tables"][table] = {"rows": len(frame), "columns": list(frame.columns)}
+                teams.update(frame["team"].tolist())
+            segment["teams"] = sorted(int(team) for team in teams)
+
+            # The segment is only part of the store once the manifest points at it
+            self.segments.append(segment)
+            self.__save_manifest()
+            self.__index()
+
+        return True
+
+    def ingest_events(self, data_directory: Path) -> List[str]:
+        """
+        Ingests every event snapshot in a data directory
+        :param data_directory: The directory holding the data/<event> directories
+        :return: The events that got a new segment
+        """
+        ingested = []
+        for event_directory in sorted(Path(data_directory).iterdir()):
+            if event_directory.resolve() == self.directory.resolve() or not event_directory.is_dir():
+                continue
+            if not any((event_directory / filename).exists() for filename in SOURCE_FILES):
+                continue
+            if self.ingest_event(event_directory):
+                ingested.append(event_directory.name)
+        return ingested
+
+    def compact(self) -> List[str]:
+        """
+        Deletes every segment that a newer segment of the same event has replaced
+        :return: The directories of the segments that were deleted
+        """
+        with HistoryStore.__ingest_lock:
+            self.__load_manifest()
+            live_ids = {segment["id"] for segment in self.live_segments.values()}
+            superseded = [segment for segment in self.segments if segment["id"] not in live_ids]
+            if not superseded:
+                return []
+
+            # Drop them from the manifest first, so nothing is pointing at them once they are deleted
+            self.segments = [segment for segment in self.segments if segment["id"] in live_ids]
+            self.__save_manifest()
+            self.__index()
+
+            for segment in superseded:
+                shutil.rmtree(self.directory / segment["directory"], ignore_errors=True)
+
+        return [segment["directory"] for segment in superseded]
+
+    ############################################
+    # Queries
+    ############################################
+    def events(self) -> pd.DataFrame:
+        """
+        :return: A data frame with one row per event in the store, with when it was ingested and how many rows
+            and teams each table has
+        """
+        self.__refresh()
+        rows = []
+        for event, segment in sorted(self.live_segments.items()):
+            row = {"event": event, "segment": segment["id"], "ingested": pd.Timestamp(segment["ingested"], unit="s"), "teams": len(segment["teams"])}
+            row.update({f"{table}_rows": info["rows"] for table, info in segment["tables"].items()})
+            rows.append(row)
+        return pd.DataFrame(rows, columns=["event", "segment", "ingested", "teams"] + [f"{table}_rows" for table in TABLES])
+
+    def team_rows(self, table: str, team: Union[int, str]) -> pd.DataFrame:
+        """
+        Looks up a team's rows from every event it has been at
+        :param table: One of TABLES
+        :param team: The team number
+        :return: A data frame with an event column and then the table's columns
+        """
+        self.__refresh()
+        team = int(team)
+        frames = []
+        for segment in self.__team_segments.get(team, []):
+            info = segment["tables"][table]
+            teams = self.__column(segment, table, "team")
+            start, stop = np.searchsorted(teams, [team, team + 1])
+            if start == stop:
+                continue
+
+            frame = pd.DataFrame({column: np.array(self.__column(segment, table, column)[start:stop]) for column in info["columns"]})
+            frame.insert(0, "event", segment["event"])
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=["event"])
+        return pd.concat(frames, ignore_index=True)
+
+    def event_rows(self, table: str, event: str) -> pd.DataFrame:
+        """
+        Loads one of an event's tables
+        :param table: One of TABLES
+        :param event: The event key
+        :return: The table, sorted by team
+        """
+        self.__refresh()
+        segment = self.live_segments.get(event)
+        if segment is None:
+            return pd.DataFrame()
+
+        info = segment["tables"][table]
+        return pd.DataFrame({column: np.array(self.__column(segment, table, column)) for column in info["columns"]})
+
+    def team_summary(self, team: Union[int, str]) -> pd.DataFrame:
+        """
+        Boils a team's history down to one row per event, for pre-scouting
+        :param team: The team number
+        :return: A data frame with the event, how many matches were scouted and the scouted average points, the
+            Statbotics EPA and qualification rank, and the official record, average alliance score and average
+            ranking points
+        """
+        columns = ["event", "scouted_matches", "scouted_points", "epa", "qual_rank", "wins", "losses", "ties", "alliance_score", "rp"]
+
+        scouting = self.team_rows(MATCH_SCOUTING, team)
+        statbotics = self.team_rows(STATBOTICS_TEAMS, team)
+        official = self.team_rows(TBA_TEAM_MATCHES, team)
+
+        summary = pd.DataFrame({"event": sorted(self.__events_with_team(team))})
+        if not scouting.empty:
+            summary = summary.merge(
+                scouting.groupby("event").agg(scouted_matches=("match_number", "size"), scouted_points=("totalPointsScored", "mean")),
+                on="event",
+                how="left",
+            )
+        if not statbotics.empty:
+            summary = summary.merge(
+                statbotics.rename(columns={"epa.total_points.mean": "epa", "record.qual.rank": "qual_rank"})[["event", "epa", "qual_rank"]],
+                on="event",
+                how="left",
+            )
+        if not official.empty:
+            official = official[~official["surrogate"]]
+            summary = summary.merge(
+                official.groupby("event").agg(
+                    wins=("result", lambda results: (results == "W").sum()),
+                    losses=("result", lambda results: (results == "L").sum()),
+                    ties=("result", lambda results: (results == "T").sum()),
+                    alliance_score=("score", "mean"),
+                    rp=("rp", "mean"),
+                ),
+                on="event",
+                how="left",
+            )
+
+        return summary.reindex(columns=columns)
+
+    ############################################
+    # Helpers
+    ############################################
+    def __column(self, segment: Dict, table: str, column: str) -> np.ndarray:
+        path = self.directory / segment["directory"] / table / f"{column}.npy"
+        return np.load(path, mmap_mode="r" if self.mmap else None, allow_pickle=False)
+
+    def __events_with_team(self, team: int) -> List[str]:
+        return [segment["event"] for segment in self.__team_segments.get(int(team), [])]
+
+    def __load_manifest(self):
+        manifest_file = self.directory / MANIFEST_FILE
+        self.segments = []
+        self.__manifest_mtime = None
+        if manifest_file.exists():
+            self.__manifest_mtime = manifest_file.stat().st_mtime_ns
+            with open(manifest_file, "r") as f:
+                self.segments = json.load(f)["segments"]
+        self.__index()
+
+    def __refresh(self):
+        # Another process might have ingested or compacted since the manifest was read
+        manifest_file = self.directory / MANIFEST_FILE
+        mtime = manifest_file.stat().st_mtime_ns if manifest_file.exists() else None
+        if mtime != self.__manifest_mtime:
+            with HistoryStore.__ingest_lock:
+                self.__load_manifest()
+
+    def __save_manifest(self):
+        temp_file = self.directory / (MANIFEST_FILE + ".tmp")
+        with open(temp_file, "w") as f:
+            json.dump({"segments": self.segments}, f)
+        temp_file.replace(self.directory / MANIFEST_FILE)
+        self.__manifest_mtime = (self.directory / MANIFEST_FILE).stat().st_mtime_ns
+
+    def __index(self):
+        # The newest segment of every event is the live one. Team -> the live segments they show up in
+        self.live_segments: Dict[str, Dict] = {}
+        for segment in self.segments:
+            self.live_segments[segment["event"]] = segment
+
+        self.__team_segments: Dict[int, List[Dict]] = {}
+        for event, segment in sorted(self.live_segments.items()):
+            for team in segment["teams"]:
+                self.__team_segments.setdefault(team, []).append(segment)
+
+    def __fingerprint(self, event_directory: Path) -> str:
+        digest = hashlib.sha1()
+        for filename in SOURCE_FILES:
+            path = event_directory / filename
+            digest.update(filename.encode())
+            digest.update(path.read_bytes() if path.exists() else b"\0missing")
+        return digest.hexdigest()
+
+    ############################################
+    # Tables
+    ############################################
+    def __match_scouting_table(self, event_directory: Path) -> pd.DataFrame:
+        csv_file = event_directory / "match_scouting.csv"
+        if not csv_file.exists() and not (event_directory / scout_radioz_utils.MATCH_SCOUTING_STORE_FILE).exists():
+            return pd.DataFrame({"team": np.zeros(0, dtype=np.int32)})
+
+        df = scout_radioz_utils.load_match_scouting(csv_file)
+        team = pd.to_numeric(df["team_key"].astype(str), errors="coerce")
+        df = df[team.notna().to_numpy()].drop(columns=["team_key", "event_key"], errors="ignore")
+        df.insert(0, "team", team.dropna().astype(np.int32).to_numpy())
+        return df.reset_index(drop=True)
+
+    def __statbotics_teams_table(self, event_directory: Path) -> pd.DataFrame:
+        json_file = event_directory / "statbotics_teams.json"
+        if not json_file.exists():
+            return pd.DataFrame({"team": np.zeros(0, dtype=np.int32)})
+
+        return statbotics_utils.load_statbotics_teams(json_file).drop(columns=["event"], errors="ignore")
+
+    def __tba_team_matches_table(self, event_directory: Path) -> pd.DataFrame:
+        empty = pd.DataFrame({"team": np.zeros(0, dtype=np.int32)}).reindex(columns=TBA_TEAM_MATCH_COLUMNS)
+        json_file = event_directory / "tba_matches.json"
+        if not json_file.exists():
+            return empty
+
+        matches = tba_utils.load_event_matches(json_file)
+        if matches.empty:
+            return empty
+        matches = matches[(matches["alliances.red.score"] >= 0) & (matches["alliances.blue.score"] >= 0)]
+
+        frames = []
+        for alliance, opponent in [("red", "blue"), ("blue", "red")]:
+            score = matches[f"alliances.{alliance}.score"].to_numpy()
+            opponent_score = matches[f"alliances.{opponent}.score"].to_numpy()
+            for n in range(1, 4):
+                team_keys = matches[f"{alliance}{n}"]
+                frames.append(
+                    pd.DataFrame(
+                        {
+                            "team": team_keys.str[3:].astype(np.int32).to_numpy(),
+                            "match_number": matches["match_number"].to_numpy(),
+                            "alliance": alliance,
+                            "station": n,
+                            "score": score,
+                            "opponent_score": opponent_score,
+                            "rp": matches.get(f"score_breakdown.{alliance}.rp", pd.Series(np.nan, index=matches.index)).to_numpy(dtype=np.float32),
+                            "result": np.where(score > opponent_score, "W", np.where(score < opponent_score, "L", "T")),
+                            "surrogate": [team in listed for team, listed in zip(team_keys, matches[f"alliances.{alliance}.surrogate_team_keys"])],
+                            "dq": [team in listed for team, listed in zip(team_keys, matches[f"alliances.{alliance}.dq_team_keys"])],
+                        }
+                    )
+                )
+
+        return pd.concat(frames, ignore_index=True).sort_values(["team", "match_number"], ignore_index=True)
+
+    def __storable(self, column: pd.Series) -> np.ndarray:
+        # Memory mapping needs fixed width values, so text is stored as fixed width unicode
+        if pd.api.types.is_numeric_dtype(column):
+            return column.to_numpy()
+        return np.array(column.astype(object).fillna("").astype(str).tolist(), dtype=str)
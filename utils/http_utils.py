@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+from urllib.parse import urlparse
+
+
+# Enough connections for every concurrent request we make to a single host during a scrape
+POOL_SIZE = 8
+
+# Responses are cached on disk so that unchanged data can be revalidated (ETag / Last-Modified) instead of
+# downloaded again. Set HTTP_CACHE_OFFLINE=1 to replay purely from the cache without touching the network.
+CACHE_DIRECTORY = Path(os.environ.get("HTTP_CACHE_DIRECTORY", Path(__file__).parent.parent / ".http_cache"))
+MAX_CACHE_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+OFFLINE = os.environ.get("HTTP_CACHE_OFFLINE", "0") == "1"
+
+# Maximum number of requests per second that will be sent to a host. Hosts that aren't listed are not limited.
+RATE_LIMITS: Dict[str, float] = {}
+
+__sessions: Dict[str, "requests.Session"] = {}
+__sessions_lock = threading.Lock()
+__cache_lock = threading.Lock()
+__next_request_times: Dict[str, float] = {}
+__rate_limit_lock = threading.Lock()
+
+
+class OfflineCacheMiss(Exception):
+    pass
+
+
+def get_session(url: str) -> "requests.Session":
+    """
+    Gets the shared session for the host of the given url, creating it on first use. Sharing the session lets
+    every request to the same host reuse its pooled (keep-alive) connections.
+    :param url: The url that is about to be requested
+    :return: The session for that host
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    host = urlparse(url).netloc
+
+    with __sessions_lock:
+        if host not in __sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            __sessions[host] = session
+
+        return __sessions[host]
+
+
+def set_rate_limit(host: str, requests_per_second: Optional[float]):
+    """
+    Limits how quickly requests are sent to a host, across every thread
+    :param host: The host name (i.e. www.thebluealliance.com)
+    :param requests_per_second: The maximum rate, or None to remove the limit
+    """
+    if requests_per_second is None:
+        RATE_LIMITS.pop(host, None)
+    else:
+        RATE_LIMITS[host] = requests_per_second
+
+
+def __wait_for_rate_limit(url: str):
+    host = urlparse(url).netloc
+    if host not in RATE_LIMITS:
+        return
+
+    # Reserve the next free slot for this host, then sleep outside of the lock until it comes around
+    with __rate_limit_lock:
+        now = time.monotonic()
+        slot = max(now, __next_request_times.get(host, now))
+        __next_request_times[host] = slot + 1.0 / RATE_LIMITS[host]
+
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def get(url: str, ttl: Optional[float] = None, cookies: Optional[Dict[str, str]] = None, **kwargs) -> "requests.Response":
+    """
+    Performs a GET request using the shared session for the url's host.
+
+    If a ttl is given, the response goes through the on-disk cache. A cached response younger than the ttl is
+    returned without any request being made. An older one is revalidated with a conditional request, and
+    reused if the server answers 304. Responses that came out of the cache have ``from_cache`` set to True.
+    :param url: The url to request
+    :param ttl: How many seconds a cached response can be used without revalidating it. None disables the cache
+    :param cookies: Cookies to send. These are part of the cache key, since they change what the server returns
+    :param kwargs: Extra arguments passed along to requests
+    :return: The response
+    """
+    if ttl is None:
+        __wait_for_rate_limit(url)
+        response = get_session(url).get(url, cookies=cookies, **kwargs)
+        response.from_cache = False
+        return response
+
+    key = __cache_key(url, cookies)
+    entry, body = __read_cache_entry(key)
+
+    if OFFLINE:
+        if entry is None:
+            raise OfflineCacheMiss(f"No cached response for {url}")
+        return __cached_response(url, entry, body)
+
+    if entry is not None and time.time() - entry["fetched_at"] < ttl:
+        return __cached_response(url, entry, body)
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    __wait_for_rate_limit(url)
+    response = get_session(url).get(url, cookies=cookies, headers=headers, **kwargs)
+
+    if response.status_code == 304 and entry is not None:
+        entry["fetched_at"] = time.time()
+        __write_cache_entry(key, entry, body)
+        return __cached_response(url, entry, body)
+
+    if response.status_code == 200:
+        entry = {
+            "url": url,
+            "fetched_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type"),
+            "encoding": response.encoding,
+        }
+        __write_cache_entry(key, entry, response.content)
+
+    response.from_cache = False
+    return response
+
+
+def write_if_changed(output_file: Path, content: Union[str, bytes]) -> bool:
+    """
+    Writes a file, unless it already has exactly this content. This keeps the scrape from touching files
+    (and creating commits) when nothing changed.
+    :param output_file: The file to write
+    :param content: The new content
+    :return: True if the file was written
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    output_file = Path(output_file)
+    if output_file.exists() and output_file.read_bytes() == content:
+        return False
+
+    with open(output_file, "wb") as f:
+        f.write(content)
+
+    return True
+
+
+def seed_cache(url: str, content: bytes, cookies: Optional[Dict[str, str]] = None, content_type: Optional[str] = None):
+    """
+    Puts a response in the cache as if it had been downloaded, so the scrape can be replayed offline against data
+    that no server has. The entry counts as stale, so an online request always goes to the server instead.
+    :param url: The url the response is for
+    :param content: The response body
+    :param cookies: The cookies the request is made with, since they are part of the cache key
+    :param content_type: The response's Content-Type
+    """
+    entry = {
+        "url": url,
+        "fetched_at": 0,
+        "etag": None,
+        "last_modified": None,
+        "content_type": content_type,
+        "encoding": "utf-8",
+    }
+    __write_cache_entry(__cache_key(url, cookies), entry, content)
+
+
+def clear_cache():
+    """
+    Deletes every cached response
+    """
+    with __cache_lock:
+        for path in CACHE_DIRECTORY.glob("*"):
+            path.unlink()
+
+
+############################################
+# Cache Storage
+############################################
+def __cache_key(url: str, cookies: Optional[Dict[str, str]]) -> str:
+    key = url + json.dumps(cookies or {}, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def __read_cache_entry(key: str):
+    meta_file = CACHE_DIRECTORY / f"{key}.json"
+    body_file = CACHE_DIRECTORY / f"{key}.body"
+
+    with __cache_lock:
+        if not meta_file.exists() or not body_file.exists():
+            return None, None
+
+        # An entry that can't be read (i.e. left behind by a crash) is treated as if it wasn't there, and is
+        # overwritten by the next response
+        try:
+            with open(meta_file, "r") as f:
+                entry = json.load(f)
+            body = body_file.read_bytes()
+        except (OSError, ValueError):
+            return None, None
+        if not isinstance(entry, dict) or entry.get("body_bytes", len(body)) != len(body):
+            return None, None
+
+        # Touch the entry, so eviction throws away the least recently used responses first
+        os.utime(meta_file)
+
+    return entry, body
+
+
+def __write_cache_entry(key: str, entry: dict, body: bytes):
+    # The body size is kept with the entry, so a body and meta file from different writes aren't mixed up
+    entry = {**entry, "body_bytes": len(body)}
+
+    with __cache_lock:
+        CACHE_DIRECTORY.mkdir(parents=True, exist_ok=True)
+
+        __write_atomically(CACHE_DIRECTORY / f"{key}.body", body)
+        __write_atomically(CACHE_DIRECTORY / f"{key}.json", json.dumps(entry).encode("utf-8"))
+
+        __evict(keep=key)
+
+
+def __write_atomically(output_file: Path, content: bytes):
+    # Written next to the file and moved over it, so an interrupted write never leaves half a file behind
+    temp_file = output_file.with_name(f"{output_file.name}.{os.getpid()}.tmp")
+    temp_file.write_bytes(content)
+    temp_file.replace(output_file)
+
+
+def __evict(keep: str):
+    entries = []
+    total_bytes = 0
+    for meta_file in CACHE_DIRECTORY.glob("*.json"):
+        body_file = meta_file.with_suffix(".body")
+        size = meta_file.stat().st_size + (body_file.stat().st_size if body_file.exists() else 0)
+        entries.append((meta_file.stat().st_mtime, meta_file, body_file, size))
+        total_bytes += size
+
+    for _, meta_file, body_file, size in sorted(entries, key=lambda e: e[0]):
+        if total_bytes <= MAX_CACHE_BYTES:
+            break
+        if meta_file.stem == keep:
+            continue
+        meta_file.unlink()
+        body_file.unlink(missing_ok=True)
+        total_bytes -= size
+
+
+def __cached_response(url: str, entry: dict, body: bytes) -> "requests.Response":
+    import requests
+
+    response = requests.Response()
+    response.url = url
+    response.status_code = 200
+    response._content = body
+    response.encoding = entry.get("encoding")
+    if entry.get("content_type"):
+        response.headers["Content-Type"] = entry["content_type"]
+    response.from_cache = True
+
+    return response
@@ -0,0 +1,177 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, TextIO
+
+import numpy as np
+import pandas as pd
+
+# How much of a file is read at a time while streaming through it
+CHUNK_SIZE = 64 * 1024
+
+# Field type markers that aren't numpy dtypes
+CATEGORY = "category"
+TEXT = "text"
+LIST = "list"
+
+# Stands in for a field that a record doesn't have
+__MISSING = object()
+
+
+############################################
+# Streaming
+############################################
+def iter_json_array(f: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Decodes the elements of a top level json array one at a time, without ever holding the whole file (or every
+    decoded element) in memory
+    :param f: The open file
+    :param chunk_size: How many characters are read at a time
+    :return: An iterator over the elements of the array
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    end_of_file = False
+    started = False
+    # After an element, a comma (or the end of the array) has to come before the next one
+    after_element = False
+
+    while True:
+        # Skip to the start of the next element, reading more when the buffer runs out
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if end_of_file:
+                raise ValueError("Unexpected end of json array")
+            chunk = f.read(chunk_size)
+            end_of_file = not chunk
+            buffer, position = chunk, 0
+            continue
+
+        if not started:
+            if buffer[position] != "[":
+                raise ValueError("Expected a json array")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == "]":
+            return
+        if after_element:
+            if buffer[position] != ",":
+                raise ValueError(f"Expected a comma between json array elements at {position}")
+            after_element = False
+            position += 1
+            continue
+
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+        # An element is only known to be complete once whatever follows it is in the buffer too. Otherwise a number
+        # cut off by the end of a chunk (i.e. 1. of 1.5) would be decoded as if it had ended there
+        if end is None or end == len(buffer) or not (buffer[end].isspace() or buffer[end] in ",]"):
+            if end_of_file:
+                raise ValueError(f"Invalid json element at {position}")
+            # Read at least as much again as is already buffered, so a large element isn't decoded over and over
+            chunk = f.read(max(chunk_size, len(buffer) - position))
+            end_of_file = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+
+        yield element
+        position = end
+        after_element = True
+
+
+############################################
+# Field Extraction
+############################################
+def records_to_dataframe(records: Iterable[Dict[str, Any]], fields: Dict[str, str]) -> pd.DataFrame:
+    """
+    Pulls the requested fields out of each record, straight into typed columns. Nothing else in the records is
+    kept, so large nested trees that aren't asked for are thrown away as soon as their record has been read.
+    :param records: The json objects, i.e. from iter_json_array or a list that has already been decoded
+    :param fields: Dotted field path (i.e. score_breakdown.red.totalPoints) -> its type. The type is a numpy dtype,
+        CATEGORY, TEXT or LIST (kept as python objects). Integer fields that are missing from some records are
+        loaded as float64, so they can hold NaN.
+    :return: A data frame with one column per field, named after its path
+    """
+    paths = {field: field.split(".") for field in fields}
+    values = {field: [] for field in fields}
+
+    for record in records:
+        for field, path in paths.items():
+            value = record
+            for key in path:
+                if isinstance(value, dict):
+                    value = value.get(key, __MISSING)
+                elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                    value = value[int(key)]
+                else:
+                    value = __MISSING
+                if value is __MISSING or value is None:
+                    value = None
+                    break
+            values[field].append(value)
+
+    return pd.DataFrame({field: __typed_column(values[field], field_type) for field, field_type in fields.items()})
+
+
+def select_fields(record: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    Copies just the requested fields out of a record, keeping them nested the way they were. Loading the copy with
+    records_to_dataframe gives the same columns as loading the original
+    :param record: The json object
+    :param fields: Dotted field paths, as for records_to_dataframe
+    :return: A new json object holding only those fields. Fields the record doesn't have are left out
+    """
+    output = {}
+    for field in fields:
+        path = field.split(".")
+        value = record
+        for key in path:
+            value = value.get(key, __MISSING) if isinstance(value, dict) else __MISSING
+            if value is __MISSING:
+                break
+        if value is __MISSING:
+            continue
+
+        parent = output
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = value
+
+    return output
+
+
+def load_json_fields(json_file, fields: Dict[str, str], chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Streams the records in a json array file into a data frame holding only the requested fields
+    :param json_file: The path to the json file
+    :param fields: See records_to_dataframe
+    :param chunk_size: How many characters are read at a time
+    :return: See records_to_dataframe
+    """
+    with open(json_file, "r") as f:
+        return records_to_dataframe(iter_json_array(f, chunk_size), fields)
+
+
+def __typed_column(values: list, field_type: str):
+    if field_type == LIST:
+        # Filled one at a time, otherwise numpy would turn equal length lists into a 2d array
+        column = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            column[i] = value
+        return column
+    if field_type == TEXT:
+        return pd.array(values, dtype="str")
+    if field_type == CATEGORY:
+        return pd.Categorical(values)
+
+    dtype = np.dtype(field_type)
+    if dtype.kind == "b":
+        return np.array([bool(value) for value in values], dtype=dtype)
+    if dtype.kind in "iu" and any(value is None for value in values):
+        dtype = np.dtype(np.float64)
+    if dtype.kind == "f":
+        return np.array([np.nan if value is None else value for value in values], dtype=dtype)
+    return np.array(values, dtype=dtype)
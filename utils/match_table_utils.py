@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from utils.tba_utils import STATIONS
+
+
+def build_match_table(matches_df: pd.DataFrame, statbotics_df: pd.DataFrame, scouting_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins everything known about each qualification match into a single table, so that looking at a match is one
+    row lookup instead of a scan over each of the source frames.
+    :param matches_df: The TBA matches, as returned by tba_utils.load_event_matches
+    :param statbotics_df: The Statbotics matches, as returned by statbotics_utils.load_statbotics_matches
+    :param scouting_df: The match scouting data, as returned by scout_radioz_utils.load_match_scouting
+    :return: A data frame indexed by match_key, sorted by match number. It has all of the TBA columns (schedule,
+        alliances.*.score, score_breakdown.*), red_teams / blue_teams lists of team numbers, the Statbotics
+        predictions as statbotics.pred.* columns, and <station>_scouting_row columns holding the position of that
+        team's row in scouting_df (-1 if nobody scouted it).
+    """
+    prediction_columns = ["statbotics.pred.red_score", "statbotics.pred.blue_score"]
+    scouting_row_columns = [f"{station}_scouting_row" for station in STATIONS]
+
+    if matches_df.empty:
+        columns = ["match_number", "red_teams", "blue_teams"] + STATIONS + prediction_columns + scouting_row_columns
+        return pd.DataFrame(columns=columns).rename_axis("match_key")
+
+    table = matches_df.set_index("key").sort_values("match_number")
+    table.index.name = "match_key"
+
+    for alliance in ["red", "blue"]:
+        stations = table[[f"{alliance}1", f"{alliance}2", f"{alliance}3"]]
+        table[f"{alliance}_teams"] = stations.apply(lambda teams: teams.str[3:]).to_numpy().tolist()
+
+    # Statbotics predictions
+    if not statbotics_df.empty:
+        predictions = statbotics_df[statbotics_df["comp_level"] == "qm"].set_index("key")
+        predictions = predictions[[c for c in predictions.columns if c.startswith("pred.")]].add_prefix("statbotics.")
+        table = table.join(predictions)
+    for column in prediction_columns:
+        if column not in table.columns:
+            table[column] = np.nan
+
+    # Where each station's scouting row lives
+    scouting_positions = pd.Series(
+        np.arange(len(scouting_df)),
+        index=pd.MultiIndex.from_arrays([scouting_df["match_key"].astype(str), "frc" + scouting_df["team_key"].astype(str)]),
+    )
+    scouting_positions = scouting_positions[~scouting_positions.index.duplicated()]
+    for station, column in zip(STATIONS, scouting_row_columns):
+        keys = pd.MultiIndex.from_arrays([table.index, table[station]])
+        table[column] = scouting_positions.reindex(keys).fillna(-1).astype(int).to_numpy()
+
+    return table
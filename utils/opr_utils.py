@@ -0,0 +1,163 @@
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Component name -> the score_breakdown field it is solved from. The reef counts are the final state of the reef,
+# so they include the coral scored in auto.
+OPR_COMPONENTS = {
+    "opr": "totalPoints",
+    "auto_opr": "autoPoints",
+    "coral_l1_opr": "teleopReef.trough",
+    "coral_l2_opr": "teleopReef.tba_botRowCount",
+    "coral_l3_opr": "teleopReef.tba_midRowCount",
+    "coral_l4_opr": "teleopReef.tba_topRowCount",
+    "algae_opr": "algaePoints",
+    "barge_opr": "endGameBargePoints",
+}
+
+# Keeps the solve well defined early in an event, when some teams can't be told apart yet. Small enough to not
+# move the answer once every team has played a few matches.
+RIDGE = 1e-6
+
+
+class OprSolver:
+    """
+    Least squares OPR, DPR and CCWM (and component OPRs) from the official match results.
+
+    Every alliance in a match is one equation: the sum of its teams' contributions equals what it scored. Rather
+    than rebuilding the (alliances x teams) incidence matrix from scratch, each match adds its rows straight into
+    the normal equations (A^T A and A^T b), which are tiny (teams x teams). New matches from a scrape only add their
+    own rows, a match whose result was corrected is taken back out and put in again, and a match that is no longer in
+    the results is taken back out.
+
+    A solver outlives the EventData it was made for (see EventData.take_over_models), so the old and new versions
+    of an event can both be using it. Updates are done one at a time.
+    """
+
+    def __init__(self):
+        self.teams = []
+        self.team_index: Dict[str, int] = {}
+
+        self.normal_matrix = np.zeros((0, 0))
+        # Right hand sides: every component for the alliance, then the opponent's total (for DPR)
+        self.normal_targets = np.zeros((0, len(OPR_COMPONENTS) + 1))
+
+        # match_key -> (alliance team rows, alliance targets) that were added for it
+        self.__added_matches: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.__solution = None
+        self.__lock = threading.Lock()
+
+    def update(self, matches_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Brings the solve up to date with the given matches and returns the new results
+        :param matches_df: The TBA matches, as returned by tba_utils.load_event_matches. Matches that haven't been
+            played yet (score of -1) are skipped
+        :return: See OprSolver.results
+        """
+        with self.__lock:
+            return self.__update(matches_df)
+
+    def __update(self, matches_df: pd.DataFrame) -> pd.DataFrame:
+        played = pd.DataFrame()
+        if not matches_df.empty:
+            played = matches_df[(matches_df["alliances.red.score"] >= 0) & (matches_df["alliances.blue.score"] >= 0)]
+            played = played[played["comp_level"] == "qm"]
+
+        changed = False
+        if not played.empty:
+            changed = self.__add_matches(played)
+
+        # A match that isn't in the results anymore (i.e. it was dropped or its key changed) is taken back out
+        played_keys = set(played["key"]) if not played.empty else set()
+        for match_key in [match_key for match_key in self.__added_matches if match_key not in played_keys]:
+            self.__accumulate(*self.__added_matches.pop(match_key), sign=-1)
+            changed = True
+
+        if changed or self.__solution is None:
+            self.__solution = self.__solve()
+
+        return self.results()
+
+    def __add_matches(self, played: pd.DataFrame) -> bool:
+        # (num_matches, 2 alliances, 3 teams) and (num_matches, 2 alliances, num_targets)
+        alliance_teams = np.stack(
+            [played[["red1", "red2", "red3"]].to_numpy(), played[["blue1", "blue2", "blue3"]].to_numpy()], axis=1
+        )
+        alliance_targets = np.stack([self.__targets(played, "red", "blue"), self.__targets(played, "blue", "red")], axis=1)
+
+        self.__add_teams(dict.fromkeys(alliance_teams.ravel()))
+        team_rows = np.array([self.team_index[team] for team in alliance_teams.ravel()], dtype=np.int64).reshape(alliance_teams.shape)
+
+        changed = False
+        for match_key, rows, targets in zip(played["key"], team_rows, alliance_targets):
+            previous = self.__added_matches.get(match_key)
+            if previous is not None:
+                if np.array_equal(previous[0], rows) and np.array_equal(previous[1], targets, equal_nan=True):
+                    continue
+                self.__accumulate(*previous, sign=-1)
+
+            self.__accumulate(rows, targets, sign=1)
+            self.__added_matches[match_key] = (rows, targets)
+            changed = True
+
+        return changed
+
+    def results(self) -> pd.DataFrame:
+        """
+        :return: A data frame with one row per team (team_key is the team number, to line up with the scouting
+            data), with opr, dpr, ccwm and one column per component in OPR_COMPONENTS
+        """
+        solution = self.__solution if self.__solution is not None else np.zeros((0, len(OPR_COMPONENTS) + 1))
+
+        results = pd.DataFrame(solution[:, : len(OPR_COMPONENTS)], columns=list(OPR_COMPONENTS))
+        results.insert(1, "dpr", solution[:, -1])
+        results.insert(2, "ccwm", results["opr"] - results["dpr"])
+        results.insert(0, "team_key", [team[3:] for team in self.teams])
+
+        return results
+
+    def __targets(self, played: pd.DataFrame, alliance: str, opponent: str) -> np.ndarray:
+        columns = []
+        for field in OPR_COMPONENTS.values():
+            column = f"score_breakdown.{alliance}.{field}"
+            columns.append(played[column].to_numpy(dtype=np.float64, na_value=np.nan) if column in played.columns else np.full(len(played), np.nan))
+
+        # Use the final score when there is no breakdown
+        columns[0] = np.where(np.isnan(columns[0]), played[f"alliances.{alliance}.score"], columns[0])
+        columns.append(played[f"alliances.{opponent}.score"].to_numpy(dtype=np.float64))
+
+        return np.stack(columns, axis=1).reshape(len(played), -1)
+
+    def __add_teams(self, teams):
+        new_teams = [team for team in teams if team not in self.team_index]
+        if not new_teams:
+            return
+
+        for team in new_teams:
+            self.team_index[team] = len(self.teams)
+            self.teams.append(team)
+
+        num_teams = len(self.teams)
+        normal_matrix = np.zeros((num_teams, num_teams))
+        normal_matrix[: len(self.normal_matrix), : len(self.normal_matrix)] = self.normal_matrix
+        normal_targets = np.zeros((num_teams, self.normal_targets.shape[1]))
+        normal_targets[: len(self.normal_targets)] = self.normal_targets
+
+        self.normal_matrix = normal_matrix
+        self.normal_targets = normal_targets
+
+    def __accumulate(self, rows: np.ndarray, targets: np.ndarray, sign: int):
+        # A component missing from the breakdown counts as zero rather than poisoning the whole solve
+        targets = np.nan_to_num(targets)
+        for alliance_rows, alliance_targets in zip(rows, targets):
+            np.add.at(self.normal_matrix, np.ix_(alliance_rows, alliance_rows), sign)
+            np.add.at(self.normal_targets, alliance_rows, sign * alliance_targets)
+
+    def __solve(self) -> np.ndarray:
+        if not self.teams:
+            return np.zeros((0, self.normal_targets.shape[1]))
+
+        matrix = self.normal_matrix + RIDGE * np.eye(len(self.teams))
+        return np.linalg.solve(matrix, self.normal_targets)
@@ -0,0 +1,31 @@
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+import plotly.graph_objects as go
+
+
+PLOTLY_CDN_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+
+def plotly_js_head_content(inline: bool = False):
+    """
+    Builds the head content that loads plotly.js into the page. This only needs to happen once per session,
+    after which every figure produced by :func:`figure_to_html` can be shipped as just its json.
+    :param inline: If true, the library is embedded in the page instead of being fetched from the plotly CDN
+    :return: A shiny head_content tag
+    """
+    from shiny import ui
+
+    if inline:
+        return ui.head_content(ui.tags.script(ui.HTML(get_plotlyjs())))
+
+    return ui.head_content(ui.tags.script(src=PLOTLY_CDN_URL, charset="utf-8"))
+
+
+def figure_to_html(fig: go.Figure, include_plotlyjs: bool = False) -> str:
+    """
+    Converts a figure into an html snippet that can be placed in a shiny output
+    :param fig: The figure to convert
+    :param include_plotlyjs: If true, the full plotly.js bundle (several MB) is inlined along with the figure.
+        Otherwise, the page is expected to have loaded it with :func:`plotly_js_head_content`
+    :return: The html string
+    """
+    return fig.to_html(full_html=False, include_plotlyjs=include_plotlyjs)
@@ -0,0 +1,153 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple, Type
+
+import pandas as pd
+
+# Set APP_PROFILING=1 to time every calc and output, and APP_PROFILING_LOG to a file to also log every measurement
+# to it, one json object per line
+PROFILING_ENABLED = os.environ.get("APP_PROFILING", "0") == "1"
+PROFILING_LOG_FILE = os.environ.get("APP_PROFILING_LOG")
+
+SUMMARY_COLUMNS = ["kind", "name", "calls", "silent", "errors", "invalidations", "total_ms", "mean_ms", "max_ms", "self_ms", "payload_kb"]
+
+
+class Profiler:
+    """
+    Times the app's calcs, outputs and anything else that asks to be measured, and keeps running totals for each.
+
+    Measurements nest: a calc that runs while an output is being rendered is counted in the output's total time,
+    but not in its self time, so the self time is what the output spent on its own (i.e. building the figure).
+
+    A disabled profiler measures nothing. Callers check enabled once, when they set things up, and leave their
+    functions as they are if it is off, so profiling costs nothing unless it is turned on.
+    """
+
+    def __init__(self, enabled: bool = PROFILING_ENABLED, log_file: Optional[Path] = PROFILING_LOG_FILE, ignored_exceptions: Tuple[Type[BaseException], ...] = ()):
+        """
+        :param enabled: If false, nothing is measured
+        :param log_file: If given, every measurement is appended to this file as a line of json
+        :param ignored_exceptions: Exceptions that are part of normal operation (i.e. an output waiting on its
+            inputs). A measurement that ends with one of these is counted as silent instead of being timed
+        """
+        self.enabled = enabled
+        self.log_file = Path(log_file) if log_file else None
+        self.ignored_exceptions = ignored_exceptions
+
+        # (kind, name) -> running totals
+        self.__stats = {}
+        self.__lock = threading.Lock()
+        self.__log_lock = threading.Lock()
+
+        # The measurement currently running in this thread / task, as (name, time spent in nested measurements)
+        self.__current = contextvars.ContextVar("profiler_current", default=None)
+
+    @contextlib.contextmanager
+    def measure(self, kind: str, name: str, session_id: Optional[str] = None):
+        """
+        Times the block it wraps
+        :param kind: What is being measured (i.e. calc, output, worker)
+        :param name: Its name
+        :param session_id: The session it is being measured for, if any, for the log
+        :return: A context manager. It yields a dictionary that extra fields of the measurement (i.e. payload_bytes)
+            can be added to
+        """
+        parent = self.__current.get()
+        nested = [0.0]
+        token = self.__current.set((name, nested))
+        extra = {}
+        outcome = "ok"
+
+        start = time.perf_counter()
+        try:
+            yield extra
+        except self.ignored_exceptions:
+            outcome = "silent"
+            raise
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.__current.reset(token)
+            if parent is not None:
+                parent[1][0] += elapsed
+            self.__record(kind, name, outcome, elapsed, elapsed - nested[0], extra, session_id)
+
+    def section(self, name: str):
+        """
+        Times part of whatever is being measured right now, such as turning a figure into html. It is recorded as
+        "<measurement> > <name>"
+        :param name: What the part is called
+        :return: A context manager
+        """
+        current = self.__current.get() if self.enabled else None
+        if current is None:
+            return contextlib.nullcontext({})
+        return self.measure("section", f"{current[0]} > {name}")
+
+    def count_invalidation(self, kind: str, name: str):
+        """
+        :param kind: What was invalidated
+        :param name: Its name
+        """
+        with self.__lock:
+            self.__entry(kind, name)["invalidations"] += 1
+
+    def summary(self) -> pd.DataFrame:
+        """
+        :return: A data frame with one row per measured calc, output and section, slowest in total first. The mean
+            and max are over the calls that finished (neither silent nor errors), and payload_kb is the mean size
+            of what was sent to the browser
+        """
+        with self.__lock:
+            rows = [[kind, name, *stats.values()] for (kind, name), stats in self.__stats.items()]
+
+        df = pd.DataFrame(rows, columns=["kind", "name", "calls", "silent", "errors", "invalidations", "total_ms", "max_ms", "self_ms", "payload_bytes"])
+        df["mean_ms"] = df["total_ms"] / df["calls"].where(df["calls"] > 0)
+        df["payload_kb"] = df["payload_bytes"] / df["calls"].where(df["calls"] > 0) / 1024
+        return df[SUMMARY_COLUMNS].sort_values("total_ms", ascending=False, ignore_index=True)
+
+    def reset(self):
+        """
+        Throws away everything measured so far
+        """
+        with self.__lock:
+            self.__stats.clear()
+
+    def __entry(self, kind: str, name: str) -> dict:
+        key = (kind, name)
+        if key not in self.__stats:
+            self.__stats[key] = {"calls": 0, "silent": 0, "errors": 0, "invalidations": 0, "total_ms": 0.0, "max_ms": 0.0, "self_ms": 0.0, "payload_bytes": 0}
+        return self.__stats[key]
+
+    def __record(self, kind: str, name: str, outcome: str, elapsed: float, self_elapsed: float, extra: dict, session_id: Optional[str]):
+        with self.__lock:
+            stats = self.__entry(kind, name)
+            if outcome == "ok":
+                stats["calls"] += 1
+                stats["total_ms"] += elapsed * 1000
+                stats["max_ms"] = max(stats["max_ms"], elapsed * 1000)
+                stats["self_ms"] += self_elapsed * 1000
+                stats["payload_bytes"] += extra.get("payload_bytes", 0)
+            else:
+                stats["errors" if outcome == "error" else "silent"] += 1
+
+        if self.log_file is not None:
+            record = {
+                "time": time.time(),
+                "session": session_id,
+                "kind": kind,
+                "name": name,
+                "outcome": outcome,
+                "ms": round(elapsed * 1000, 3),
+                "self_ms": round(self_elapsed * 1000, 3),
+                **extra,
+            }
+            with self.__log_lock, open(self.log_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
@@ -0,0 +1,225 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.simulation_utils import MatchSimulator, SAMPLED_COLUMNS, TIE_RP, WIN_RP, alliance_bonus_rps
+
+# How many of the top ranked teams become alliance captains
+NUM_CAPTAINS = 8
+
+SUMMARY_COLUMNS = [
+    "team_key",
+    "current_rp",
+    "matches_played",
+    "matches_remaining",
+    "mean_final_rp",
+    "final_rp_5%",
+    "final_rp_95%",
+    "mean_rank",
+    "median_rank",
+    "first_seed_prob",
+    "captain_prob",
+]
+
+
+class RankingProjector:
+    """
+    Projects the final qualification rankings by simulating every qualification match that hasn't been played yet,
+    on top of the results of the ones that have.
+
+    The simulated outcome of every unplayed match is kept between calls. It is only thrown away once the match is
+    played, or once the scouting data of one of its six teams changes, so rerunning the projection after a scrape
+    only simulates the matches that were affected by it.
+
+    A projector outlives the EventData it was made for (see EventData.take_over_models), so projections are run one
+    at a time.
+    """
+
+    def __init__(self, num_simulations: int = 2000, seed: Optional[int] = None):
+        """
+        :param num_simulations: How many times the rest of the event is simulated
+        :param seed: Seed for the random number generator, for repeatable results
+        """
+        self.num_simulations = num_simulations
+        self.rng = np.random.default_rng(seed)
+
+        # match_key -> (cache key, (num_simulations, 2) ranking points, (num_simulations, 2) scores)
+        self.__match_cache: Dict[str, Tuple[tuple, np.ndarray, np.ndarray]] = {}
+        self.last_num_simulated_matches = 0
+        self.__lock = threading.Lock()
+
+    def project(self, match_table: pd.DataFrame, simulator: MatchSimulator) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Projects the final rankings
+        :param match_table: The match table, as built by match_table_utils.build_match_table
+        :param simulator: The match simulator for the current scouting data
+        :return: A tuple of:
+            A summary data frame with one row per team, sorted by projected rank: current RP, matches played and
+            remaining, the mean and 5th / 95th percentile of final RP, the mean and median final rank, and the
+            probability of being the first seed or an alliance captain.
+            A data frame of team x final rank holding the probability of each team finishing at each rank.
+        """
+        with self.__lock:
+            return self.__project(match_table, simulator)
+
+    def __project(self, match_table: pd.DataFrame, simulator: MatchSimulator) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        num_simulations = self.num_simulations
+
+        # Before the schedule is out there is nothing to project
+        if match_table.empty:
+            summary = pd.DataFrame(columns=SUMMARY_COLUMNS)
+            return summary, pd.DataFrame(index=pd.Index([], name="team_key"), columns=pd.RangeIndex(1, 1, name="rank"))
+
+        red_teams = np.array(match_table["red_teams"].tolist(), dtype=object).reshape(len(match_table), -1)
+        blue_teams = np.array(match_table["blue_teams"].tolist(), dtype=object).reshape(len(match_table), -1)
+        teams = sorted(set(red_teams.ravel()) | set(blue_teams.ravel()), key=int)
+        team_index = {team: i for i, team in enumerate(teams)}
+
+        red_scores = match_table.get("alliances.red.score", pd.Series(-1, index=match_table.index)).fillna(-1).to_numpy()
+        blue_scores = match_table.get("alliances.blue.score", pd.Series(-1, index=match_table.index)).fillna(-1).to_numpy()
+        played = (red_scores >= 0) & (blue_scores >= 0)
+
+        # (num_simulations, num_matches, 2) ranking points and scores. Played matches are the same in every simulation
+        match_rps = np.zeros((num_simulations, len(match_table), 2))
+        match_scores = np.zeros((num_simulations, len(match_table), 2))
+
+        actual_rps = self.__actual_rps(match_table, red_scores, blue_scores)
+        match_rps[:, played, :] = actual_rps[played]
+        match_scores[:, played, 0] = red_scores[played]
+        match_scores[:, played, 1] = blue_scores[played]
+
+        # Unplayed matches come from the cache, and anything that isn't cached is simulated in one batch
+        match_keys = match_table.index.to_numpy()
+        cache = {}
+        to_simulate = []
+        for i in np.flatnonzero(~played):
+            cache_key = (
+                num_simulations,
+                tuple(red_teams[i]),
+                tuple(blue_teams[i]),
+                tuple(simulator.team_fingerprint(team) for team in [*red_teams[i], *blue_teams[i]]),
+            )
+            cached = self.__match_cache.get(match_keys[i])
+            if cached is not None and cached[0] == cache_key:
+                cache[match_keys[i]] = cached
+            else:
+                to_simulate.append((i, cache_key))
+
+        if to_simulate:
+            rows = [i for i, _ in to_simulate]
+            simulated_rps, simulated_scores = self.__simulate_matches(simulator, red_teams[rows], blue_teams[rows])
+            for n, (i, cache_key) in enumerate(to_simulate):
+                cache[match_keys[i]] = (cache_key, simulated_rps[:, n], simulated_scores[:, n])
+
+        for i in np.flatnonzero(~played):
+            _, rps, scores = cache[match_keys[i]]
+            match_rps[:, i] = rps
+            match_scores[:, i] = scores
+
+        # Only the matches that are still unplayed are worth remembering
+        self.__match_cache = cache
+        self.last_num_simulated_matches = len(to_simulate)
+
+        # Give every team the ranking points and score of the alliance it was on. Surrogate appearances don't count
+        # towards the rankings, and a disqualified team gets no ranking points for the match
+        stations = np.concatenate([red_teams, blue_teams], axis=1)
+        station_team = np.vectorize(team_index.get)(stations)
+        station_alliance = np.array([0] * red_teams.shape[1] + [1] * blue_teams.shape[1])
+        counted = ~self.__station_flags(match_table, stations, "surrogate_team_keys")
+        disqualified = self.__station_flags(match_table, stations, "dq_team_keys")
+
+        incidence = np.zeros((len(match_table), stations.shape[1], len(teams)))
+        incidence[np.arange(len(match_table))[:, None], np.arange(stations.shape[1])[None, :], station_team] = counted
+        station_rps = match_rps[:, :, station_alliance] * ~disqualified
+        station_scores = match_scores[:, :, station_alliance]
+
+        flat_incidence = incidence.reshape(-1, len(teams))
+        team_rps = station_rps.reshape(num_simulations, -1) @ flat_incidence
+        team_scores = station_scores.reshape(num_simulations, -1) @ flat_incidence
+        num_matches = np.maximum(flat_incidence.sum(axis=0), 1)
+
+        # Teams are ranked by average RP, then by average match score
+        ranking_score = team_rps / num_matches
+        tiebreaker = team_scores / num_matches
+        order = np.lexsort((-tiebreaker, -ranking_score), axis=1)
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(1, len(teams) + 1)[None, :], axis=1)
+
+        played_incidence = incidence[played].reshape(-1, len(teams))
+        current_rps = station_rps[0, played].reshape(-1) @ played_incidence
+        matches_played = played_incidence.sum(axis=0)
+
+        summary = pd.DataFrame(
+            {
+                "team_key": teams,
+                "current_rp": current_rps,
+                "matches_played": matches_played.astype(int),
+                "matches_remaining": (flat_incidence.sum(axis=0) - matches_played).astype(int),
+                "mean_final_rp": team_rps.mean(axis=0),
+                "final_rp_5%": np.quantile(team_rps, 0.05, axis=0),
+                "final_rp_95%": np.quantile(team_rps, 0.95, axis=0),
+                "mean_rank": ranks.mean(axis=0),
+                "median_rank": np.median(ranks, axis=0),
+                "first_seed_prob": (ranks == 1).mean(axis=0),
+                "captain_prob": (ranks <= NUM_CAPTAINS).mean(axis=0),
+            }
+        ).sort_values("mean_rank", ignore_index=True)
+
+        rank_counts = np.zeros((len(teams), len(teams)))
+        np.add.at(rank_counts, (np.broadcast_to(np.arange(len(teams)), ranks.shape), ranks - 1), 1)
+        rank_distribution = pd.DataFrame(
+            rank_counts / num_simulations,
+            index=pd.Index(teams, name="team_key"),
+            columns=pd.RangeIndex(1, len(teams) + 1, name="rank"),
+        )
+
+        return summary, rank_distribution
+
+    def __actual_rps(self, match_table: pd.DataFrame, red_scores: np.ndarray, blue_scores: np.ndarray) -> np.ndarray:
+        # Use the official ranking points when TBA has the breakdown, otherwise just the win / tie points
+        win_rps = np.stack(
+            [
+                np.where(red_scores > blue_scores, WIN_RP, np.where(red_scores == blue_scores, TIE_RP, 0)),
+                np.where(blue_scores > red_scores, WIN_RP, np.where(red_scores == blue_scores, TIE_RP, 0)),
+            ],
+            axis=1,
+        ).astype(np.float64)
+
+        for alliance, column in enumerate(["score_breakdown.red.rp", "score_breakdown.blue.rp"]):
+            if column in match_table.columns:
+                official = match_table[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                win_rps[:, alliance] = np.where(np.isnan(official), win_rps[:, alliance], official)
+
+        return win_rps
+
+    def __station_flags(self, match_table: pd.DataFrame, stations: np.ndarray, column: str) -> np.ndarray:
+        # Flags every station whose team is listed in alliances.<color>.<column> (surrogates, disqualifications)
+        flags = np.zeros(stations.shape, dtype=bool)
+        for alliance, columns in [("red", slice(0, 3)), ("blue", slice(3, 6))]:
+            listed = match_table.get(f"alliances.{alliance}.{column}")
+            if listed is None:
+                continue
+            for i, team_keys in enumerate(listed):
+                if isinstance(team_keys, list) and team_keys:
+                    numbers = [team_key[3:] for team_key in team_keys]
+                    flags[i, columns] = np.isin(stations[i, columns], numbers)
+
+        return flags
+
+    def __simulate_matches(self, simulator: MatchSimulator, red_teams: np.ndarray, blue_teams: np.ndarray):
+        red = simulator.sample_alliances(red_teams, self.num_simulations, self.rng)
+        blue = simulator.sample_alliances(blue_teams, self.num_simulations, self.rng)
+
+        points = SAMPLED_COLUMNS.index("totalPointsScored")
+        red_score = red[..., points]
+        blue_score = blue[..., points]
+        red_wins = red_score > blue_score
+        blue_wins = blue_score > red_score
+        ties = ~(red_wins | blue_wins)
+
+        red_rps = red_wins * WIN_RP + ties * TIE_RP + sum(alliance_bonus_rps(red, blue, red_teams.shape[1]).values())
+        blue_rps = blue_wins * WIN_RP + ties * TIE_RP + sum(alliance_bonus_rps(blue, red, blue_teams.shape[1]).values())
+
+        return np.stack([red_rps, blue_rps], axis=-1), np.stack([red_score, blue_score], axis=-1)
@@ -0,0 +1,192 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.scout_radioz_utils import add_derived_match_scouting_columns
+from utils.tba_utils import STATIONS
+
+# Metric -> (scouting columns that add up to it, score_breakdown fields that add up to it). The reef counts are the
+# final state of the reef, so they already include the coral scored in auto, and the scouted auto and teleop coral
+# are compared against them alone.
+RECONCILED_METRICS: Dict[str, Tuple[List[str], List[str]]] = {
+    "coral_l1": (["autoCoralL1", "teleopCoralL1"], ["teleopReef.trough"]),
+    "coral_l2": (["autoCoralL2", "teleopCoralL2"], ["teleopReef.tba_botRowCount"]),
+    "coral_l3": (["autoCoralL3", "teleopCoralL3"], ["teleopReef.tba_midRowCount"]),
+    "coral_l4": (["autoCoralL4", "teleopCoralL4"], ["teleopReef.tba_topRowCount"]),
+    "algae_net": (["autoAlgaeNet", "teleopAlgaeNet"], ["netAlgaeCount"]),
+    "algae_processor": (["autoAlgaeProc", "teleopAlgaeProc"], ["wallAlgaeCount"]),
+}
+
+# TBA endGameRobotN value -> the scouting app's bargeStatus
+TBA_BARGE_STATUSES = {
+    "DeepCage": "Deep Cage",
+    "ShallowCage": "Shallow Cage",
+    "Parked": "Parked",
+    "None": "Not Parked",
+}
+
+
+def reconcile_match_scouting(match_table: pd.DataFrame, scouting_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compares the match scouting against the official TBA breakdowns for the whole event at once. The pieces are
+    compared per alliance (the three scouting rows added up against the alliance's breakdown), and the barge is
+    compared per robot, since TBA reports each robot's barge status.
+    :param match_table: The match table, as built by match_table_utils.build_match_table
+    :param scouting_df: The match scouting data, as returned by scout_radioz_utils.load_match_scouting
+    :return: A tuple of:
+        A data frame with one row per played alliance, worst first. It has match_key, match_number, alliance, how
+        many of the robots were scouted, <metric>_scouted / <metric>_official / <metric>_error for every
+        metric in RECONCILED_METRICS, the number of barge mismatches and the total discrepancy. Alliances that
+        weren't fully scouted have no discrepancy, since their sums can't be compared.
+        A data frame with one row per scouting row that was compared, worst first. It has the match, station and
+        team, the scouting row position, whether the barge status was wrong, and the absolute piece error of the
+        robot's alliance split evenly across its three scouts.
+    """
+    unplayed = pd.Series(-1, index=match_table.index)
+    played = match_table[(match_table.get("alliances.red.score", unplayed) >= 0) & (match_table.get("alliances.blue.score", unplayed) >= 0)]
+    num_matches = len(played)
+
+    # (num_matches, 6) positions of each station's scouting row, -1 if nobody scouted it
+    scouting_rows = played[[f"{station}_scouting_row" for station in STATIONS]].to_numpy(dtype=np.int64)
+    scouted = scouting_rows >= 0
+
+    alliances = []
+    for side, stations in [("red", slice(0, 3)), ("blue", slice(3, 6))]:
+        alliance = pd.DataFrame(
+            {
+                "match_key": played.index,
+                "match_number": played["match_number"].to_numpy(),
+                "alliance": side,
+                "robots_scouted": scouted[:, stations].sum(axis=1),
+            }
+        )
+
+        for metric, (scouting_columns, official_fields) in RECONCILED_METRICS.items():
+            values = __gather(scouting_df, scouting_columns, scouting_rows[:, stations])
+            alliance[f"{metric}_scouted"] = np.nansum(values, axis=1)
+            alliance[f"{metric}_official"] = __official(played, side, official_fields)
+            alliance[f"{metric}_error"] = alliance[f"{metric}_scouted"] - alliance[f"{metric}_official"]
+
+        alliance["barge_mismatches"] = __barge_mismatches(played, scouting_df, side, scouting_rows[:, stations]).sum(axis=1)
+        alliances.append(alliance)
+
+    by_alliance = pd.concat(alliances, ignore_index=True)
+    error_columns = [f"{metric}_error" for metric in RECONCILED_METRICS]
+    complete = by_alliance["robots_scouted"] == 3
+    by_alliance["discrepancy"] = np.where(
+        complete, by_alliance[error_columns].abs().sum(axis=1) + by_alliance["barge_mismatches"], np.nan
+    )
+    by_alliance = by_alliance.sort_values(["discrepancy", "match_number"], ascending=[False, True], na_position="last", ignore_index=True)
+
+    # Every scout on an alliance shares the blame for its piece errors, but the barge is theirs alone
+    piece_error = by_alliance.set_index(["match_key", "alliance"])[error_columns].abs().sum(axis=1)
+    by_row = []
+    for side, stations in [("red", slice(0, 3)), ("blue", slice(3, 6))]:
+        rows = scouting_rows[:, stations]
+        barge_wrong = __barge_mismatches(played, scouting_df, side, rows)
+        alliance_error = piece_error.reindex(pd.MultiIndex.from_arrays([played.index, [side] * num_matches])).to_numpy()
+        for n, station in enumerate(STATIONS[stations]):
+            by_row.append(
+                pd.DataFrame(
+                    {
+                        "match_key": played.index,
+                        "match_number": played["match_number"].to_numpy(),
+                        "station": station,
+                        "team_key": played[station].str[3:].to_numpy(),
+                        "scouting_row": rows[:, n],
+                        "barge_wrong": barge_wrong[:, n],
+                        "piece_error_share": alliance_error / 3,
+                    }
+                )
+            )
+
+    by_row = pd.concat(by_row, ignore_index=True)
+    by_row = by_row[by_row["scouting_row"] >= 0]
+    by_row["discrepancy"] = by_row["piece_error_share"] + by_row["barge_wrong"]
+    by_row = by_row.sort_values(["discrepancy", "match_number"], ascending=[False, True], ignore_index=True)
+
+    return by_alliance, by_row
+
+
+def summarize_scout_stations(by_row: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rolls the per row discrepancies up by driver station. The scouting export doesn't say who scouted a row, but
+    scouts are assigned to a station, so a station that is always off usually means a scout that is.
+    :param by_row: The per row reconciliation, as returned by reconcile_match_scouting
+    :return: A data frame with one row per station, worst first
+    """
+    summary = by_row.groupby("station").agg(
+        rows=("scouting_row", "size"),
+        barge_wrong_rate=("barge_wrong", "mean"),
+        mean_piece_error_share=("piece_error_share", "mean"),
+        mean_discrepancy=("discrepancy", "mean"),
+    )
+    return summary.sort_values("mean_discrepancy", ascending=False).reset_index()
+
+
+def correction_factors(by_alliance: pd.DataFrame) -> pd.DataFrame:
+    """
+    Works out how much each alliance's scouted counts need to be scaled to match the official ones
+    :param by_alliance: The per alliance reconciliation, as returned by reconcile_match_scouting
+    :return: A data frame indexed by (match_key, alliance) with a factor per metric. Only fully scouted alliances
+        get factors, and a metric nobody scouted gets a factor of 1
+    """
+    complete = by_alliance[by_alliance["robots_scouted"] == 3].set_index(["match_key", "alliance"])
+
+    factors = pd.DataFrame(index=complete.index)
+    for metric in RECONCILED_METRICS:
+        scouted_count = complete[f"{metric}_scouted"]
+        factors[metric] = np.where(scouted_count > 0, complete[f"{metric}_official"] / scouted_count.where(scouted_count > 0), 1.0)
+
+    return factors
+
+
+def apply_correction_factors(scouting_df: pd.DataFrame, factors: pd.DataFrame) -> pd.DataFrame:
+    """
+    Scales every scouting row's piece counts by its alliance's correction factors, and recomputes the derived
+    point columns. Rows from alliances without factors are left alone.
+    :param scouting_df: The match scouting data
+    :param factors: The factors, as returned by correction_factors
+    :return: A corrected copy of the scouting data
+    """
+    corrected = scouting_df.copy()
+    row_factors = factors.reindex(pd.MultiIndex.from_arrays([scouting_df["match_key"], scouting_df["alliance"]])).fillna(1.0)
+
+    for metric, (scouting_columns, _) in RECONCILED_METRICS.items():
+        for column in scouting_columns:
+            corrected[column] = corrected[column] * row_factors[metric].to_numpy()
+
+    return add_derived_match_scouting_columns(corrected)
+
+
+############################################
+# Helpers
+############################################
+def __gather(scouting_df: pd.DataFrame, columns: List[str], rows: np.ndarray) -> np.ndarray:
+    # Adds up the columns for the given rows. Position -1 lands on the NaN that is tacked on the end
+    values = scouting_df[columns].sum(axis=1).to_numpy(dtype=np.float64)
+    return np.append(values, np.nan)[rows]
+
+
+def __official(played: pd.DataFrame, side: str, fields: List[str]) -> np.ndarray:
+    total = np.zeros(len(played))
+    for field in fields:
+        column = f"score_breakdown.{side}.{field}"
+        total += played[column].to_numpy(dtype=np.float64, na_value=np.nan) if column in played.columns else np.nan
+    return total
+
+
+def __barge_mismatches(played: pd.DataFrame, scouting_df: pd.DataFrame, side: str, rows: np.ndarray) -> np.ndarray:
+    # (num_matches, 3) true where a scouted robot's barge status disagrees with TBA's
+    scouted_status = np.append(scouting_df["bargeStatus"].to_numpy(dtype=object), None)[rows]
+
+    mismatches = np.zeros(rows.shape, dtype=bool)
+    for robot in range(rows.shape[1]):
+        column = f"score_breakdown.{side}.endGameRobot{robot + 1}"
+        if column not in played.columns:
+            continue
+        official_status = played[column].map(TBA_BARGE_STATUSES).to_numpy(dtype=object)
+        mismatches[:, robot] = (rows[:, robot] >= 0) & pd.notna(official_status) & (scouted_status[:, robot] != official_status)
+
+    return mismatches
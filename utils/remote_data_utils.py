@@ -0,0 +1,169 @@
+import asyncio
+import io
+import sys
+from typing import Awaitable, Callable, Dict, Optional
+
+import pandas as pd
+
+from utils import event_data_utils, json_utils, scout_radioz_utils, statbotics_utils, tba_utils
+from utils.scout_radioz_utils import MATCH_SCOUTING_STORE_FILE
+
+# The app can't show an event until these have arrived
+REQUIRED_FILES = [MATCH_SCOUTING_STORE_FILE, "tba_matches.json"]
+
+# These fill in whatever they are used for once they arrive. Until then the event is shown without them
+OPTIONAL_FILES = ["statbotics_matches.json", "pit_scouting.csv"]
+
+# What is fetched instead when a file isn't there, i.e. an event that the scouting store hasn't been built for
+FALLBACK_FILES = {MATCH_SCOUTING_STORE_FILE: "match_scouting.csv"}
+
+
+class RemoteFetchError(Exception):
+    pass
+
+
+############################################
+# Fetching
+############################################
+async def fetch_bytes(url: str) -> bytes:
+    """
+    Downloads a file without blocking the event loop.
+
+    In the browser this goes through fetch, revalidating against the browser's http cache. A file that hasn't
+    changed since the last visit only costs a 304, and if the network is down whatever the browser has cached is
+    used instead. Anywhere else (i.e. testing against a local server) it goes through http_utils' on-disk cache on a
+    thread, which revalidates the same way.
+    :param url: The url to download
+    :return: The response body
+    """
+    if sys.platform == "emscripten":
+        from pyodide.http import pyfetch
+
+        try:
+            response = await pyfetch(url, cache="no-cache")
+        except OSError:
+            response = await pyfetch(url, cache="force-cache")
+        if not response.ok:
+            raise RemoteFetchError(f"{url} returned {response.status}")
+        return await response.bytes()
+
+    return await asyncio.to_thread(__fetch_with_http_utils, url)
+
+
+def __fetch_with_http_utils(url: str) -> bytes:
+    from utils import http_utils
+
+    response = http_utils.get(url, ttl=0)
+    if response.status_code != 200:
+        raise RemoteFetchError(f"{url} returned {response.status_code}")
+    return response.content
+
+
+############################################
+# Remote Events
+############################################
+class RemoteEventSources:
+    """
+    Loads events from a copy of the data directory on a web server (i.e. the repository on GitHub), for when the
+    app runs in the browser without the data bundled in.
+
+    Every file of an event is fetched at once, in the background. The event can be loaded as soon as the required
+    files are in, and the version changes every time another one arrives, so an EventDataLoader using it loads the
+    event again with the rest filled in.
+    """
+
+    def __init__(self, base_url: str, fetch: Callable[[str], Awaitable[bytes]] = fetch_bytes):
+        """
+        :param base_url: The url of the data directory. An event's files are under <base_url>/<event>/
+        :param fetch: Downloads a url, raising RemoteFetchError if it isn't there. See fetch_bytes
+        """
+        self.base_url = base_url.rstrip("/")
+        self.fetch = fetch
+
+        # event -> filename -> content, for every file that has arrived
+        self.__files: Dict[str, Dict[str, bytes]] = {}
+        # event -> filename -> the task fetching it
+        self.__tasks: Dict[str, Dict[str, asyncio.Task]] = {}
+        # event -> filename -> why it couldn't be fetched
+        self.__errors: Dict[str, Dict[str, Exception]] = {}
+
+    def start(self, event: str):
+        """
+        Starts fetching every file of an event at once, unless that has already happened. Has to be called from
+        the event loop
+        :param event: The event key
+        """
+        if event in self.__tasks:
+            return
+
+        self.__files.setdefault(event, {})
+        self.__errors[event] = {}
+        self.__tasks[event] = {filename: asyncio.ensure_future(self.__fetch_file(event, filename)) for filename in REQUIRED_FILES + OPTIONAL_FILES}
+
+    async def wait_until_usable(self, event: str):
+        """
+        Starts fetching an event if that hasn't happened yet, and waits until it can be loaded
+        :param event: The event key
+        """
+        self.start(event)
+        await asyncio.gather(*(self.__tasks[event][filename] for filename in REQUIRED_FILES))
+
+        missing = {filename: error for filename, error in self.__errors[event].items() if filename in REQUIRED_FILES}
+        if missing:
+            # Forget the attempt, so the next one starts over
+            del self.__tasks[event]
+            raise RemoteFetchError(f"Couldn't load {event}: " + ", ".join(str(error) for error in missing.values()))
+
+    def version(self, event: str) -> str:
+        """
+        :param event: The event key
+        :return: A string that changes whenever another of the event's files arrives. Empty if none have yet
+        """
+        files = dict(self.__files.get(event, {}))
+        return "|".join(f"{filename}:{len(content)}" for filename, content in sorted(files.items()))
+
+    def load_event(self, event: str, apply_scouting_corrections: bool = False) -> event_data_utils.EventData:
+        """
+        Loads an event from the files that have arrived so far. Only call this once wait_until_usable is done
+        :param event: The event key
+        :param apply_scouting_corrections: See EventData
+        :return: The event's data
+        """
+        files = dict(self.__files[event])
+        print(f"Loading remote data from {self.base_url}/{event}: {', '.join(sorted(files))}")
+
+        if MATCH_SCOUTING_STORE_FILE in files:
+            df = scout_radioz_utils.load_match_scouting_store(io.BytesIO(files[MATCH_SCOUTING_STORE_FILE]))
+        else:
+            df = scout_radioz_utils.match_scouting_csv_to_dataframe(io.BytesIO(files["match_scouting.csv"]))
+
+        matches_df = tba_utils.event_matches_json_to_dataframe(self.__iter_json(files["tba_matches.json"]))
+
+        if "statbotics_matches.json" in files:
+            statbotics_df = statbotics_utils.statbotics_matches_json_to_dataframe(self.__iter_json(files["statbotics_matches.json"]))
+        else:
+            statbotics_df = pd.DataFrame()
+
+        pit_df = scout_radioz_utils.load_pit_scouting(io.BytesIO(files["pit_scouting.csv"])) if "pit_scouting.csv" in files else None
+
+        return event_data_utils.EventData(event, df, matches_df, statbotics_df, apply_scouting_corrections=apply_scouting_corrections, pit_df=pit_df)
+
+    async def __fetch_file(self, event: str, filename: str):
+        # Failures are recorded rather than raised, an optional file that isn't there just never arrives
+        error: Optional[Exception] = None
+        for candidate in [filename, FALLBACK_FILES.get(filename)]:
+            if candidate is None:
+                continue
+            try:
+                self.__files[event][candidate] = await self.fetch(f"{self.base_url}/{event}/{candidate}")
+                self.__errors[event].pop(filename, None)
+                return
+            except Exception as e:
+                error = e
+
+        print(f"Couldn't fetch {event}/{filename}: {error}")
+        self.__errors[event][filename] = error
+
+    @staticmethod
+    def __iter_json(content: bytes):
+        return json_utils.iter_json_array(io.StringIO(content.decode("utf-8")))
@@ -1,7 +1,46 @@
 
-import requests
+import csv
+import io
+import os
+from pathlib import Path
 
-def __make_request(url: str, org_key: str, event_key: str) -> bytes:
+import numpy as np
+import pandas as pd
+
+from utils import http_utils
+
+MATCH_SCOUTING_STORE_FILE = "match_scouting.npz"
+
+# Where Scout Radioz is. Set SCOUT_RADIOZ_BASE_URL to point the scrape somewhere else, i.e. a local stub server
+SCOUT_RADIOZ_BASE_URL = os.environ.get("SCOUT_RADIOZ_BASE_URL", "https://scoutradioz.com")
+
+# How long (in seconds) a cached export can be reused without downloading it again
+SCOUT_RADIOZ_TTL = 0
+
+# Partner orgs whose scouting forms name things differently than ours. "columns" renames export columns, and
+# "values" rewrites values in the (renamed) columns. Adding a new org is just a new entry here.
+ORG_MATCH_SCOUTING_MAPPINGS = {
+    "frc8749": {
+        "columns": {
+            "teleCoralL1": "teleopCoralL1",
+            "teleCoralL2": "teleopCoralL2",
+            "teleCoralL3": "teleopCoralL3",
+            "teleCoralL4": "teleopCoralL4",
+            "teleAlgaeNet": "teleopAlgaeNet",
+            "teleAlgaeProcessor": "teleopAlgaeProc",
+            "autoAlgaeProcessor": "autoAlgaeProc",
+            "endgameBarge": "bargeStatus",
+        },
+        "values": {
+            "bargeStatus": {
+                "Hanging on Deep Cage": "Deep Cage",
+                "Hanging on Shallow Cage": "Shallow Cage",
+            },
+        },
+    },
+}
+
+def __make_request(url: str, org_key: str, event_key: str, ttl=SCOUT_RADIOZ_TTL) -> bytes:
 
     cookies = {
         "org_key": org_key,
@@ -12,59 +51,335 @@ def __make_request(url: str, org_key: str, event_key: str) -> bytes:
         "Mozilla/5.0 (Windows; U; Windows NT 5.1; en-US; rv:1.9.0.7) Gecko/2009021910 Firefox/3.0.7",
     }
 
-    response = requests.get(url, cookies=cookies, headers=headers)
+    response = http_utils.get(url, ttl=ttl, cookies=cookies, headers=headers)
 
     return response.content
 
 
 def request_scout_radioz_match_scouting(org_key, event_key):
-    url = "https://scoutradioz.com/reports/exportdata?type=matchscouting"
+    url = f"{SCOUT_RADIOZ_BASE_URL}/reports/exportdata?type=matchscouting"
 
     return __make_request(url, org_key, event_key)
 
 
-def download_scout_radioz_match_scouting(org_key, event_key, output_file):
+def download_scout_radioz_match_scouting(org_key, event_key, output_file) -> bool:
     content = request_scout_radioz_match_scouting(org_key, event_key)
 
-    with open(output_file, 'wb') as f:
-        f.write(content)
-
-    if org_key == "frc8749":
-        import pandas as pd
-        df = pd.read_csv(output_file)
-
-        df.rename(
-            inplace=True,
-            columns={
-                "teleCoralL1": "teleopCoralL1",
-                "teleCoralL2": "teleopCoralL2",
-                "teleCoralL3": "teleopCoralL3",
-                "teleCoralL4": "teleopCoralL4",
-                "teleAlgaeNet": "teleopAlgaeNet",
-                "teleAlgaeProcessor": "teleopAlgaeProc",
-                "autoAlgaeNet": "autoAlgaeNet",
-                "autoAlgaeProcessor": "autoAlgaeProc",
-                "endgameBarge": "bargeStatus",
-            },
-        )
-        lookup = df[df["bargeStatus"] == "Hanging on Deep Cage"].index
-        df.loc[lookup, "bargeStatus"] = "Deep Cage"
-
-        lookup = df[df["bargeStatus"] == "Hanging on Shallow Cage"].index
-        df.loc[lookup, "bargeStatus"] = "Shallow Cage"
-
-        df.to_csv(output_file, index=False)
+    if org_key in ORG_MATCH_SCOUTING_MAPPINGS:
+        content = map_org_export(content, ORG_MATCH_SCOUTING_MAPPINGS[org_key])
 
+    return http_utils.write_if_changed(output_file, content)
 
 
 def request_scout_radioz_pit_scouting(org_key, event_key):
-    url = "https://scoutradioz.com/reports/exportdata?type=pitscouting"
+    url = f"{SCOUT_RADIOZ_BASE_URL}/reports/exportdata?type=pitscouting"
 
     return __make_request(url, org_key, event_key)
 
 
-def download_scout_radioz_pit_scouting(org_key, event_key, output_file):
+def download_scout_radioz_pit_scouting(org_key, event_key, output_file) -> bool:
     content = request_scout_radioz_pit_scouting(org_key, event_key)
 
-    with open(output_file, 'wb') as f:
-        f.write(content)
+    return http_utils.write_if_changed(output_file, content)
+
+
+def map_org_export(content: bytes, mapping: dict) -> bytes:
+    """
+    Renames the columns and rewrites the values of an export in a single pass over its rows, without parsing it
+    into a data frame. The rows are decoded as they are read rather than decoding the whole export up front.
+
+    The export is mapped from the response body rather than while it downloads, since the http cache keeps the
+    raw body (a 304 hands back the cached one, with nothing to stream) and the mapped export has to be complete to
+    tell whether the file on disk changed. Exports are a few hundred KB at most.
+    :param content: The raw csv export
+    :param mapping: The org's entry in ORG_MATCH_SCOUTING_MAPPINGS
+    :return: The mapped csv export
+    """
+    columns = mapping.get("columns", {})
+    values = mapping.get("values", {})
+
+    reader = csv.reader(io.TextIOWrapper(io.BytesIO(content), encoding="utf-8", newline=""))
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+
+    header = next(reader, None)
+    if header is None:
+        return content
+
+    header = [columns.get(name, name) for name in header]
+    writer.writerow(header)
+    lookups = [(i, values[name]) for i, name in enumerate(header) if name in values]
+
+    for row in reader:
+        for i, lookup in lookups:
+            if i < len(row):
+                row[i] = lookup.get(row[i], row[i])
+        writer.writerow(row)
+
+    return output.getvalue().encode("utf-8")
+
+
+############################################
+# Export Schemas
+############################################
+# Declared types for the columns of the exports that get used. Columns that aren't listed here are never read.
+# Counts are small ints, anything with a handful of possible values is a categorical, and team keys ("frc3260") are
+# loaded as a categorical of team numbers ("3260"), so each row only holds a small integer code.
+CATEGORY = "category"
+TEXT = "text"
+TEAM = "team"
+
+MATCH_SCOUTING_SCHEMA = {
+    "event_key": CATEGORY,
+    "match_key": CATEGORY,
+    "match_number": np.int16,
+    "alliance": CATEGORY,
+    "team_key": TEAM,
+    # Auto
+    "startingPosition": CATEGORY,
+    "didLeaveStartingZone": np.int8,
+    "autoCoralL1": np.int16,
+    "autoCoralL2": np.int16,
+    "autoCoralL3": np.int16,
+    "autoCoralL4": np.int16,
+    "autoAlgaeProc": np.int16,
+    "autoAlgaeNet": np.int16,
+    # Teleop
+    "teleopCoralL1": np.int16,
+    "teleopCoralL2": np.int16,
+    "teleopCoralL3": np.int16,
+    "teleopCoralL4": np.int16,
+    "teleopAlgaeProc": np.int16,
+    "teleopAlgaeNet": np.int16,
+    # Endgame
+    "totalEndgamePoints": np.int16,
+    "bargeStatus": CATEGORY,
+    "ClimbTime": np.int16,
+    # Observations
+    "Reliability": np.float32,
+    "didDefense": np.int8,
+    "Defenserating": np.int8,
+    "totalMinorFouls": np.int16,
+    "totalMajorFouls": np.int16,
+    "diedDuringMatch": np.int8,
+    "recoveredFromFreeze": np.int8,
+    "didYellowCard": np.int8,
+    "didRedCard": np.int8,
+}
+
+PIT_SCOUTING_SCHEMA = {
+    "event_key": CATEGORY,
+    "team_key": TEAM,
+    "driverYearsOnDriveTeam": np.int8,
+    "humanPlayerYearsOnDriveTeam": np.int8,
+    "coachYearsOnDriveTeam": np.int8,
+    "driveBaseMultiSelect": CATEGORY,
+    # Scouts type whatever they like into these, so anything that isn't a number is dropped
+    "DrivetrainQuality": np.float32,
+    "driveBaseLength": np.float32,
+    "driveBaseWidth": np.float32,
+    "robotHeight": np.float32,
+    "robotWeight": np.float32,
+    "driveCenterOfGravity": CATEGORY,
+    "electricalWiring": np.float32,
+    "mechanicalQuality": np.float32,
+    "canPickupCoralGround": np.int8,
+    "canPickupAlgaeground": np.int8,
+    "canPickupCoralFeedstation": np.int8,
+    "canPickupAlgaeReef": np.int8,
+    "ProgrammingLanguage": CATEGORY,
+    "scoreL1": np.int8,
+    "scoreL2": np.int8,
+    "scoreL3": np.int8,
+    "scoreL4": np.int8,
+    "scoreProcessor": np.int8,
+    "scoreNet": np.int8,
+    "usualStrategy": TEXT,
+    "StartProcess": np.int8,
+    "StartCenter": np.int8,
+    "StartFar": np.int8,
+    "describeAuto": TEXT,
+    "CageClimb": CATEGORY,
+    "comments": TEXT,
+}
+
+
+def read_export(csv, schema: dict) -> pd.DataFrame:
+    """
+    Reads a Scout Radioz export, keeping only the columns in the schema and giving them their declared types.
+    Blank integer fields are read as 0.
+    :param csv: The path or file-like object of the csv export
+    :param schema: Column name -> numpy type, CATEGORY, TEXT or TEAM
+    :return: The data frame. Columns from the schema that aren't in the export are left out
+    """
+    categories = {column: "category" for column, dtype in schema.items() if dtype in (CATEGORY, TEAM)}
+    try:
+        df = pd.read_csv(csv, usecols=lambda column: column in schema, dtype=categories)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=list(schema))
+
+    for column in df.columns:
+        dtype = schema[column]
+        if dtype == TEAM:
+            df[column] = df[column].cat.rename_categories(lambda team_key: team_key[3:])
+        elif dtype in (CATEGORY, TEXT):
+            continue
+        elif np.issubdtype(dtype, np.integer):
+            df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0).astype(dtype)
+        else:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(dtype)
+
+    return df
+
+
+def load_pit_scouting(csv_file) -> pd.DataFrame:
+    """
+    Loads the pit scouting export for an event
+    :param csv_file: The path to the pit_scouting.csv file, or a file-like object holding it
+    :return: The data frame, with team_key as the team number
+    """
+    return read_export(csv_file, PIT_SCOUTING_SCHEMA)
+
+
+############################################
+# Match Scouting Derived Metrics
+############################################
+def add_derived_match_scouting_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the aggregate point and piece columns that the report is built around
+    :param df: The raw match scouting data
+    :return: The same dataframe, with the new columns added
+    """
+    df["totalTeleopCoral"] = df["teleopCoralL1"] + df["teleopCoralL2"] + df["teleopCoralL3"] + df["teleopCoralL4"]
+    df["totalAutoCoral"] = df["autoCoralL1"] + df["autoCoralL2"] + df["autoCoralL3"] + df["autoCoralL4"]
+
+    df["totalTeleopCoralPoints"] = df["teleopCoralL1"]*2 + df["teleopCoralL2"]*3 + df["teleopCoralL3"]*4 + df["teleopCoralL4"]*5
+    df["totalTeleopAlgaePoints"] = df["teleopAlgaeNet"]*4 + df["teleopAlgaeProc"]*6
+    df["totalTeleopPoints"] = df["totalTeleopCoralPoints"] + df["totalTeleopAlgaePoints"]
+
+    df["totalAutoCoralPoints"] = df["autoCoralL1"]*3 + df["autoCoralL2"]*4 + df["autoCoralL3"]*6 + df["autoCoralL4"]*7
+    df["totalAutoAlgaePoints"] = df["autoAlgaeNet"]*4 + df["autoAlgaeProc"]*6
+    df["totalAutoPoints"] = df["totalAutoCoralPoints"] + df["totalAutoAlgaePoints"]
+
+    df["algaeTeleop"] = df["teleopAlgaeNet"] + df["teleopAlgaeProc"]
+    df["algaeAuto"] = df["autoAlgaeNet"] + df["autoAlgaeProc"]
+
+    df["totalPieces"] = df["totalTeleopCoral"] + df["totalAutoCoral"] + df["algaeTeleop"] + df["algaeAuto"]
+
+    position = df["bargeStatus"]
+    df["endgamePoints"] = np.where(position == "Parked", 2, np.where(position == "Shallow Cage", 6, np.where(position == "Deep Cage", 12, 0))).astype(np.int16)
+
+    df["endgamePlusAuto"] = df["totalAutoPoints"] + df["totalEndgamePoints"]
+
+    df["totalPointsScored"] = df["totalTeleopPoints"] + df["totalAutoPoints"] + df["endgamePoints"]
+
+    return df
+
+
+def match_scouting_csv_to_dataframe(csv) -> pd.DataFrame:
+    """
+    Parses the Scout Radioz match scouting export and calculates the derived metrics
+    :param csv: The path or file-like object of the csv export
+    :return: The data frame, with team_key stripped down to just the team number
+    """
+    df = read_export(csv, MATCH_SCOUTING_SCHEMA)
+    df = add_derived_match_scouting_columns(df)
+
+    return df
+
+
+def load_match_scouting(csv_file: Path) -> pd.DataFrame:
+    """
+    Loads the match scouting data for an event, preferring the precalculated store if it has been built
+    :param csv_file: The path to the match_scouting.csv file
+    :return: The data frame
+    """
+    store_file = csv_file.parent / MATCH_SCOUTING_STORE_FILE
+    if store_file.exists():
+        return load_match_scouting_store(store_file)
+
+    return match_scouting_csv_to_dataframe(csv_file)
+
+
+############################################
+# Match Scouting Store
+############################################
+def __compact_dtype(column: pd.Series):
+    if pd.api.types.is_integer_dtype(column):
+        # Columns from the schema are already as small as they need to be, only the derived ones get narrowed
+        if column.dtype.itemsize <= 2:
+            return column.dtype
+        for dtype in (np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if column.empty or (column.min() >= info.min and column.max() <= info.max):
+                return dtype
+        return np.int64
+
+    if pd.api.types.is_float_dtype(column):
+        return np.float32
+
+    return str
+
+
+def save_match_scouting_store(df: pd.DataFrame, output_file: Path):
+    """
+    Saves the processed match scouting data as a compressed columnar numpy archive. Numeric columns keep their
+    declared type (derived ones are narrowed to the smallest type that holds them) and are stored as one block per
+    type, and text and categorical columns are saved as codes into a single shared vocabulary.
+    :param df: The data frame, as returned by match_scouting_csv_to_dataframe
+    :param output_file: The path to save the archive to
+    """
+    blocks = {}
+    for name in df.columns:
+        dtype = __compact_dtype(df[name])
+        blocks.setdefault(np.dtype(dtype).name, []).append(name)
+
+    arrays = {"columns": np.array(df.columns, dtype=str)}
+    for dtype_name, names in blocks.items():
+        if dtype_name.startswith("str"):
+            vocabulary, codes = np.unique(df[names].astype(object).fillna("").to_numpy(dtype=str), return_inverse=True)
+            arrays["vocabulary"] = vocabulary
+            arrays["text"] = codes.reshape(len(df), len(names)).T.astype(np.int32)
+            arrays["text_columns"] = np.array(names, dtype=str)
+        else:
+            arrays[dtype_name] = df[names].to_numpy(dtype=dtype_name).T
+            arrays[f"{dtype_name}_columns"] = np.array(names, dtype=str)
+
+    with open(output_file, "wb") as f:
+        np.savez_compressed(f, **arrays)
+
+
+def load_match_scouting_store(store_file: Path) -> pd.DataFrame:
+    """
+    Loads the match scouting data from the precalculated store. No derived metrics need to be recalculated.
+    :param store_file: The path to the archive
+    :return: The data frame, in the same form as match_scouting_csv_to_dataframe
+    """
+    columns = {}
+    with np.load(store_file, allow_pickle=False) as archive:
+        for key in archive.files:
+            if key == "text":
+                vocabulary = archive["vocabulary"].astype(object)
+                vocabulary[vocabulary == ""] = np.nan
+                values = vocabulary[archive["text"]]
+                columns.update(zip(archive["text_columns"], values))
+            elif key not in ("columns", "vocabulary") and not key.endswith("_columns"):
+                columns.update(zip(archive[f"{key}_columns"], archive[key]))
+
+        df = pd.DataFrame(columns, columns=archive["columns"])
+
+    for column, dtype in MATCH_SCOUTING_SCHEMA.items():
+        if dtype in (CATEGORY, TEAM) and column in df.columns:
+            df[column] = df[column].astype("category")
+
+    return df
+
+
+def build_match_scouting_store(csv_file: Path, output_file: Path):
+    """
+    Converts a downloaded match scouting export into the precalculated store
+    :param csv_file: The match_scouting.csv file
+    :param output_file: The path to save the store to
+    """
+    df = match_scouting_csv_to_dataframe(csv_file)
+    save_match_scouting_store(df, output_file)
@@ -0,0 +1,203 @@
+import hashlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# What gets sampled out of every scouted match. Each simulated alliance is the sum of one sampled match per team.
+SAMPLED_COLUMNS = [
+    "totalPointsScored",
+    "coralL1",
+    "coralL2",
+    "coralL3",
+    "coralL4",
+    "totalAutoCoral",
+    "algaeProcessor",
+    "endgamePoints",
+    "leftStartingZone",
+]
+
+SCORE_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+# 2025 ranking point thresholds (regional / district event values)
+CORAL_RP_PIECES_PER_LEVEL = 5
+COOPERTITION_PROCESSOR_ALGAE = 2
+BARGE_RP_POINTS = 14
+WIN_RP = 3
+TIE_RP = 1
+
+
+class MatchSimulator:
+    """
+    Monte Carlo simulator for a single match, built from the match scouting data. A simulated alliance performance is
+    made by picking one of each team's scouted matches at random and adding them up, so the spread of the result
+    comes straight from how consistent the teams have been.
+    """
+
+    def __init__(self, scouting_df: pd.DataFrame):
+        """
+        :param scouting_df: The match scouting data, as returned by scout_radioz_utils.load_match_scouting
+        """
+        samples = pd.DataFrame(
+            {
+                "totalPointsScored": scouting_df["totalPointsScored"],
+                "coralL1": scouting_df["autoCoralL1"] + scouting_df["teleopCoralL1"],
+                "coralL2": scouting_df["autoCoralL2"] + scouting_df["teleopCoralL2"],
+                "coralL3": scouting_df["autoCoralL3"] + scouting_df["teleopCoralL3"],
+                "coralL4": scouting_df["autoCoralL4"] + scouting_df["teleopCoralL4"],
+                "totalAutoCoral": scouting_df["totalAutoCoral"],
+                "algaeProcessor": scouting_df["autoAlgaeProc"] + scouting_df["teleopAlgaeProc"],
+                "endgamePoints": scouting_df["endgamePoints"],
+                # Not every org scouts this. Assume robots leave if it isn't there
+                "leftStartingZone": scouting_df.get("didLeaveStartingZone", pd.Series(1, index=scouting_df.index)),
+            }
+        )
+
+        # Nothing is known about a team without data, so it gets a single placeholder match where it scores nothing
+        # but is assumed to leave
+        placeholder = np.zeros((1, len(SAMPLED_COLUMNS)))
+        placeholder[0, SAMPLED_COLUMNS.index("leftStartingZone")] = 1
+        self.samples = np.vstack([np.nan_to_num(samples[SAMPLED_COLUMNS].to_numpy(dtype=np.float64)), placeholder])
+
+        # Every team's rows are laid out back to back, so a team is just a (start, count) slice
+        self.rows_by_team = scouting_df.groupby("team_key").indices
+        self.__flat_rows = np.concatenate([*self.rows_by_team.values(), [len(self.samples) - 1]]).astype(np.int64)
+        self.__team_slices = {}
+        start = 0
+        for team, rows in self.rows_by_team.items():
+            self.__team_slices[team] = (start, len(rows))
+            start += len(rows)
+        self.__missing_team_slice = (start, 1)
+        self.__fingerprints = {}
+
+    def team_fingerprint(self, team: str) -> str:
+        """
+        Gets a hash of everything the simulator knows about a team. It changes whenever the team's scouting data does.
+        :param team: The team number
+        :return: The hash
+        """
+        if team not in self.__fingerprints:
+            start, count = self.__team_slices.get(team, self.__missing_team_slice)
+            rows = self.__flat_rows[start:start + count]
+            self.__fingerprints[team] = hashlib.sha1(self.samples[rows].tobytes()).hexdigest()
+
+        return self.__fingerprints[team]
+
+    def sample_alliances(self, alliances, num_simulations: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Samples the performance of many alliances at once
+        :param alliances: A (num_alliances, robots_per_alliance) array-like of team numbers
+        :param num_simulations: How many matches to simulate for each alliance
+        :param rng: The random number generator to use
+        :return: A (num_simulations, num_alliances, len(SAMPLED_COLUMNS)) array
+        """
+        alliances = np.asarray(alliances, dtype=object).reshape(len(alliances), -1)
+
+        total = np.zeros((num_simulations, len(alliances), len(SAMPLED_COLUMNS)))
+        for station in range(alliances.shape[1]):
+            slices = np.array([self.__team_slices.get(team, self.__missing_team_slice) for team in alliances[:, station]])
+            starts, counts = slices[:, 0], slices[:, 1]
+
+            draws = (rng.random((num_simulations, len(alliances))) * counts).astype(np.int64)
+            total += self.samples[self.__flat_rows[starts + draws]]
+
+        return total
+
+    def sample_alliance(self, teams: List[str], num_simulations: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Samples an alliance's performance
+        :param teams: The team numbers on the alliance
+        :param num_simulations: How many matches to simulate
+        :param rng: The random number generator to use
+        :return: A (num_simulations, len(SAMPLED_COLUMNS)) array
+        """
+        return self.sample_alliances([teams], num_simulations, rng)[:, 0, :]
+
+    def simulate(
+        self,
+        red_teams: List[str],
+        blue_teams: List[str],
+        num_simulations: int = 20000,
+        seed: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Simulates a match between two alliances
+        :param red_teams: The team numbers on the red alliance
+        :param blue_teams: The team numbers on the blue alliance
+        :param num_simulations: How many matches to simulate
+        :param seed: Seed for the random number generator, for repeatable results
+        :return: A dictionary with the win / tie probabilities, and per alliance ("red" / "blue") the score
+            quantiles, the odds of each bonus ranking point and the expected ranking points
+        """
+        rng = np.random.default_rng(seed)
+        red = self.sample_alliance(red_teams, num_simulations, rng)
+        blue = self.sample_alliance(blue_teams, num_simulations, rng)
+
+        return summarize_simulated_matches(red, blue, len(red_teams), len(blue_teams))
+
+
+def alliance_bonus_rps(alliance: np.ndarray, opponent: np.ndarray, num_robots: int) -> Dict[str, np.ndarray]:
+    """
+    Works out which bonus ranking points an alliance earned in each simulated match
+    :param alliance: The sampled alliance, as returned by MatchSimulator.sample_alliance. Any number of leading
+        dimensions is allowed
+    :param opponent: The opposing alliance, shaped the same way
+    :param num_robots: The number of robots on the alliance, needed to know if everyone left the starting zone
+    :return: A dictionary of boolean arrays, one per ranking point
+    """
+    column = SAMPLED_COLUMNS.index
+
+    auto_rp = (alliance[..., column("leftStartingZone")] >= num_robots) & (alliance[..., column("totalAutoCoral")] >= 1)
+
+    # Coopertition drops the coral RP requirement from four levels to three
+    coopertition = (alliance[..., column("algaeProcessor")] >= COOPERTITION_PROCESSOR_ALGAE) & (
+        opponent[..., column("algaeProcessor")] >= COOPERTITION_PROCESSOR_ALGAE
+    )
+    levels = alliance[..., [column("coralL1"), column("coralL2"), column("coralL3"), column("coralL4")]]
+    levels_completed = (levels >= CORAL_RP_PIECES_PER_LEVEL).sum(axis=-1)
+    coral_rp = levels_completed >= np.where(coopertition, 3, 4)
+
+    barge_rp = alliance[..., column("endgamePoints")] >= BARGE_RP_POINTS
+
+    return {"auto": auto_rp, "coral": coral_rp, "barge": barge_rp}
+
+
+def summarize_simulated_matches(red: np.ndarray, blue: np.ndarray, num_red_robots: int = 3, num_blue_robots: int = 3) -> Dict[str, Any]:
+    """
+    Reduces a batch of simulated matches down to the odds the report shows
+    :param red: The sampled red alliance
+    :param blue: The sampled blue alliance
+    :param num_red_robots: The number of robots on red
+    :param num_blue_robots: The number of robots on blue
+    :return: See MatchSimulator.simulate
+    """
+    points = SAMPLED_COLUMNS.index("totalPointsScored")
+    red_score = red[:, points]
+    blue_score = blue[:, points]
+
+    red_wins = red_score > blue_score
+    blue_wins = blue_score > red_score
+    ties = ~(red_wins | blue_wins)
+
+    output = {
+        "num_simulations": len(red_score),
+        "red_win_prob": float(red_wins.mean()),
+        "blue_win_prob": float(blue_wins.mean()),
+        "tie_prob": float(ties.mean()),
+    }
+
+    for name, alliance, opponent, wins, num_robots in [
+        ("red", red, blue, red_wins, num_red_robots),
+        ("blue", blue, red, blue_wins, num_blue_robots),
+    ]:
+        bonus_rps = alliance_bonus_rps(alliance, opponent, num_robots)
+        rps = wins * WIN_RP + ties * TIE_RP + sum(bonus_rps.values())
+
+        output[name] = {
+            "score_quantiles": dict(zip(SCORE_QUANTILES, np.quantile(alliance[:, points], SCORE_QUANTILES).tolist())),
+            "rp_odds": {rp: float(earned.mean()) for rp, earned in bonus_rps.items()},
+            "expected_rp": float(rps.mean()),
+        }
+
+    return output
@@ -1,64 +1,137 @@
 import json
+import os
 from pathlib import Path
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
+
+from utils import http_utils, json_utils
+from utils.json_utils import CATEGORY, TEXT, LIST
+
+# Where the Statbotics api is. Set STATBOTICS_BASE_URL to point the scrape somewhere else, i.e. a local stub server
+STATBOTICS_BASE_URL = os.environ.get("STATBOTICS_BASE_URL", "https://api.statbotics.io/v3")
+
+# How long (in seconds) a cached response can be reused without asking the server if it changed
+STATBOTICS_MATCHES_TTL = 0
+STATBOTICS_TEAMS_TTL = 0
+
+# How many matches are asked for at a time. Statbotics caps the limit, so anything longer is fetched a page at a time
+STATBOTICS_PAGE_SIZE = 200
+
+# Field path -> type for everything loaded from the matches. See json_utils.records_to_dataframe
+STATBOTICS_MATCH_FIELDS = {
+    "key": TEXT,
+    "event": CATEGORY,
+    "comp_level": CATEGORY,
+    "set_number": "int16",
+    "match_number": "int16",
+    "status": CATEGORY,
+    "alliances.red.team_keys": LIST,
+    "alliances.blue.team_keys": LIST,
+    "pred.winner": CATEGORY,
+    "pred.red_win_prob": "float64",
+    "pred.red_score": "float64",
+    "pred.blue_score": "float64",
+    "pred.red_auto_rp": "float64",
+    "pred.blue_auto_rp": "float64",
+    "pred.red_coral_rp": "float64",
+    "pred.blue_coral_rp": "float64",
+    "pred.red_barge_rp": "float64",
+    "pred.blue_barge_rp": "float64",
+    "result.winner": CATEGORY,
+    "result.red_score": "float64",
+    "result.blue_score": "float64",
+}
+
+# Field path -> type for everything loaded from the teams at an event. Most of the epa breakdown is left out
+STATBOTICS_TEAM_FIELDS = {
+    "team": "int32",
+    "team_name": TEXT,
+    "event": CATEGORY,
+    "epa.total_points.mean": "float64",
+    "epa.total_points.sd": "float64",
+    "epa.unitless": "float64",
+    "epa.norm": "float64",
+    "epa.breakdown.auto_points": "float64",
+    "epa.breakdown.teleop_points": "float64",
+    "epa.breakdown.endgame_points": "float64",
+    "record.qual.wins": "int16",
+    "record.qual.losses": "int16",
+    "record.qual.ties": "int16",
+    "record.qual.rps": "int16",
+    "record.qual.rank": "int16",
+}
 
 
 ############################################
 # Statbotics Matches
 ############################################
-def download_statbotics_matches(event: str, output_path: Path, quals_only=True):
+def download_statbotics_matches(event: str, output_path: Path, quals_only=True, ttl=STATBOTICS_MATCHES_TTL) -> bool:
     """
     Queries the statbotics api for event info, and saves the json file to disk.
     :param event: The event key (i.e. 2024paca)
     :param output_path: The path to save the json to
     :param quals_only: If true, only data from qualification matches will be saved
+    :param ttl: How long a cached response can be used without revalidating it
+    :return: True if the file on disk changed
     """
-    import statbotics
+    # Same query the statbotics package builds for get_matches, but made over the shared session. A page is only
+    # short once there is nothing after it
+    data = []
+    offset = 0
+    while True:
+        url = f"{STATBOTICS_BASE_URL}/matches?limit={STATBOTICS_PAGE_SIZE}&offset={offset}&event={event}"
+        if quals_only:
+            url += "&elims=False"
+        url += "&metric=time&ascending=True"
 
-    sb = statbotics.Statbotics()
+        response = http_utils.get(url, ttl=ttl)
+        response.raise_for_status()
+        page = response.json()
+        data += page
 
-    elims = False if quals_only else None
-    data = sb.get_matches(event=event, elims=elims)
+        if len(page) < STATBOTICS_PAGE_SIZE:
+            break
+        offset += STATBOTICS_PAGE_SIZE
 
-    with open(output_path, "w") as f:
-        json.dump(data, f, indent=4)
+    return http_utils.write_if_changed(output_path, json.dumps(data, indent=4))
 
 
-def load_statbotics_matches(filename: Path) -> pd.DataFrame:
+def load_statbotics_matches(filename: Path, fields: Dict[str, str] = STATBOTICS_MATCH_FIELDS) -> pd.DataFrame:
     """
     Loads the match information from a file on disk, potentially pre-calculating helpful aggregate data
     :param filename: The filename to load
+    :param fields: Field path -> type of everything to load. See json_utils.records_to_dataframe
     :return: The data in the form of a dataframe
     """
     if not filename.exists():
         print("Statbotics match file does not exist!")
         return pd.DataFrame()
     with open(filename, "r") as f:
-        json_data = json.load(f)
+        return statbotics_matches_json_to_dataframe(json_utils.iter_json_array(f), fields)
 
-    return statbotics_matches_json_to_dataframe(json_data)
 
-
-def statbotics_matches_json_to_dataframe(json_data: Dict[str, Any]) -> pd.DataFrame:
+def statbotics_matches_json_to_dataframe(json_data: Iterable[Dict[str, Any]], fields: Dict[str, str] = STATBOTICS_MATCH_FIELDS) -> pd.DataFrame:
     """
     Converts the json data into a dataframe
-    :param json_data: The json dictionary
+    :param json_data: The matches, either already decoded or streamed with json_utils.iter_json_array
+    :param fields: Field path -> type of everything to load. See json_utils.records_to_dataframe
     :return: The data frame
     """
 
-    # There is nothing interesting to precalculate, so we just shove the json into a dataframe
-    return pd.json_normalize(json_data)
+    # There is nothing interesting to precalculate, so we just pull the fields out into a dataframe
+    return json_utils.records_to_dataframe(json_data, fields)
 
 
 ############################################
 # Statbotics Events
 ############################################
-def download_statbotics_event_teams(event: str, output_path: Path):
+def download_statbotics_event_teams(event: str, output_path: Path, ttl=STATBOTICS_TEAMS_TTL) -> bool:
     """
     Queries the API and downloads event data and saves the json response to disk.
     :param event: The event key (i.e. 2024paca)
     :param output_path: The location on disk to save the file
+    :param ttl: How long a cached response can be used without revalidating it
+    :return: True if the file on disk changed
     """
     # import statbotics
 
@@ -68,36 +141,34 @@ def download_statbotics_event_teams(event: str, output_path: Path):
     # with open(output_path, "w") as f:
     #     json.dump(data, f, indent=4)
 
-    import requests
-
-    url = f"https://api.statbotics.io/v3/team_events?event={event}"
+    url = f"{STATBOTICS_BASE_URL}/team_events?event={event}"
 
-    response = requests.get(url)
+    response = http_utils.get(url, ttl=ttl)
+    response.raise_for_status()
 
-    with open(output_path, "w") as f:
-        as_json = response.json()
-        json.dump(as_json, f, indent=4)
+    as_json = response.json()
+    return http_utils.write_if_changed(output_path, json.dumps(as_json, indent=4))
 
 
-def load_statbotics_teams(filename: Path):
+def load_statbotics_teams(filename: Path, fields: Dict[str, str] = STATBOTICS_TEAM_FIELDS):
     """
     Loads the json data for teams at an event from disk
     :param filename: The path to the cached json file.
+    :param fields: Field path -> type of everything to load. See json_utils.records_to_dataframe
     :return: The dataframe representing the json and some helpful precalculated aggregate data
     """
     with open(filename, "r") as f:
-        json_data = json.load(f)
-
-    return statbotics_teams_json_to_dataframe(json_data)
+        return statbotics_teams_json_to_dataframe(json_utils.iter_json_array(f), fields)
 
 
-def statbotics_teams_json_to_dataframe(json_data: Dict[str, Any]) -> pd.DataFrame:
+def statbotics_teams_json_to_dataframe(json_data: Iterable[Dict[str, Any]], fields: Dict[str, str] = STATBOTICS_TEAM_FIELDS) -> pd.DataFrame:
     """
     Converts teams into a dataframe, adding in some helpful precalculated aggregate data.
-    :param json_data: The json dictionary
+    :param json_data: The teams, either already decoded or streamed with json_utils.iter_json_array
+    :param fields: Field path -> type of everything to load. See json_utils.records_to_dataframe
     :return: The data frame
     """
-    output = pd.json_normalize(json_data)
+    output = json_utils.records_to_dataframe(json_data, fields)
 
     return output
 
@@ -0,0 +1,744 @@
+import datetime
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from utils import http_utils, scout_radioz_utils, statbotics_utils, tba_utils
+from utils.alliance_selection_utils import BRANCHES_PER_LEVEL
+from utils.reconciliation_utils import TBA_BARGE_STATUSES
+from utils.scout_radioz_utils import MATCH_SCOUTING_STORE_FILE, build_match_scouting_store
+from utils.simulation_utils import BARGE_RP_POINTS, COOPERTITION_PROCESSOR_ALGAE, CORAL_RP_PIECES_PER_LEVEL, TIE_RP, WIN_RP
+
+SYNTHETIC_EVENT_CODE = "synth"
+
+DEFAULT_NUM_TEAMS = 40
+DEFAULT_MATCHES_PER_TEAM = 12
+
+# Across a season, each event draws its teams from a pool this much bigger than one event, so teams show up at
+# some of the events but not all of them
+SEASON_POOL_FACTOR = 1.6
+
+# How much a team's skill changes from one event to the next. Teams get a little better over a season on average
+SKILL_DRIFT_MEAN = 0.03
+SKILL_DRIFT_SD = 0.05
+
+# Match to match form is a gamma with mean 1. The higher the shape, the more consistent every team is
+FORM_SHAPE = 5.0
+
+# How the scouts get it wrong: a whole match not scouted, or a count that is off by one
+MISSED_SCOUT_RATE = 0.02
+MISCOUNT_RATE = 0.08
+
+# How many of the teams get pit scouted
+PIT_SCOUTED_RATE = 0.9
+
+MATCH_CYCLE_SECONDS = 7 * 60
+MATCHES_PER_DAY = 60
+
+# 2025 scoring, L1 to L4
+AUTO_CORAL_POINTS = np.array([3, 4, 6, 7])
+TELEOP_CORAL_POINTS = np.array([2, 3, 4, 5])
+PROCESSOR_ALGAE_POINTS = 6
+NET_ALGAE_POINTS = 4
+LEAVE_POINTS = 3
+MINOR_FOUL_POINTS = 2
+MAJOR_FOUL_POINTS = 6
+BARGE_POINTS = {"Not Parked": 0, "Parked": 2, "Shallow Cage": 6, "Deep Cage": 12}
+SCOUTED_BARGE_STATUSES = {scouted: tba for tba, scouted in TBA_BARGE_STATUSES.items()}
+
+STARTING_POSITIONS = ["Cage Side", "Middle", "Processor Side"]
+
+MATCH_SCOUTING_COLUMNS = [
+    "org_key", "year", "event_key", "match_key", "match_number", "time", "alliance", "team_key",
+    "totalAutoPoints", "totalTeleopPoints", "totalEndgamePoints", "contributedPoints",
+    "totalAutoCoral", "totalTeleopCoral", "totalCoral", "totalAutoAlgae", "totalTeleopAlgae", "totalAlgae",
+    "ClimbTime", "Reliability", "startingPosition", "didLeaveStartingZone",
+    "autoCoralL4", "autoCoralL3", "autoCoralL2", "autoCoralL1", "autoAlgaeProc", "autoAlgaeNet",
+    "teleopCoralL4", "teleopCoralL3", "teleopCoralL2", "teleopCoralL1", "teleopAlgaeProc", "teleopAlgaeNet",
+    "didDefense", "Defenserating", "totalMinorFouls", "totalMajorFouls", "climbingStartTime", "climbingStopTime",
+    "bargeStatus", "diedDuringMatch", "recoveredFromFreeze", "didYellowCard", "didRedCard",
+]
+
+PIT_SCOUTING_COLUMNS = [
+    "org_key", "year", "event_key", "team_key",
+    "driverYearsOnDriveTeam", "humanPlayerYearsOnDriveTeam", "coachYearsOnDriveTeam", "driveBaseMultiSelect",
+    "DrivetrainQuality", "driveBaseLength", "driveBaseWidth", "robotHeight", "robotWeight", "driveCenterOfGravity",
+    "electricalWiring", "mechanicalQuality", "canPickupCoralGround", "canPickupAlgaeground",
+    "canPickupCoralFeedstation", "canPickupAlgaeReef", "ProgrammingLanguage",
+    "scoreL1", "scoreL2", "scoreL3", "scoreL4", "scoreProcessor", "scoreNet", "usualStrategy",
+    "StartProcess", "StartCenter", "StartFar", "describeAuto", "CageClimb", "comments",
+]
+
+# The export only leaves the row identifiers unquoted
+UNQUOTED_EXPORT_COLUMNS = 8
+
+# The counts a scout can miscount
+SCOUTED_COUNTS = [
+    "autoCoralL1", "autoCoralL2", "autoCoralL3", "autoCoralL4", "autoAlgaeProc", "autoAlgaeNet",
+    "teleopCoralL1", "teleopCoralL2", "teleopCoralL3", "teleopCoralL4", "teleopAlgaeProc", "teleopAlgaeNet",
+]
+
+
+class SyntheticSeason:
+    """
+    Makes up a season of events, with every file the scrape would have written for them. Each team has a latent
+    skill (drawn from a right skewed beta, so most teams are middling and a few are very good), and a style that
+    stays with it all season: which reef levels it prefers, how much it plays algae, and which cage it can climb.
+    Every match each robot plays is drawn from its team's rates, scaled by how well it happened to go that day.
+
+    The official results (TBA and Statbotics) are built from what the robots really did, and the scouting is built
+    from what the scouts saw: some matches are missed, some counts are off by one and some matches are scouted twice.
+    """
+
+    def __init__(
+        self,
+        num_teams: int = DEFAULT_NUM_TEAMS,
+        matches_per_team: int = DEFAULT_MATCHES_PER_TEAM,
+        num_events: int = 1,
+        duplicate_scout_rate: float = 0.0,
+        year: int = 2025,
+        event_code: str = SYNTHETIC_EVENT_CODE,
+        org: str = "synthetic",
+        include_teams: Iterable[int] = (),
+        seed: Optional[int] = None,
+    ):
+        """
+        :param num_teams: How many teams are at each event
+        :param matches_per_team: How many qualification matches each team plays
+        :param num_events: How many events are in the season. Teams carry their skill (and style) from one to the next
+        :param duplicate_scout_rate: The odds that a robot's match is scouted a second time, by a different scout
+        :param year: The season
+        :param event_code: The events are keyed <year><event_code>, or <year><event_code><n> for more than one
+        :param org: The Scout Radioz org that did the scouting
+        :param include_teams: Team numbers that are at every event (i.e. our own)
+        :param seed: Seed for the random number generator, for repeatable data
+        """
+        self.num_teams = num_teams
+        self.matches_per_team = matches_per_team
+        self.num_events = num_events
+        self.duplicate_scout_rate = duplicate_scout_rate
+        self.year = year
+        self.event_code = event_code
+        self.org = org
+        self.rng = np.random.default_rng(seed)
+
+        include_teams = list(dict.fromkeys(int(team) for team in include_teams))
+        pool_size = num_teams if num_events == 1 else math.ceil(num_teams * SEASON_POOL_FACTOR)
+        others = self.rng.choice(np.setdiff1d(np.arange(1, 11000), include_teams), pool_size - len(include_teams), replace=False)
+        self.include_teams = include_teams
+        self.teams = {int(team): self.__make_team() for team in [*include_teams, *others]}
+
+    @property
+    def event_keys(self) -> List[str]:
+        if self.num_events == 1:
+            return [f"{self.year}{self.event_code}"]
+        return [f"{self.year}{self.event_code}{i + 1}" for i in range(self.num_events)]
+
+    def generate(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Plays out the whole season
+        :return: Event key -> file name -> its content. The json files hold the decoded response, the csv exports
+            their text
+        """
+        events = {}
+        attended = set()
+        for index, event in enumerate(self.event_keys):
+            if index > 0:
+                for team in self.teams.values():
+                    team["skill"] = float(np.clip(team["skill"] + self.rng.normal(SKILL_DRIFT_MEAN, SKILL_DRIFT_SD), 0.01, 0.99))
+
+            others = [team for team in self.teams if team not in self.include_teams]
+            teams = sorted([*self.include_teams, *self.rng.choice(others, self.num_teams - len(self.include_teams), replace=False).tolist()])
+            events[event] = self.__generate_event(event, index, teams, first_events=[team for team in teams if team not in attended])
+            attended.update(teams)
+
+        return events
+
+    ############################################
+    # Teams
+    ############################################
+    def __make_team(self) -> Dict[str, Any]:
+        skill = float(self.rng.beta(2, 3))
+
+        # Better teams go for the top of the reef, and are the ones that can get onto the deep cage
+        teleop_levels = self.rng.dirichlet(4 * np.array([1.5 * (1 - skill) + 0.2, 0.6 + 0.5 * skill, 0.5 + 1.2 * skill, 0.1 + 3 * skill**2]))
+        auto_levels = self.rng.dirichlet(4 * np.array([1.0 * (1 - skill) + 0.1, 0.2, 0.3, 0.2 + 3 * skill]))
+        climb_roll = self.rng.random()
+        cage = "Deep Cage" if climb_roll < skill**2 else ("Shallow Cage" if climb_roll < skill**2 + 0.25 * (1 - skill) else "Parked")
+
+        return {
+            "skill": skill,
+            "teleop_levels": teleop_levels,
+            "auto_levels": auto_levels,
+            "algae_focus": float(self.rng.beta(1.5, 2.5)),
+            "cage": cage,
+            "starting_position": self.rng.choice(STARTING_POSITIONS),
+        }
+
+    def __play(self, team: Dict[str, Any]) -> Dict[str, Any]:
+        # What one robot really did in one match
+        rng = self.rng
+        skill = team["skill"]
+
+        died = rng.random() < 0.01 + 0.06 * (1 - skill)
+        recovered = died and rng.random() < 0.5
+        defense = rng.random() < 0.2 * (1 - skill)
+        effort = rng.gamma(FORM_SHAPE, 1 / FORM_SHAPE) * (rng.uniform(0, 0.5) if died else 1) * (0.4 if defense else 1)
+
+        left = rng.random() < 0.5 + 0.48 * skill
+        auto_coral = rng.multinomial(rng.poisson(2.2 * skill**1.6 * effort), team["auto_levels"]) if left else np.zeros(4, dtype=int)
+        teleop_coral = rng.multinomial(rng.poisson((0.5 + 10 * skill**1.4) * effort), team["teleop_levels"])
+
+        if died and not recovered:
+            barge = "Not Parked"
+        elif team["cage"] != "Parked" and rng.random() < 0.55 + 0.4 * skill:
+            barge = team["cage"]
+        else:
+            barge = "Parked" if rng.random() < 0.7 else "Not Parked"
+
+        return {
+            "left": bool(left),
+            "auto_coral": auto_coral,
+            "teleop_coral": teleop_coral,
+            "auto_algae_processor": int(rng.poisson(0.1 * skill * effort)),
+            "auto_algae_net": int(rng.poisson(0.2 * team["algae_focus"] * skill**2 * effort)),
+            "teleop_algae_processor": int(rng.poisson(3 * team["algae_focus"] * skill * effort)),
+            "teleop_algae_net": int(rng.poisson(4 * team["algae_focus"] * skill**2 * effort)),
+            "barge": barge,
+            "climb_time": int(rng.uniform(4, 25 - 15 * skill)) if barge in ("Shallow Cage", "Deep Cage") else 0,
+            "minor_fouls": int(rng.poisson(0.05 + 0.35 * (1 - skill))),
+            "major_fouls": int(rng.poisson(0.08 * (1 - skill))),
+            "defense": bool(defense),
+            "died": bool(died),
+            "recovered": bool(recovered),
+            "yellow_card": bool(rng.random() < 0.01),
+        }
+
+    ############################################
+    # Event
+    ############################################
+    def __generate_event(self, event: str, index: int, teams: List[int], first_events: List[int]) -> Dict[str, Any]:
+        schedule = self.__schedule(teams)
+        start = datetime.datetime(self.year, 3, 1, 9, tzinfo=datetime.timezone.utc) + datetime.timedelta(weeks=index)
+
+        tba_matches = []
+        statbotics_matches = []
+        scouting_rows = []
+        contributions = {team: [] for team in teams}
+        for match_number, (red, blue, surrogates) in enumerate(schedule, start=1):
+            day, slot = divmod(match_number - 1, MATCHES_PER_DAY)
+            match_time = int((start + datetime.timedelta(days=day, seconds=slot * MATCH_CYCLE_SECONDS)).timestamp())
+
+            played = {team: self.__play(self.teams[team]) for team in red + blue}
+            for team, robot in played.items():
+                contributions[team].append(robot)
+
+            breakdowns = {
+                "red": self.__alliance_breakdown([played[team] for team in red], [played[team] for team in blue]),
+                "blue": self.__alliance_breakdown([played[team] for team in blue], [played[team] for team in red]),
+            }
+            self.__add_ranking_points(breakdowns)
+
+            alliances = {"red": red, "blue": blue}
+            tba_matches.append(self.__tba_match(event, match_number, match_time, alliances, surrogates, breakdowns))
+            statbotics_matches.append(self.__statbotics_match(event, index, match_number, match_time, alliances, surrogates, breakdowns))
+            for alliance, alliance_teams in alliances.items():
+                for team in alliance_teams:
+                    scouting_rows.extend(self.__scout(event, match_number, match_time, alliance, team, played[team]))
+
+        return {
+            "tba_matches.json": tba_matches,
+            "statbotics_matches.json": statbotics_matches,
+            "statbotics_teams.json": self.__statbotics_teams(event, index, start, teams, first_events, contributions, tba_matches),
+            "match_scouting.csv": self.__export(MATCH_SCOUTING_COLUMNS, scouting_rows),
+            "pit_scouting.csv": self.__export(PIT_SCOUTING_COLUMNS, self.__pit_scout(event, teams)),
+        }
+
+    def __schedule(self, teams: List[int]) -> List[tuple]:
+        # Greedy balanced schedule: every match takes the teams that have played the least, preferring the ones that
+        # have waited the longest. When the appearances don't divide evenly, the extra ones are surrogate appearances
+        num_matches = math.ceil(len(teams) * self.matches_per_team / 6)
+        appearances = dict.fromkeys(teams, 0)
+        last_played = dict.fromkeys(teams, -1)
+
+        schedule = []
+        for match_index in range(num_matches):
+            tiebreak = self.rng.random(len(teams))
+            order = sorted(range(len(teams)), key=lambda i: (appearances[teams[i]], last_played[teams[i]], tiebreak[i]))
+            playing = [teams[i] for i in order[:6]]
+            self.rng.shuffle(playing)
+
+            surrogates = [team for team in playing if appearances[team] >= self.matches_per_team]
+            for team in playing:
+                appearances[team] += 1
+                last_played[team] = match_index
+            schedule.append((playing[:3], playing[3:], surrogates))
+
+        return schedule
+
+    ############################################
+    # Official Results
+    ############################################
+    @staticmethod
+    def __alliance_breakdown(robots: List[Dict[str, Any]], opponents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        auto_coral = sum(robot["auto_coral"] for robot in robots)
+        teleop_coral = sum(robot["teleop_coral"] for robot in robots)
+
+        # Each branch only holds one coral, so anything past a full level ends up in the trough
+        for level in range(1, 4):
+            overflow = max(auto_coral[level] + teleop_coral[level] - BRANCHES_PER_LEVEL, 0)
+            teleop_coral[level] -= overflow
+            teleop_coral[0] += overflow
+
+        processor = sum(robot["auto_algae_processor"] + robot["teleop_algae_processor"] for robot in robots)
+        net = sum(robot["auto_algae_net"] + robot["teleop_algae_net"] for robot in robots)
+        barge_points = sum(BARGE_POINTS[robot["barge"]] for robot in robots)
+        minor_fouls = sum(robot["minor_fouls"] for robot in opponents)
+        major_fouls = sum(robot["major_fouls"] for robot in opponents)
+
+        auto_mobility_points = LEAVE_POINTS * sum(robot["left"] for robot in robots)
+        auto_coral_points = int(auto_coral @ AUTO_CORAL_POINTS)
+        teleop_coral_points = int(teleop_coral @ TELEOP_CORAL_POINTS)
+        algae_points = processor * PROCESSOR_ALGAE_POINTS + net * NET_ALGAE_POINTS
+        foul_points = minor_fouls * MINOR_FOUL_POINTS + major_fouls * MAJOR_FOUL_POINTS
+        auto_points = auto_mobility_points + auto_coral_points
+        teleop_points = teleop_coral_points + algae_points + barge_points
+
+        breakdown = {
+            "adjustPoints": 0,
+            "algaePoints": algae_points,
+            "autoBonusAchieved": bool(all(robot["left"] for robot in robots) and auto_coral.sum() >= 1),
+            "autoCoralCount": int(auto_coral.sum()),
+            "autoCoralPoints": auto_coral_points,
+            **{f"autoLineRobot{i + 1}": "Yes" if robot["left"] else "No" for i, robot in enumerate(robots)},
+            "autoMobilityPoints": auto_mobility_points,
+            "autoPoints": auto_points,
+            "autoReef": None,
+            "bargeBonusAchieved": barge_points >= BARGE_RP_POINTS,
+            "coopertitionCriteriaMet": processor >= COOPERTITION_PROCESSOR_ALGAE,
+            "coralBonusAchieved": False,
+            "endGameBargePoints": barge_points,
+            **{f"endGameRobot{i + 1}": SCOUTED_BARGE_STATUSES[robot["barge"]] for i, robot in enumerate(robots)},
+            "foulCount": minor_fouls,
+            "foulPoints": foul_points,
+            "g206Penalty": False,
+            "g410Penalty": False,
+            "g418Penalty": False,
+            "g428Penalty": False,
+            "netAlgaeCount": net,
+            "rp": 0,
+            "techFoulCount": major_fouls,
+            "teleopCoralCount": int(teleop_coral.sum()),
+            "teleopCoralPoints": teleop_coral_points,
+            "teleopPoints": teleop_points,
+            "teleopReef": None,
+            "totalPoints": auto_points + teleop_points + foul_points,
+            "wallAlgaeCount": processor,
+        }
+        breakdown["autoReef"], breakdown["teleopReef"] = SyntheticSeason.__reefs(auto_coral, teleop_coral)
+
+        # Kept for working out the ranking points, and taken back out before the breakdown is saved
+        breakdown["levels"] = auto_coral + teleop_coral
+        return breakdown
+
+    @staticmethod
+    def __reefs(auto_coral: np.ndarray, teleop_coral: np.ndarray) -> tuple:
+        # The teleop reef is the final state of the reef, so it shows (and counts) every coral that ended up on it,
+        # auto included. The auto reef is just what was there at the end of auto
+        nodes = [f"node{letter}" for letter in "ABCDEFGHIJKL"]
+        auto_reef = {}
+        teleop_reef = {}
+        for row, level in [("botRow", 1), ("midRow", 2), ("topRow", 3)]:
+            filled = int(auto_coral[level] + teleop_coral[level])
+            auto_reef[row] = {node: i < int(auto_coral[level]) for i, node in enumerate(nodes)}
+            teleop_reef[row] = {node: i < filled for i, node in enumerate(nodes)}
+
+        for reef, coral in [(auto_reef, auto_coral), (teleop_reef, auto_coral + teleop_coral)]:
+            reef["tba_botRowCount"] = int(coral[1])
+            reef["tba_midRowCount"] = int(coral[2])
+            reef["tba_topRowCount"] = int(coral[3])
+            reef["trough"] = int(coral[0])
+
+        # TBA sorts the keys
+        return dict(sorted(auto_reef.items())), dict(sorted(teleop_reef.items()))
+
+    @staticmethod
+    def __add_ranking_points(breakdowns: Dict[str, Dict[str, Any]]):
+        coopertition = all(breakdown["coopertitionCriteriaMet"] for breakdown in breakdowns.values())
+        for alliance, opponent in [("red", "blue"), ("blue", "red")]:
+            breakdown = breakdowns[alliance]
+            levels_completed = int((breakdown.pop("levels") >= CORAL_RP_PIECES_PER_LEVEL).sum())
+            breakdown["coralBonusAchieved"] = levels_completed >= (3 if coopertition else 4)
+
+            score, opponent_score = breakdown["totalPoints"], breakdowns[opponent]["totalPoints"]
+            result_rp = WIN_RP if score > opponent_score else (TIE_RP if score == opponent_score else 0)
+            breakdown["rp"] = result_rp + sum(breakdown[bonus] for bonus in ["autoBonusAchieved", "coralBonusAchieved", "bargeBonusAchieved"])
+
+    @staticmethod
+    def __winner(breakdowns: Dict[str, Dict[str, Any]]) -> str:
+        red, blue = breakdowns["red"]["totalPoints"], breakdowns["blue"]["totalPoints"]
+        return "red" if red > blue else ("blue" if blue > red else "")
+
+    def __tba_match(self, event, match_number, match_time, alliances, surrogates, breakdowns) -> Dict[str, Any]:
+        actual_time = match_time + int(self.rng.integers(0, 300))
+        return {
+            "actual_time": actual_time,
+            "alliances": {
+                alliance: {
+                    "dq_team_keys": [],
+                    "score": breakdowns[alliance]["totalPoints"],
+                    "surrogate_team_keys": [f"frc{team}" for team in teams if team in surrogates],
+                    "team_keys": [f"frc{team}" for team in teams],
+                }
+                for alliance, teams in sorted(alliances.items())
+            },
+            "comp_level": "qm",
+            "event_key": event,
+            "key": f"{event}_qm{match_number}",
+            "match_number": match_number,
+            "post_result_time": actual_time + 180,
+            "predicted_time": actual_time - 30,
+            "score_breakdown": dict(sorted(breakdowns.items())),
+            "set_number": 1,
+            "time": match_time,
+            "videos": [],
+            "winning_alliance": self.__winner(breakdowns),
+        }
+
+    def __statbotics_match(self, event, index, match_number, match_time, alliances, surrogates, breakdowns) -> Dict[str, Any]:
+        # Statbotics predicts from what it knows about the teams going in, here their true skill plus some noise
+        expected = {
+            alliance: sum(self.__expected_points(self.teams[team]["skill"]) for team in teams) + self.rng.normal(0, 5)
+            for alliance, teams in alliances.items()
+        }
+        red_win_prob = 1 / (1 + math.exp(-(expected["red"] - expected["blue"]) / 15))
+
+        pred = {
+            "winner": "red" if red_win_prob >= 0.5 else "blue",
+            "red_win_prob": round(red_win_prob, 4),
+            "red_score": round(expected["red"], 2),
+            "blue_score": round(expected["blue"], 2),
+        }
+        for rp, threshold in [("auto", 45), ("coral", 110), ("barge", 70)]:
+            for alliance in ["red", "blue"]:
+                pred[f"{alliance}_{rp}_rp"] = round(1 / (1 + math.exp(-(expected[alliance] - threshold) / 12)), 4)
+        for number, rp in enumerate(["auto", "coral", "barge"], start=1):
+            for alliance in ["red", "blue"]:
+                pred[f"{alliance}_rp_{number}"] = pred[f"{alliance}_{rp}_rp"]
+
+        result = {"winner": self.__winner(breakdowns) or "tie"}
+        for field, value in [
+            ("score", lambda b: b["totalPoints"]),
+            ("no_foul", lambda b: b["totalPoints"] - b["foulPoints"]),
+            ("auto_points", lambda b: b["autoPoints"]),
+            ("teleop_points", lambda b: b["teleopPoints"] - b["endGameBargePoints"]),
+            ("endgame_points", lambda b: b["endGameBargePoints"]),
+            ("auto_rp", lambda b: b["autoBonusAchieved"]),
+            ("coral_rp", lambda b: b["coralBonusAchieved"]),
+            ("barge_rp", lambda b: b["bargeBonusAchieved"]),
+            ("coral_l1", lambda b: float(b["teleopReef"]["trough"])),
+            ("coral_l2", lambda b: float(b["teleopReef"]["tba_botRowCount"])),
+            ("coral_l3", lambda b: float(b["teleopReef"]["tba_midRowCount"])),
+            ("coral_l4", lambda b: float(b["teleopReef"]["tba_topRowCount"])),
+            ("processor_algae", lambda b: float(b["wallAlgaeCount"])),
+            ("net_algae", lambda b: float(b["netAlgaeCount"])),
+            ("barge_points", lambda b: float(b["endGameBargePoints"])),
+        ]:
+            for alliance in ["red", "blue"]:
+                result[f"{alliance}_{field}"] = value(breakdowns[alliance])
+
+        return {
+            "key": f"{event}_qm{match_number}",
+            "year": self.year,
+            "event": event,
+            "week": index + 1,
+            "elim": False,
+            "comp_level": "qm",
+            "set_number": 1,
+            "match_number": match_number,
+            "match_name": f"Qual {match_number}",
+            "time": match_time,
+            "predicted_time": match_time,
+            "status": "Completed",
+            "video": None,
+            "alliances": {
+                alliance: {"team_keys": list(teams), "surrogate_team_keys": [team for team in teams if team in surrogates], "dq_team_keys": []}
+                for alliance, teams in alliances.items()
+            },
+            "pred": pred,
+            "result": result,
+        }
+
+    @staticmethod
+    def __expected_points(skill: float) -> float:
+        # Roughly what __play scores on average for a team of this skill
+        return 4 + 60 * skill**1.5
+
+    def __statbotics_teams(self, event, index, start, teams, first_events, contributions, tba_matches) -> List[Dict[str, Any]]:
+        records = {team: {"wins": 0, "losses": 0, "ties": 0, "count": 0, "rps": 0, "points": 0} for team in teams}
+        for match in tba_matches:
+            for alliance, opponent in [("red", "blue"), ("blue", "red")]:
+                for team_key in match["alliances"][alliance]["team_keys"]:
+                    team = int(team_key[3:])
+                    if team_key in match["alliances"][alliance]["surrogate_team_keys"]:
+                        continue
+                    record = records[team]
+                    result = "wins" if match["winning_alliance"] == alliance else ("losses" if match["winning_alliance"] == opponent else "ties")
+                    record[result] += 1
+                    record["count"] += 1
+                    record["rps"] += match["score_breakdown"][alliance]["rp"]
+                    record["points"] += match["alliances"][alliance]["score"]
+
+        ranked = sorted(teams, key=lambda team: (-records[team]["rps"] / max(records[team]["count"], 1), -records[team]["points"]))
+        ranks = {team: rank for rank, team in enumerate(ranked, start=1)}
+
+        epas = {team: [self.__robot_points(robot) for robot in contributions[team]] for team in teams}
+        all_points = np.concatenate([points for points in epas.values() if points]) if teams else np.zeros(1)
+        mean, sd = float(np.mean(all_points)), float(np.std(all_points)) or 1.0
+
+        output = []
+        for team in teams:
+            robots = contributions[team]
+            points = np.array(epas[team]) if robots else np.zeros(1)
+            epa = float(points.mean())
+            auto = float(np.mean([LEAVE_POINTS * robot["left"] + robot["auto_coral"] @ AUTO_CORAL_POINTS for robot in robots])) if robots else 0.0
+            endgame = float(np.mean([BARGE_POINTS[robot["barge"]] for robot in robots])) if robots else 0.0
+            coral = np.mean([robot["auto_coral"] + robot["teleop_coral"] for robot in robots], axis=0) if robots else np.zeros(4)
+            record = records[team]
+            winrate = round(record["wins"] / record["count"], 4) if record["count"] else 0.0
+            unitless = round(1500 + 250 * (epa - mean) / sd)
+
+            output.append(
+                {
+                    "team": team,
+                    "year": self.year,
+                    "event": event,
+                    "time": int(start.timestamp()),
+                    "team_name": f"Synthetic Team {team}",
+                    "event_name": f"Synthetic Event {index + 1}",
+                    "country": "USA",
+                    "state": None,
+                    "district": None,
+                    "type": "regional",
+                    "week": index + 1,
+                    "status": "Completed",
+                    "first_event": team in first_events,
+                    "epa": {
+                        "total_points": {"mean": round(epa, 2), "sd": round(float(points.std()), 2)},
+                        "unitless": float(unitless),
+                        "norm": float(unitless),
+                        "conf": [-0.5, 0.5],
+                        "breakdown": {
+                            "total_points": round(epa, 2),
+                            "auto_points": round(auto, 2),
+                            "teleop_points": round(epa - auto - endgame, 2),
+                            "endgame_points": round(endgame, 2),
+                            **{f"coral_l{level + 1}": round(float(coral[level]), 2) for level in range(4)},
+                            "barge_points": round(endgame, 2),
+                        },
+                        "stats": {"start": round(epa, 2), "pre_elim": round(epa, 2), "mean": round(epa, 2), "max": round(float(points.max()), 2)},
+                    },
+                    "record": {
+                        "qual": {
+                            "wins": record["wins"],
+                            "losses": record["losses"],
+                            "ties": record["ties"],
+                            "count": record["count"],
+                            "winrate": winrate,
+                            "rps": record["rps"],
+                            "rps_per_match": round(record["rps"] / record["count"], 2) if record["count"] else 0.0,
+                            "rank": ranks[team],
+                            "num_teams": len(teams),
+                        },
+                        "elim": {"wins": 0, "losses": 0, "ties": 0, "count": 0, "winrate": 0.0, "alliance": None, "is_captain": None},
+                        "total": {"wins": record["wins"], "losses": record["losses"], "ties": record["ties"], "count": record["count"], "winrate": winrate},
+                    },
+                    "district_points": None,
+                }
+            )
+
+        return output
+
+    @staticmethod
+    def __robot_points(robot: Dict[str, Any]) -> float:
+        return float(
+            LEAVE_POINTS * robot["left"]
+            + robot["auto_coral"] @ AUTO_CORAL_POINTS
+            + robot["teleop_coral"] @ TELEOP_CORAL_POINTS
+            + (robot["auto_algae_processor"] + robot["teleop_algae_processor"]) * PROCESSOR_ALGAE_POINTS
+            + (robot["auto_algae_net"] + robot["teleop_algae_net"]) * NET_ALGAE_POINTS
+            + BARGE_POINTS[robot["barge"]]
+        )
+
+    ############################################
+    # Scouting
+    ############################################
+    def __scout(self, event, match_number, match_time, alliance, team, robot) -> List[List[Any]]:
+        if self.rng.random() < MISSED_SCOUT_RATE:
+            return []
+
+        num_scouts = 2 if self.rng.random() < self.duplicate_scout_rate else 1
+        return [self.__scouting_row(event, match_number, match_time, alliance, team, robot) for _ in range(num_scouts)]
+
+    def __scouting_row(self, event, match_number, match_time, alliance, team, robot) -> List[Any]:
+        counts = {}
+        for phase in ["auto", "teleop"]:
+            for level in range(4):
+                counts[f"{phase}CoralL{level + 1}"] = int(robot[f"{phase}_coral"][level])
+            counts[f"{phase}AlgaeProc"] = robot[f"{phase}_algae_processor"]
+            counts[f"{phase}AlgaeNet"] = robot[f"{phase}_algae_net"]
+
+        for name in SCOUTED_COUNTS:
+            if self.rng.random() < MISCOUNT_RATE:
+                counts[name] = max(counts[name] + int(self.rng.choice([-1, 1])), 0)
+
+        def coral(phase):
+            return np.array([counts[f"{phase}CoralL{level + 1}"] for level in range(4)])
+
+        auto_coral, teleop_coral = coral("auto"), coral("teleop")
+        auto_algae = counts["autoAlgaeProc"] + counts["autoAlgaeNet"]
+        teleop_algae = counts["teleopAlgaeProc"] + counts["teleopAlgaeNet"]
+        auto_points = (
+            LEAVE_POINTS * robot["left"]
+            + int(auto_coral @ AUTO_CORAL_POINTS)
+            + counts["autoAlgaeProc"] * PROCESSOR_ALGAE_POINTS
+            + counts["autoAlgaeNet"] * NET_ALGAE_POINTS
+        )
+        teleop_points = int(teleop_coral @ TELEOP_CORAL_POINTS) + counts["teleopAlgaeProc"] * PROCESSOR_ALGAE_POINTS + counts["teleopAlgaeNet"] * NET_ALGAE_POINTS
+        endgame_points = BARGE_POINTS[robot["barge"]]
+        time = datetime.datetime.fromtimestamp(match_time, datetime.timezone.utc)
+
+        row = {
+            "org_key": self.org,
+            "year": self.year,
+            "event_key": event,
+            "match_key": f"{event}_qm{match_number}",
+            "match_number": match_number,
+            "time": f"{time.month}/{time.day}/{time.year} {time.hour % 12 or 12}:{time:%M:%S} {time:%p}",
+            "alliance": alliance,
+            "team_key": f"frc{team}",
+            "totalAutoPoints": auto_points,
+            "totalTeleopPoints": teleop_points,
+            "totalEndgamePoints": endgame_points,
+            "contributedPoints": auto_points + teleop_points + endgame_points,
+            "totalAutoCoral": int(auto_coral.sum()),
+            "totalTeleopCoral": int(teleop_coral.sum()),
+            "totalCoral": int(auto_coral.sum() + teleop_coral.sum()),
+            "totalAutoAlgae": auto_algae,
+            "totalTeleopAlgae": teleop_algae,
+            "totalAlgae": auto_algae + teleop_algae,
+            "ClimbTime": robot["climb_time"],
+            "Reliability": 0 if robot["died"] and not robot["recovered"] else 1,
+            "startingPosition": self.teams[team]["starting_position"],
+            "didLeaveStartingZone": int(robot["left"]),
+            **counts,
+            "didDefense": int(robot["defense"]),
+            "Defenserating": int(self.rng.integers(1, 6)) if robot["defense"] else 0,
+            "totalMinorFouls": robot["minor_fouls"],
+            "totalMajorFouls": robot["major_fouls"],
+            "climbingStartTime": 0,
+            "climbingStopTime": 0,
+            "bargeStatus": robot["barge"],
+            "diedDuringMatch": int(robot["died"]),
+            "recoveredFromFreeze": int(robot["recovered"]),
+            "didYellowCard": int(robot["yellow_card"]),
+            "didRedCard": 0,
+        }
+        return [row[column] for column in MATCH_SCOUTING_COLUMNS]
+
+    def __pit_scout(self, event, teams) -> List[List[Any]]:
+        rows = []
+        for team in teams:
+            if self.rng.random() >= PIT_SCOUTED_RATE:
+                continue
+
+            profile = self.teams[team]
+            skill = profile["skill"]
+            scores = [int(profile["teleop_levels"][level] > 0.1) for level in range(4)]
+            row = [
+                self.org, self.year, event, f"frc{team}",
+                *self.rng.integers(0, 4, size=2).tolist(), int(self.rng.integers(0, 15)),
+                self.rng.choice(["Custom Swerve", "Rev Swerve", "SDS Swerve", "WCP Swerve", "Tank"]),
+                int(skill > 0.3), int(self.rng.integers(24, 33)), int(self.rng.integers(24, 33)), int(self.rng.integers(30, 50)), int(self.rng.integers(90, 125)),
+                "Low (Not top heavy)" if self.rng.random() < 0.8 else "Medium",
+                int(skill > 0.3), round(1 + 4 * skill),
+                int(self.rng.random() < skill), int(self.rng.random() < skill), 1, int(profile["algae_focus"] > 0.3),
+                self.rng.choice(["Java", "C++", "Python", "LabVIEW"], p=[0.7, 0.15, 0.1, 0.05]),
+                *scores, int(profile["algae_focus"] > 0.2), int(profile["algae_focus"] > 0.4 and skill > 0.4),
+                "Score L4" if scores[3] else "Score coral",
+                1, 1, 1,
+                f"{max(round(2.2 * skill**1.6), 0)} coral",
+                {"Deep Cage": "Deep", "Shallow Cage": "Shallow", "Parked": "Park"}[profile["cage"]],
+                "",
+            ]
+            rows.append(row)
+
+        return rows
+
+    @staticmethod
+    def __export(columns: List[str], rows: List[List[Any]]) -> str:
+        lines = [",".join(columns)]
+        for row in rows:
+            quoted = [f'"{value}"' for value in row[UNQUOTED_EXPORT_COLUMNS:]]
+            lines.append(",".join([*(str(value) for value in row[:UNQUOTED_EXPORT_COLUMNS]), *quoted]))
+        return "\n".join(lines)
+
+
+############################################
+# Output
+############################################
+def event_responses(event: str, org: str, files: Dict[str, Any]) -> Dict[str, tuple]:
+    """
+    Works out what each server would have answered for an event, so the scrape can be replayed against it
+    :param event: The event key
+    :param org: The Scout Radioz org the scouting was exported from
+    :param files: The event's files, as returned by SyntheticSeason.generate
+    :return: File name -> (url, cookies, response body, content type)
+    """
+    cookies = {"org_key": org, "event_key": event}
+    urls = {
+        "tba_matches.json": (f"{tba_utils.TBA_BASE_URL}/event/{event}/matches", None),
+        "statbotics_matches.json": (f"{statbotics_utils.STATBOTICS_BASE_URL}/matches?limit={statbotics_utils.STATBOTICS_PAGE_SIZE}&offset=0&event={event}&elims=False&metric=time&ascending=True", None),
+        "statbotics_teams.json": (f"{statbotics_utils.STATBOTICS_BASE_URL}/team_events?event={event}", None),
+        "match_scouting.csv": (f"{scout_radioz_utils.SCOUT_RADIOZ_BASE_URL}/reports/exportdata?type=matchscouting", cookies),
+        "pit_scouting.csv": (f"{scout_radioz_utils.SCOUT_RADIOZ_BASE_URL}/reports/exportdata?type=pitscouting", cookies),
+    }
+
+    responses = {}
+    for filename, content in files.items():
+        url, url_cookies = urls[filename]
+        if filename.endswith(".json"):
+            responses[filename] = (url, url_cookies, json.dumps(content).encode("utf-8"), "application/json")
+        else:
+            responses[filename] = (url, url_cookies, content.encode("utf-8"), "text/csv")
+    return responses
+
+
+def write_event(event_directory: Path, files: Dict[str, Any]):
+    """
+    Writes an event's files the same way the scrape does, including the precalculated match scouting store
+    :param event_directory: The data/<event> directory to write to
+    :param files: The event's files, as returned by SyntheticSeason.generate
+    """
+    event_directory = Path(event_directory)
+    event_directory.mkdir(parents=True, exist_ok=True)
+
+    for filename, content in files.items():
+        http_utils.write_if_changed(event_directory / filename, json.dumps(content, indent=4) if filename.endswith(".json") else content)
+
+    build_match_scouting_store(event_directory / "match_scouting.csv", event_directory / MATCH_SCOUTING_STORE_FILE)
+
+
+def seed_http_cache(event: str, org: str, files: Dict[str, Any]):
+    """
+    Seeds the http cache with what each server would have answered for an event, so the scrape can be replayed
+    offline (HTTP_CACHE_OFFLINE=1) against it
+    :param event: The event key
+    :param org: The Scout Radioz org the scouting was exported from
+    :param files: The event's files, as returned by SyntheticSeason.generate
+    """
+    for url, cookies, body, content_type in event_responses(event, org, files).values():
+        http_utils.seed_cache(url, body, cookies=cookies, content_type=content_type)
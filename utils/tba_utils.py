@@ -1,11 +1,71 @@
 import os
 import json
+import functools
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
-
-
+from typing import Dict, Any, Iterable, List
+
+from utils import http_utils, json_utils
+from utils.json_utils import CATEGORY, TEXT, LIST
+
+# Where the TBA api is. Set TBA_BASE_URL to point the scrape somewhere else, i.e. a local stub server for testing
+TBA_BASE_URL = os.environ.get("TBA_BASE_URL", "https://www.thebluealliance.com/api/v3")
+
+# How long (in seconds) a cached response can be reused without asking TBA if it changed. TBA sends ETags, so
+# revalidating an unchanged response only costs a 304.
+TBA_EVENT_MATCHES_TTL = 0
+TBA_EVENTS_TTL = 24 * 60 * 60
+
+# The score breakdown fields (per alliance) that get loaded. The per branch reef nodes, video links and the like are
+# never looked at, so they are left in the file.
+SCORE_BREAKDOWN_FIELDS = {
+    "rp": "float32",
+    "totalPoints": "float32",
+    "autoPoints": "float32",
+    "teleopPoints": "float32",
+    "foulPoints": "float32",
+    "algaePoints": "float32",
+    "endGameBargePoints": "float32",
+    "netAlgaeCount": "float32",
+    "wallAlgaeCount": "float32",
+    "teleopReef.trough": "float32",
+    "teleopReef.tba_botRowCount": "float32",
+    "teleopReef.tba_midRowCount": "float32",
+    "teleopReef.tba_topRowCount": "float32",
+    "autoLineRobot1": CATEGORY,
+    "autoLineRobot2": CATEGORY,
+    "autoLineRobot3": CATEGORY,
+    "endGameRobot1": CATEGORY,
+    "endGameRobot2": CATEGORY,
+    "endGameRobot3": CATEGORY,
+}
+
+# Field path -> type for everything loaded from the event matches. See json_utils.records_to_dataframe
+EVENT_MATCH_FIELDS = {
+    "key": TEXT,
+    "event_key": CATEGORY,
+    "comp_level": CATEGORY,
+    "set_number": "int16",
+    "match_number": "int16",
+    "time": "float64",
+    "actual_time": "float64",
+    "winning_alliance": CATEGORY,
+    **{
+        f"alliances.{alliance}.{field}": field_type
+        for alliance in ["red", "blue"]
+        for field, field_type in [("score", "int16"), ("team_keys", LIST), ("surrogate_team_keys", LIST), ("dq_team_keys", LIST)]
+    },
+    **{
+        f"score_breakdown.{alliance}.{field}": field_type
+        for alliance in ["red", "blue"]
+        for field, field_type in SCORE_BREAKDOWN_FIELDS.items()
+    },
+}
+
+
+@functools.lru_cache(maxsize=None)
 def __get_api_key():
     app_dir = Path(__file__).parent
     api_key_file = os.path.join(app_dir.parent, ".tba_key")
@@ -25,36 +85,50 @@ def __get_api_key():
     return api_key
 
 
-def __make_request(url):
+def __make_request(url, ttl=None):
     headers = {"X-TBA-Auth-Key": __get_api_key()}
 
-    import requests
-    response = requests.get(url, headers=headers)
+    response = http_utils.get(url, ttl=ttl, headers=headers)
 
     return response.json()
 
 
-def request_event_matches(event_key: str) -> Dict[str, Any]:
-    url = f"https://www.thebluealliance.com/api/v3/event/{event_key}/matches"
-    return __make_request(url)
+def request_events(year: int, ttl=TBA_EVENTS_TTL) -> List[Dict[str, Any]]:
+    # The full model, since the simple one leaves out the week
+    url = f"{TBA_BASE_URL}/events/{year}"
+    return __make_request(url, ttl=ttl)
 
 
-def download_tba_event_matches(event_key: str, output_file: Path):
-    json_data = request_event_matches(event_key)
+def request_event_matches(event_key: str, ttl=TBA_EVENT_MATCHES_TTL) -> Dict[str, Any]:
+    url = f"{TBA_BASE_URL}/event/{event_key}/matches"
+    return __make_request(url, ttl=ttl)
 
-    with open(output_file, "w") as f:
-        json.dump(json_data, f, indent=4)
 
+def download_tba_event_matches(event_key: str, output_file: Path, ttl=TBA_EVENT_MATCHES_TTL) -> bool:
+    json_data = request_event_matches(event_key, ttl=ttl)
 
-def load_event_matches(json_file: Path) -> pd.DataFrame:
-    with open(json_file, "r") as f:
-        json_data = json.load(f)
+    return http_utils.write_if_changed(output_file, json.dumps(json_data, indent=4))
 
-    return event_matches_json_to_dataframe(json_data)
+
+def load_event_matches(json_file: Path, fields: Dict[str, str] = EVENT_MATCH_FIELDS) -> pd.DataFrame:
+    """
+    Streams the event matches off of disk, keeping only the requested fields
+    :param json_file: The cached json file
+    :param fields: Field path -> type of everything to load. See json_utils.records_to_dataframe
+    :return: See event_matches_json_to_dataframe
+    """
+    with open(json_file, "r") as f:
+        return event_matches_json_to_dataframe(json_utils.iter_json_array(f), fields)
 
 
-def event_matches_json_to_dataframe(json_data: Dict[str, Any]) -> pd.DataFrame:
-    raw_df = pd.json_normalize(json_data)
+def event_matches_json_to_dataframe(json_data: Iterable[Dict[str, Any]], fields: Dict[str, str] = EVENT_MATCH_FIELDS) -> pd.DataFrame:
+    """
+    Converts the event matches into a data frame of the qualification matches
+    :param json_data: The matches, either already decoded or streamed with json_utils.iter_json_array
+    :param fields: Field path -> type of everything to load. See json_utils.records_to_dataframe
+    :return: The data frame, with one column per field plus red1..blue3 team key columns
+    """
+    raw_df = json_utils.records_to_dataframe(json_data, fields)
 
     if raw_df.empty:
         print("TBA Events DF is empty!")
@@ -64,15 +138,45 @@ def event_matches_json_to_dataframe(json_data: Dict[str, Any]) -> pd.DataFrame:
     raw_df = raw_df[raw_df["comp_level"] == "qm"]
 
     # We like to be able to simply query teams. By default, they are embedded in the dataframe as a list
-    red_teams = raw_df["alliances.red.team_keys"]
-    blue_teams = raw_df["alliances.blue.team_keys"]
-
-    # TODO(pj) There is surely a better way
-    raw_df["red1"] = [t[0] for t in red_teams]
-    raw_df["red2"] = [t[1] for t in red_teams]
-    raw_df["red3"] = [t[2] for t in red_teams]
-    raw_df["blue1"] = [t[0] for t in blue_teams]
-    raw_df["blue2"] = [t[1] for t in blue_teams]
-    raw_df["blue3"] = [t[2] for t in blue_teams]
-
-    return raw_df
+    red_teams = pd.DataFrame(raw_df["alliances.red.team_keys"].tolist(), index=raw_df.index, columns=["red1", "red2", "red3"])
+    blue_teams = pd.DataFrame(raw_df["alliances.blue.team_keys"].tolist(), index=raw_df.index, columns=["blue1", "blue2", "blue3"])
+
+    return pd.concat([raw_df, red_teams, blue_teams], axis=1)
+
+
+STATIONS = ["red1", "red2", "red3", "blue1", "blue2", "blue3"]
+
+
+def event_matches_to_team_matches(matches_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Explodes the match schedule into one row per team per match
+    :param matches_df: The matches, as returned by event_matches_json_to_dataframe
+    :return: A data frame with match_key, match_number, alliance, station and team_key columns, sorted by match
+    """
+    columns = ["match_key", "match_number", "alliance", "station", "team_key"]
+    if matches_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    team_matches = matches_df.melt(
+        id_vars=["key", "match_number"],
+        value_vars=STATIONS,
+        var_name="station",
+        value_name="team_key",
+    ).rename(columns={"key": "match_key"})
+    team_matches["alliance"] = team_matches["station"].str[:-1]
+
+    return team_matches[columns].sort_values(["match_number", "station"], ignore_index=True)
+
+
+def build_team_match_index(team_matches_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Builds a lookup of the matches each team is playing in. Teams are matched exactly, so frc326 and frc3260
+    are kept apart.
+    :param team_matches_df: The data frame returned by event_matches_to_team_matches
+    :return: A dictionary of team key (i.e. frc3260) to a sorted array of that team's match numbers
+    """
+    match_numbers = team_matches_df["match_number"].to_numpy()
+    return {
+        team_key: np.unique(match_numbers[rows])
+        for team_key, rows in team_matches_df.groupby("team_key").indices.items()
+    }
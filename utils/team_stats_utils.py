@@ -0,0 +1,39 @@
+from typing import List
+
+import pandas as pd
+
+
+STATISTICS = ["mean", "median", "max", "std", "count"]
+ENDGAME_STATUSES = ["Not Parked", "Parked", "Shallow Cage", "Deep Cage"]
+
+
+def build_team_stats_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates the match scouting data into a team x (statistic, metric) cube. This is meant to be built once
+    per version of the scouting data, and then sliced for whatever set of teams is being looked at.
+    :param df: The match scouting data, as returned by scout_radioz_utils.load_match_scouting
+    :return: A data frame indexed by team_key. The columns are a (statistic, metric) multi-index, where the
+        statistic is one of STATISTICS or "endgame". The endgame block holds the number of matches each team
+        finished in each of the ENDGAME_STATUSES.
+    """
+    numeric = df.select_dtypes("number")
+    grouped = numeric.groupby(df["team_key"])
+
+    blocks = {statistic: grouped.agg(statistic) for statistic in STATISTICS}
+    blocks["endgame"] = pd.crosstab(df["team_key"], df["bargeStatus"]).reindex(columns=ENDGAME_STATUSES, fill_value=0)
+
+    cube = pd.concat(blocks, axis=1, names=["statistic", "metric"])
+    cube.index.name = "team_key"
+
+    return cube
+
+
+def team_stats(cube: pd.DataFrame, teams: List[str], statistic: str = "mean") -> pd.DataFrame:
+    """
+    Gets one statistic for a list of teams, in the order given. Teams without any scouting data are filled with zeros.
+    :param cube: The cube built by build_team_stats_cube
+    :param teams: The team keys to look up. Duplicates are allowed
+    :param statistic: The statistic (or "endgame") to get
+    :return: A data frame with a team_key column, and one column per metric
+    """
+    return cube[statistic].reindex(teams, fill_value=0).reset_index()
@@ -0,0 +1,47 @@
+import asyncio
+import concurrent.futures
+import sys
+from typing import Any, Callable
+
+# How many computations can run at once. Most of the heavy lifting is numpy, which lets go of the GIL while it works
+WORKER_THREADS = 4
+
+
+class WorkerPool:
+    """
+    Runs slow computations on worker threads, so the event loop (and with it every other session) keeps going while
+    they run.
+
+    Pyodide can't start threads, so there everything runs inline instead. That only ever blocks the one browser tab
+    it is running in.
+    """
+
+    def __init__(self, num_threads: int = WORKER_THREADS):
+        """
+        :param num_threads: How many computations can run at once
+        """
+        self.num_threads = num_threads
+        if sys.platform == "emscripten" or num_threads <= 0:
+            self.__executor = None
+        else:
+            self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="worker")
+
+    async def run(self, function: Callable[..., Any], *args) -> Any:
+        """
+        Runs a function on a worker thread, and waits for it without blocking the event loop.
+
+        If the waiting task is cancelled before the function has started, it never starts. A function that is already
+        running can't be interrupted, so it runs to the end and its result is thrown away.
+        :param function: The function to run. It can't use anything reactive, everything it needs has to be passed in
+        :param args: The arguments to call it with
+        :return: Whatever the function returns
+        """
+        if self.__executor is None:
+            return function(*args)
+
+        future = self.__executor.submit(function, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise